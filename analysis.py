@@ -1,23 +1,1273 @@
+import argparse
+import glob
 import json
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from collections import Counter
+from collections import Counter, defaultdict, deque
+from operator import itemgetter
+import heapq
 import re
-import jieba
-import jieba.analyse
-from wordcloud import WordCloud
-from snownlp import SnowNLP
+import importlib.util
 import warnings
 from datetime import datetime
 import os
 import yaml
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import jsonlines
+from analysis_cache import AnalysisCache
+from profiling import StageProfiler
+from rendering import ChartRenderer, render_analysis_charts, render_time_series, render_wordcloud, resolve_cjk_font
+from sketches import SpaceSaving, lsh_clusters, minhash_signatures
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # 未安装 pyarrow 时回退到JSON读取
+    pa = pq = None
 warnings.filterwarnings('ignore')
 
-# 设置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei']
-plt.rcParams['axes.unicode_minus'] = False
+# 原始数据文件（支持JSON数组与JSON Lines两种格式）
+DATA_FILES = {
+    'comments': 'data/search_comments_2025-07-14.json',
+    'contents': 'data/search_contents_2025-07-14.json',
+    'creators': 'data/search_creators_2025-07-14.json',
+}
+
+# 爬虫按日期输出的数据文件，如 search_comments_2025-07-14.json
+DATED_FILE_PATTERN = re.compile(r'^search_(comments|contents|creators)_(\d{4}-\d{2}-\d{2})\.jsonl?$')
+
+# 不带日期的输入文件按文件名中的类型关键字识别
+INPUT_KIND_PATTERN = re.compile(r'(comments|contents|creators)')
+
+# 增量分析时各类数据的去重主键
+RECORD_KEYS = {'comments': 'comment_id', 'contents': 'video_id', 'creators': 'user_id'}
+
+# 可用 --stages 选择的分析阶段（默认全部执行）；dedup / groups / timeseries 还需在配置中开启。
+# 不选 keywords 时各阶段跳过分词与关键词提取，只做统计和情绪分析
+ANALYSIS_STAGES = ('dedup', 'comments', 'keywords', 'content', 'creators', 'groups', 'timeseries',
+                   'charts', 'wordcloud', 'report')
+
+# 需要在配置中另外开启的阶段：阶段 -> analysis 下的配置节
+STAGE_CONFIG_KEYS = {'dedup': 'dedup', 'groups': 'grouped', 'timeseries': 'timeseries'}
+
+# 可选依赖（见 requirements-optional.txt）：模块名 -> pip 包名；未安装时相应功能跳过或回退
+OPTIONAL_PACKAGES = {'pyarrow': 'pyarrow', 'scipy': 'scipy', 'sklearn': 'scikit-learn'}
+
+# 各阶段需要的可选依赖（稀疏矩阵）
+STAGE_DEPENDENCIES = {'dedup': ('scipy',), 'groups': ('scipy',), 'timeseries': ('scipy',)}
+
+# 各阶段需要加载的数据类型及字段，未选中的阶段用不到的数据和列不读取
+STAGE_COLUMNS = {
+    'dedup': {'comments': ['comment_id', 'video_id', 'content', 'like_count']},
+    'comments': {'comments': ['comment_id', 'content', 'like_count', 'sex']},
+    'content': {'contents': ['title', 'desc', 'video_play_count']},
+    'creators': {'creators': ['sex', 'sign', 'total_fans']},
+    'groups': {'comments': ['comment_id', 'video_id', 'content', 'like_count'],
+               'contents': ['video_id', 'user_id', 'title', 'video_play_count'],
+               'creators': ['user_id', 'nickname', 'total_fans']},
+    'timeseries': {'comments': ['comment_id', 'content', 'like_count', 'create_time']},
+    'charts': {'comments': ['content'], 'contents': ['video_play_count']},
+}
+
+# 情绪得分直方图的等宽分箱数（得分范围 [0, 1]）
+SENTIMENT_BINS = 20
+
+
+# 列式存储的字段类型：计数类字段存为整数，低基数字段存为分类，其余文本列使用字典编码字符串
+NUMERIC_COLUMNS = {
+    'comments': ['create_time', 'like_count', 'sub_comment_count', 'last_modify_ts'],
+    'contents': ['create_time', 'liked_count', 'disliked_count', 'video_play_count', 'video_favorite_count',
+                 'video_share_count', 'video_coin_count', 'video_danmaku', 'video_comment', 'last_modify_ts'],
+    'creators': ['last_modify_ts', 'total_fans', 'total_liked', 'user_rank', 'is_official'],
+}
+CATEGORICAL_COLUMNS = {
+    'comments': ['sex'],
+    'contents': ['video_type', 'source_keyword'],
+    'creators': ['sex'],
+}
+
+# 全部分析阶段用到的字段（STAGE_COLUMNS 的并集），未指定阶段时只加载这些列
+ANALYSIS_COLUMNS = {
+    'comments': ['comment_id', 'video_id', 'user_id', 'content', 'like_count', 'sex', 'create_time'],
+    'contents': ['video_id', 'user_id', 'title', 'desc', 'video_play_count', 'create_time'],
+    'creators': ['user_id', 'nickname', 'sex', 'sign', 'total_fans'],
+}
+
+
+def iter_json_records(file_path, buffer_size=1 << 20):
+    """逐条读取JSON数组或JSON Lines文件中的记录，内存占用与文件大小无关"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buf = f.read(buffer_size)
+        pos = 0
+        while pos < len(buf) and buf[pos].isspace():
+            pos += 1
+
+        # 非数组开头按JSON Lines处理
+        if pos >= len(buf) or buf[pos] != '[':
+            f.seek(0)
+            with jsonlines.Reader(f) as reader:
+                while True:
+                    try:
+                        record = reader.read(type=dict, skip_empty=True)
+                    except EOFError:
+                        return
+                    except jsonlines.InvalidLineError as e:
+                        # 与JSON数组一致：跳过格式错误的行，不丢弃整个文件
+                        print(f"⚠️ 跳过格式错误的记录: {file_path} (第{e.lineno}行)")
+                        continue
+                    yield record
+
+        decoder = json.JSONDecoder()
+        pos += 1
+        while True:
+            # 跳过空白和分隔逗号
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ','):
+                pos += 1
+            if pos >= len(buf):
+                more = f.read(buffer_size)
+                if not more:
+                    raise ValueError(f"JSON数组未正常结束: {file_path}")
+                buf, pos = more, 0
+                continue
+            if buf[pos] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                more = f.read(buffer_size) if _is_truncated(e, buf) else ''
+                if more:
+                    # 记录跨越缓冲区边界，补读后重试
+                    buf, pos = buf[pos:] + more, 0
+                    continue
+                # 记录本身格式错误：跳过整条记录后继续，不再反复补读
+                print(f"⚠️ 跳过格式错误的记录: {file_path} ({e.msg})")
+                buf, pos = _skip_record(f, buf, pos, buffer_size)
+                if buf is None:
+                    raise ValueError(f"JSON数组未正常结束: {file_path}")
+                continue
+            yield record
+            pos = end
+
+
+# 跳过格式错误的记录时需要关注的字符：括号、逗号、引号与转义符
+JSON_STRUCTURE = re.compile(r'[{}\[\],"\\]')
+
+
+def _is_truncated(error, buf):
+    """解析错误是否由缓冲区截断造成：字符串未闭合，或出错位置紧挨缓冲区末尾（被截断的数字、true/false/null）"""
+    return error.msg.startswith('Unterminated string') or error.pos >= len(buf) - 8
+
+
+def _skip_record(f, buf, pos, buffer_size):
+    """从格式错误记录的起点按括号深度跳过整条记录（忽略字符串内的字符），返回新的缓冲区与位置；文件结束时返回 (None, 0)"""
+    depth, in_string, escape_at = 0, False, None
+    while True:
+        for match in JSON_STRUCTURE.finditer(buf, pos):
+            i, ch = match.start(), match.group()
+            if escape_at is not None and i == escape_at + 1:
+                escape_at = None
+                continue
+            escape_at = None
+            if ch == '"':
+                in_string = not in_string
+            elif in_string:
+                if ch == '\\':
+                    escape_at = i
+            elif ch in '{[':
+                depth += 1
+            elif ch == ',':
+                # 不是对象或数组的记录到下一个逗号为止
+                if depth == 0:
+                    return buf, i
+            elif depth > 0:
+                depth -= 1
+                if depth == 0:
+                    return buf, i + 1
+            elif ch == ']':
+                return buf, i
+        # 已扫描的内容直接丢弃；转义符恰在末尾时作用于下一块的首字符
+        escape_at = -1 if escape_at == len(buf) - 1 else None
+        buf, pos = f.read(buffer_size), 0
+        if not buf:
+            return None, 0
+
+
+def chunked(iterable, chunk_size):
+    """按固定大小把任意可迭代对象切分为列表块"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_record_chunks(file_path, chunk_size=50000):
+    """按固定大小分块产出记录列表"""
+    yield from chunked(iter_json_records(file_path), chunk_size)
+
+
+def normalize_columns(df, kind):
+    """把一块原始记录规范为列式存储的类型：数值列转整数，分类列转category，其余转字符串"""
+    numeric = NUMERIC_COLUMNS.get(kind, [])
+    categorical = CATEGORICAL_COLUMNS.get(kind, [])
+    for col in df.columns:
+        if col in numeric:
+            df[col] = pd.to_numeric(df[col], errors='coerce').round().astype('Int64')
+        else:
+            values = df[col].astype(object).where(df[col].notna(), None)
+            df[col] = values.map(lambda v: v if v is None or isinstance(v, str) else str(v)).astype('string')
+            if col in categorical:
+                df[col] = df[col].astype('category')
+    return df
+
+
+def arrow_schema(df, source_stat):
+    """根据第一块数据确定Parquet文件的Arrow schema，并记录源文件大小与修改时间"""
+    fields = []
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            fields.append(pa.field(col, pa.dictionary(pa.int32(), pa.string())))
+        elif str(dtype) == 'Int64':
+            fields.append(pa.field(col, pa.int64()))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    metadata = {'source_size': str(source_stat.st_size), 'source_mtime': str(source_stat.st_mtime)}
+    return pa.schema(fields, metadata=metadata)
+
+
+def parallel_map(func, chunks, workers, initializer=None, initargs=()):
+    """在进程池中按顺序处理各数据块，同时在途的块数有上限；workers<=1 时在当前进程执行"""
+    if workers <= 1:
+        for chunk in chunks:
+            yield func(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(func, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def segment_one(text):
+    """对单条清理后文本分词并标注词性"""
+    import jieba.posseg
+    words = tuple(jieba.cut(text))
+    pairs = tuple((p.word, p.flag) for p in jieba.posseg.cut(text))
+    return words, pairs
+
+
+def score_sentiments(texts):
+    """批量计算SnowNLP情绪得分（可作为子进程任务），空文本或出错时得分为NaN"""
+    from snownlp import SnowNLP
+    scores = np.full(len(texts), np.nan)
+    for i, text in enumerate(texts):
+        if not text or pd.isna(text):
+            continue
+        try:
+            scores[i] = SnowNLP(str(text)).sentiments
+        except Exception:
+            pass
+    return scores
+
+
+def label_sentiments(scores, pos_thres, neg_thres):
+    """按阈值把情绪得分数组映射为标签数组，NaN视为中性"""
+    labels = np.full(len(scores), "中性", dtype=object)
+    labels[scores > pos_thres] = "积极"
+    labels[scores < neg_thres] = "消极"
+    return labels
+
+
+def snownlp_tokens(texts):
+    """按SnowNLP情感模型的方式分词并去停用词（可作为子进程任务），空文本或出错时为None"""
+    from snownlp import normal as snownlp_normal
+    from snownlp import seg as snownlp_seg
+    token_lists = []
+    for text in texts:
+        tokens = None
+        if text and not pd.isna(text):
+            try:
+                tokens = snownlp_normal.filter_stop(snownlp_seg.seg(str(text)))
+            except Exception:
+                pass
+        token_lists.append(tokens)
+    return token_lists
+
+
+class NaiveBayesSentiment:
+    """把SnowNLP的朴素贝叶斯情感模型编译为NumPy对数概率数组，用稀疏矩阵批量打分"""
+
+    def __init__(self, bayes=None):
+        if bayes is None:
+            from snownlp import sentiment as snownlp_sentiment
+            bayes = snownlp_sentiment.classifier.classifier
+        self.classes = list(bayes.d)
+        self.positive_index = self.classes.index('pos')
+
+        # 词表：所有类别出现过的词，最后一列留给未登录词
+        self.vocab = {}
+        for prob in bayes.d.values():
+            for word in prob.d:
+                self.vocab.setdefault(word, len(self.vocab))
+        self.oov_id = len(self.vocab)
+
+        # log P(类别) 与 log P(词|类别)，与 Bayes.classify 的加一平滑一致
+        self.log_prior = np.array([np.log(bayes.d[k].getsum()) - np.log(bayes.total) for k in self.classes])
+        self.log_likelihood = np.empty((self.oov_id + 1, len(self.classes)))
+        for j, k in enumerate(self.classes):
+            prob = bayes.d[k]
+            counts = np.full(self.oov_id + 1, float(prob.none))
+            for word, count in prob.d.items():
+                counts[self.vocab[word]] = count
+            self.log_likelihood[:, j] = np.log(counts / prob.getsum())
+
+    def _count_matrix(self, token_lists):
+        """把分词结果转换为 文档 x 词表 的稀疏计数矩阵"""
+        from scipy import sparse
+        indptr = [0]
+        indices = []
+        for tokens in token_lists:
+            if tokens:
+                indices.extend(self.vocab.get(word, self.oov_id) for word in tokens)
+            indptr.append(len(indices))
+        data = np.ones(len(indices))
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(token_lists), self.oov_id + 1))
+
+    def score(self, token_lists):
+        """批量计算积极概率，结果与 SnowNLP(text).sentiments 一致；token为None的位置为NaN"""
+        log_post = self._count_matrix(token_lists) @ self.log_likelihood + self.log_prior
+        log_post -= log_post.max(axis=1, keepdims=True)
+        posterior = np.exp(log_post)
+        posterior /= posterior.sum(axis=1, keepdims=True)
+
+        # 与 Sentiment.classify 相同：取后验最大的类别，非积极类别时返回 1-概率
+        winner = posterior.argmax(axis=1)
+        win_prob = posterior[np.arange(len(winner)), winner]
+        scores = np.where(winner == self.positive_index, win_prob, 1 - win_prob)
+        scores[np.array([tokens is None for tokens in token_lists], dtype=bool)] = np.nan
+        return scores
+
+
+# 当前进程的 jieba 词典中已加入的自定义词
+_JIEBA_WORDS = set()
+
+
+def load_jieba(custom_words=(), dict_cache=None):
+    """按需导入 jieba 并初始化含自定义词的前缀词典，返回 jieba 模块
+
+    dict_cache 为序列化词典的路径：首次构建（默认词典 + 自定义词）后写为JSON（只含数据，加载时不会执行代码，
+    比 jieba 自带的 marshal 缓存快约3倍），之后的运行和分词子进程直接加载，不再逐词 add_word；
+    词典、自定义词或 jieba 版本变化时自动重建。
+    """
+    import jieba
+    custom_words = [word for word in dict.fromkeys(custom_words) if word not in _JIEBA_WORDS]
+    if not custom_words:
+        return jieba
+    tokenizer = jieba.dt
+    key = None
+    if dict_cache and not tokenizer.initialized:
+        # 默认词典时 dictionary 为 None，用户词典还要比较修改时间
+        dictionary = tokenizer.dictionary
+        mtime = os.path.getmtime(dictionary) if dictionary and os.path.exists(dictionary) else None
+        key = hashlib.sha1(json.dumps([jieba.__version__, dictionary, mtime, sorted(custom_words)],
+                                      ensure_ascii=False).encode('utf-8')).hexdigest()
+        try:
+            with open(dict_cache, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('key') == key and isinstance(cached.get('freq'), dict):
+                with tokenizer.lock:
+                    tokenizer.FREQ, tokenizer.total = cached['freq'], cached['total']
+                    tokenizer.initialized = True
+                _JIEBA_WORDS.update(custom_words)
+                return jieba
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+    for word in custom_words:
+        tokenizer.add_word(word)
+    _JIEBA_WORDS.update(custom_words)
+    if key is not None:
+        try:
+            os.makedirs(os.path.dirname(dict_cache) or '.', exist_ok=True)
+            tmp_path = f"{dict_cache}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'key': key, 'total': tokenizer.total, 'freq': tokenizer.FREQ}, f,
+                          ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, dict_cache)
+        except OSError:
+            pass
+    return jieba
+
+
+def jieba_dict_signature():
+    """jieba 默认词典文件的大小与修改时间，用于缓存指纹；只定位安装目录，不导入 jieba"""
+    spec = importlib.util.find_spec('jieba')
+    if spec is None or not spec.origin:
+        return None
+    path = os.path.join(os.path.dirname(spec.origin), 'dict.txt')
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime]
+
+
+def _init_segment_worker(custom_words, dict_cache=None):
+    """分词子进程初始化：加载含自定义词的词典"""
+    load_jieba(custom_words, dict_cache)
+
+
+def _segment_texts(texts):
+    """分词子进程任务"""
+    return [segment_one(text) for text in texts]
+
+# 文本清理正则（模块加载时编译一次）
+URL_PATTERN = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+# 邮箱与@用户名合并为一次扫描：两者都会删除到空白为止，合并后与先后两次替换的结果完全一致
+MENTION_PATTERN = re.compile(r'\S+@\S+|@[^\s]+')
+TOPIC_PATTERN = re.compile(r'#[^#]+#')
+SHORT_NUMBER_PATTERN = re.compile(r'\b\d{1,3}\b(?!\d)')
+CLEAN_PATTERNS = (URL_PATTERN, MENTION_PATTERN, TOPIC_PATTERN, SHORT_NUMBER_PATTERN)
+
+# 关键词提取允许的词性
+KEYWORD_POS = ('n', 'nr', 'ns', 'nt', 'nz', 'vn', 'an', 'v', 'a', 'nrt')
+KEYWORD_POS_EXTENDED = KEYWORD_POS + ('ad', 'vd')
+
+
+class TokenizedCorpus:
+    """分词缓存：每条文本只分词、词性标注一次，供TF-IDF、TextRank和词频统计复用"""
+
+    # 文本之间的分隔符，与 ' '.join(texts) 后再分词的结果保持一致
+    SEPARATOR = (' ', 'x')
+
+    def __init__(self, words, pairs, weights=None, rows=None):
+        self.words = words  # 每条文本的分词结果
+        self.pairs = pairs  # 每条文本的(词, 词性)序列
+        self.weights = weights  # 每条文本的计数权重，None 表示每条计1次
+        self.rows = rows  # 每条文本在输入列表中的位置（清理后为空的文本不在语料中）
+        self._keyword_stats = None
+        self.tfidf_engines = {}  # 词性集合 -> CorpusTfidf
+
+    @classmethod
+    def from_stats(cls, stats):
+        """只含关键词统计、不保留逐条分词结果的语料（space_saving 模式下按块流式分词得到）"""
+        corpus = cls(None, None)
+        corpus._keyword_stats = stats
+        return corpus
+
+    @property
+    def has_tokens(self):
+        return self.words is not None
+
+    def __len__(self):
+        return len(self.words) if self.has_tokens else len(self._keyword_stats)
+
+    def word_count(self):
+        """扁平词序列长度（含文本间分隔符）"""
+        return sum(len(w) for w in self.words) + max(len(self.words) - 1, 0)
+
+    def iter_words(self):
+        """按顺序产出全部词语，等价于 jieba.lcut(' '.join(texts))"""
+        for i, words in enumerate(self.words):
+            if i:
+                yield self.SEPARATOR[0]
+            yield from words
+
+    def iter_pairs(self):
+        """按顺序产出全部(词, 词性)，等价于 jieba.posseg.cut(' '.join(texts))"""
+        for i, pairs in enumerate(self.pairs):
+            if i:
+                yield self.SEPARATOR
+            yield from pairs
+
+    def keyword_stats(self, term_capacity=None):
+        """本语料的可合并关键词统计，首次调用时构建"""
+        if self._keyword_stats is None:
+            self._keyword_stats = KeywordStats.from_corpus(self, term_capacity)
+        return self._keyword_stats
+
+
+def tfidf_from_pairs(pairs, top_k, allow_pos):
+    """基于已分词结果计算TF-IDF关键词，与 jieba.analyse.extract_tags 结果一致"""
+    return tfidf_from_counts(Counter(pairs), top_k, allow_pos)
+
+
+def default_idf_table():
+    """jieba 自带的通用IDF表，返回 (词 -> IDF, 未登录词的IDF)"""
+    import jieba.analyse
+    extractor = jieba.analyse.default_tfidf
+    return extractor.idf_freq, extractor.median_idf
+
+
+def tfidf_from_counts(pair_counts, top_k, allow_pos, idf_table=None):
+    """基于 {(词, 词性): 次数} 计数表计算TF-IDF关键词，计数表可由多批语料相加合并
+
+    idf_table 为 (词 -> IDF, 未登录词的IDF)，默认使用 jieba 通用IDF表。
+    """
+    import jieba.analyse
+    extractor = jieba.analyse.default_tfidf
+    idf_freq, default_idf = idf_table or default_idf_table()
+    allow_pos = frozenset(allow_pos)
+    stop_words = extractor.stop_words
+    freq = {}
+    for (word, flag), count in pair_counts.items():
+        if flag not in allow_pos:
+            continue
+        if len(word.strip()) < 2 or word.lower() in stop_words:
+            continue
+        freq[word] = freq.get(word, 0.0) + count
+    total = sum(freq.values())
+    for word in freq:
+        freq[word] *= idf_freq.get(word, default_idf) / total
+    return sorted(freq.items(), key=itemgetter(1), reverse=True)[:top_k]
+
+
+def textrank_from_pairs(pairs, top_k, allow_pos):
+    """基于已分词结果计算TextRank关键词，与 jieba.analyse.textrank 结果一致"""
+    return textrank_from_cooccurrence(cooccurrence_counts(pairs, allow_pos), top_k, allow_pos)
+
+
+def cooccurrence_counts(pairs, allow_pos):
+    """统计TextRank窗口内候选词的共现次数，键为 (词1, 词性1, 词2, 词性2)，计数表可相加合并"""
+    import jieba.analyse
+    extractor = jieba.analyse.default_textrank
+    allow_pos = frozenset(allow_pos)
+    stop_words = extractor.stop_words
+    words = tuple(pairs)
+    keep = [flag in allow_pos and len(word.strip()) >= 2 and word.lower() not in stop_words
+            for word, flag in words]
+    cm = Counter()
+    for i, (word, flag) in enumerate(words):
+        if not keep[i]:
+            continue
+        for j in range(i + 1, min(i + extractor.span, len(words))):
+            if keep[j]:
+                cm[(word, flag) + words[j]] += 1
+    return cm
+
+
+def textrank_from_cooccurrence(cooccurrence, top_k, allow_pos):
+    """在（可能由多个分片合并的）共现图上计算TextRank，只保留两端词性都在 allow_pos 中的边"""
+    from jieba.analyse.textrank import UndirectWeightedGraph
+    allow_pos = frozenset(allow_pos)
+    cm = {}
+    for (word1, flag1, word2, flag2), count in cooccurrence.items():
+        if flag1 in allow_pos and flag2 in allow_pos:
+            cm[(word1, word2)] = cm.get((word1, word2), 0) + count
+
+    graph = UndirectWeightedGraph()
+    for terms, weight in cm.items():
+        graph.addEdge(terms[0], terms[1], weight)
+    nodes_rank = graph.rank()
+    return sorted(nodes_rank.items(), key=itemgetter(1), reverse=True)[:top_k]
+
+
+class KeywordStats:
+    """可合并的关键词统计：词频、(词, 词性)频次、文档频率和共现图
+
+    各分片（如按天、按机器）可独立统计后 merge，再在合并结果上计算TF-IDF、词频和TextRank排名。
+    """
+
+    # 只为关键词候选词性保存词性频次与共现，覆盖 KEYWORD_POS 与 KEYWORD_POS_EXTENDED
+    ALLOW_POS = KEYWORD_POS_EXTENDED
+
+    def __init__(self, term_capacity=None):
+        self.documents = 0
+        self.total_words = 0  # 扁平词序列长度（含文本间分隔符），作为词频归一化分母
+        # 指定 term_capacity 时四张计数表都改用同样容量的 Space-Saving 近似计数，内存固定
+        self.term_freq = self._new_counts(term_capacity)
+        self.pos_freq = self._new_counts(term_capacity)  # (词, 词性) -> 次数
+        self.doc_freq = self._new_counts(term_capacity)
+        self.cooccurrence = self._new_counts(term_capacity)  # (词1, 词性1, 词2, 词性2) -> 窗口内共现次数
+
+    @staticmethod
+    def _new_counts(capacity):
+        return SpaceSaving(capacity) if capacity else Counter()
+
+    @classmethod
+    def from_corpus(cls, corpus, term_capacity=None):
+        stats = cls(term_capacity)
+        stats.add_corpus(corpus)
+        return stats
+
+    def __len__(self):
+        return self.documents
+
+    def add_corpus(self, corpus):
+        """累加一批分词结果"""
+        if not len(corpus):
+            return self
+        allow_pos = frozenset(self.ALLOW_POS)
+        # 与已有语料之间相当于多一个分隔符，保证总词数与整体分词一致
+        if corpus.weights is not None:
+            return self._add_weighted(corpus, allow_pos)
+        if self.documents:
+            self.total_words += 1
+        self.total_words += corpus.word_count()
+        self.documents += len(corpus)
+        for words in corpus.words:
+            words = [w for w in words if w.strip()]
+            self.term_freq.update(words)
+            self.doc_freq.update(set(words))
+        for pairs in corpus.pairs:
+            self.pos_freq.update([pair for pair in pairs if pair[1] in allow_pos])
+        self._add_mapping(self.cooccurrence, cooccurrence_counts(corpus.iter_pairs(), self.ALLOW_POS), 1)
+        return self
+
+    def _add_weighted(self, corpus, allow_pos):
+        """按每条文本的权重累加计数；共现只在文本内部统计，总词数为加权词数"""
+        self.documents += len(corpus)
+        for words, pairs, weight in zip(corpus.words, corpus.pairs, corpus.weights):
+            weight = float(weight)
+            self.total_words += len(words) * weight
+            words = [w for w in words if w.strip()]
+            self._add_counts(self.term_freq, words, weight)
+            self._add_counts(self.doc_freq, set(words), weight)
+            self._add_counts(self.pos_freq, [pair for pair in pairs if pair[1] in allow_pos], weight)
+            self._add_mapping(self.cooccurrence, cooccurrence_counts(pairs, self.ALLOW_POS), weight)
+        return self
+
+    @staticmethod
+    def _add_counts(counts, words, weight):
+        if isinstance(counts, SpaceSaving):
+            counts.update(words, weight)
+        else:
+            for word in words:
+                counts[word] += weight
+
+    @staticmethod
+    def _add_mapping(counts, mapping, weight):
+        """把一份 {键: 次数} 计数表按 weight 倍累加进精确计数表或 Space-Saving 摘要"""
+        if isinstance(counts, SpaceSaving):
+            counts.update_counts(mapping, weight)
+        elif weight == 1:
+            counts.update(mapping)
+        else:
+            for key, count in mapping.items():
+                counts[key] += count * weight
+
+    def merge(self, other):
+        """合并另一分片的统计（分片边界处跨文本的共现不计入）"""
+        if not other.documents:
+            return self
+        if self.documents:
+            self.total_words += 1
+        self.total_words += other.total_words
+        self.documents += other.documents
+        self.term_freq = self._merge_counts(self.term_freq, other.term_freq)
+        self.pos_freq = self._merge_counts(self.pos_freq, other.pos_freq)
+        self.doc_freq = self._merge_counts(self.doc_freq, other.doc_freq)
+        self.cooccurrence = self._merge_counts(self.cooccurrence, other.cooccurrence)
+        return self
+
+    @staticmethod
+    def _merge_counts(mine, theirs):
+        """合并精确计数表或 Space-Saving 摘要，任一方为近似计数时结果也为近似计数"""
+        if isinstance(mine, SpaceSaving):
+            return mine.merge(theirs)
+        if isinstance(theirs, SpaceSaving):
+            return SpaceSaving(theirs.capacity).merge(mine).merge(theirs)
+        mine.update(theirs)
+        return mine
+
+    def frequency_error(self):
+        """词频的最大高估量：精确计数时为0"""
+        return self.term_freq.floor() if isinstance(self.term_freq, SpaceSaving) else 0
+
+    def tfidf(self, top_k, allow_pos, idf_table=None):
+        return tfidf_from_counts(self.pos_freq, top_k, allow_pos, idf_table)
+
+    def idf_table(self):
+        """由文档频率得到的语料IDF（与 scikit-learn smooth_idf 公式一致），返回 (词 -> IDF, 未登录词的IDF)"""
+        words = [word for word, _ in self.doc_freq.items()]
+        if not words:
+            return {}, 0.0
+        doc_freq = np.array([count for _, count in self.doc_freq.items()], dtype=float)
+        idf = np.log((1.0 + self.documents) / (1.0 + doc_freq)) + 1.0
+        return dict(zip(words, idf.tolist())), float(np.median(idf))
+
+    def textrank(self, top_k, allow_pos):
+        return textrank_from_cooccurrence(self.cooccurrence, top_k, allow_pos)
+
+    def frequency(self, top_k, word_filter):
+        """过滤后的高频词及其相对词频"""
+        word_freq = word_filter.filter_counts(self.term_freq)
+        return [(word, freq/self.total_words) for word, freq in word_freq.most_common(top_k)]
+
+    def to_dict(self):
+        """序列化为JSON兼容的字典"""
+        return {
+            'documents': self.documents,
+            'total_words': self.total_words,
+            'term_freq': self._dump_counts(self.term_freq),
+            'pos_freq': self._dump_keyed(self.pos_freq),
+            'doc_freq': self._dump_counts(self.doc_freq),
+            'cooccurrence': self._dump_keyed(self.cooccurrence),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.documents = data.get('documents', 0)
+        stats.total_words = data.get('total_words', 0)
+        stats.term_freq = cls._load_counts(data.get('term_freq', {}))
+        stats.pos_freq = cls._load_keyed(data.get('pos_freq', []))
+        stats.doc_freq = cls._load_counts(data.get('doc_freq', {}))
+        stats.cooccurrence = cls._load_keyed(data.get('cooccurrence', []))
+        return stats
+
+    @staticmethod
+    def _dump_counts(counts):
+        if isinstance(counts, SpaceSaving):
+            return {'space_saving': counts.to_dict()}
+        return dict(counts)
+
+    @staticmethod
+    def _load_counts(data):
+        if 'space_saving' in data:
+            return SpaceSaving.from_dict(data['space_saving'])
+        return Counter(data)
+
+    @staticmethod
+    def _dump_keyed(counts):
+        """元组键的计数表：精确计数存为 [键..., 次数] 列表"""
+        if isinstance(counts, SpaceSaving):
+            return {'space_saving': counts.to_dict()}
+        return [list(key) + [count] for key, count in counts.items()]
+
+    @staticmethod
+    def _load_keyed(data):
+        if isinstance(data, dict):
+            return SpaceSaving.from_dict(data['space_saving'])
+        return Counter({tuple(item[:-1]): item[-1] for item in data})
+
+
+def doc_term_matrix(pair_lists, word_filter, allow_pos=KEYWORD_POS):
+    """把每条文本的(词, 词性)序列转换为文档-词频稀疏矩阵，只保留关键词候选词，返回 (矩阵, 词表)"""
+    import jieba.analyse
+    from scipy import sparse
+    allow_pos = frozenset(allow_pos)
+    stop_words = jieba.analyse.default_tfidf.stop_words
+    vocabulary = {}
+    indices = []
+    indptr = [0]
+    for pairs in pair_lists:
+        for word, flag in pairs:
+            if flag not in allow_pos or len(word.strip()) < 2 or word.lower() in stop_words:
+                continue
+            index = vocabulary.get(word)
+            if index is None:
+                if not word_filter(word):
+                    continue
+                index = vocabulary[word] = len(vocabulary)
+            indices.append(index)
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix((np.ones(len(indices)), np.array(indices, dtype=np.int64), np.array(indptr)),
+                               shape=(len(indptr) - 1, len(vocabulary)))
+    matrix.sum_duplicates()
+    return matrix, list(vocabulary)
+
+
+def group_term_counts(matrix, group_codes, n_groups, weights=None):
+    """按分组（组号为-1的行忽略）汇总文档-词频矩阵，返回 分组×词 的稀疏计数矩阵；weights 为每行的计数权重"""
+    from scipy import sparse
+    docs = np.flatnonzero(group_codes >= 0)
+    values = np.ones(len(docs)) if weights is None else np.asarray(weights, dtype=float)[docs]
+    membership = sparse.csr_matrix((values, (group_codes[docs], docs)),
+                                   shape=(n_groups, matrix.shape[0]))
+    return (membership @ matrix).tocsr()
+
+
+def group_top_terms(matrix, vocabulary, group_codes, n_groups, top_k, weights=None, idf_table=None):
+    """按分组汇总文档-词频矩阵，用TF-IDF（默认 jieba IDF表）为每组取前 top_k 个词，全程为稀疏矩阵运算"""
+    from scipy import sparse
+    top_terms = [[] for _ in range(n_groups)]
+    if not vocabulary:
+        return top_terms
+    group_terms = group_term_counts(matrix, group_codes, n_groups, weights)
+    idf_freq, default_idf = idf_table or default_idf_table()
+    idf = np.array([idf_freq.get(word, default_idf) for word in vocabulary])
+    totals = np.asarray(group_terms.sum(axis=1)).ravel()
+    totals[totals == 0] = 1
+    weights = sparse.diags(1.0 / totals) @ group_terms @ sparse.diags(idf)
+    weights = weights.tocsr()
+    weights.sort_indices()
+
+    # 每行按权重降序排序后，取行内排名小于 top_k 的元素
+    rows = np.repeat(np.arange(n_groups), np.diff(weights.indptr))
+    order = np.lexsort((-weights.data, rows))
+    rank = np.arange(len(order)) - weights.indptr[rows[order]]
+    selected = order[rank < top_k]
+    vocabulary = np.array(vocabulary, dtype=object)
+    for row, word, weight in zip(rows[selected], vocabulary[weights.indices[selected]], weights.data[selected]):
+        top_terms[row].append((word, float(weight)))
+    return top_terms
+
+
+def top_k_terms(scores, vocabulary, top_k):
+    """用 argpartition 取分数最高的 top_k 个词（只对这 k 个排序，同分按词表顺序）"""
+    candidates = np.flatnonzero(scores > 0)
+    if top_k <= 0 or not len(candidates):
+        return []
+    if len(candidates) > top_k:
+        candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+    order = candidates[np.lexsort((candidates, -scores[candidates]))]
+    return [(vocabulary[i], float(scores[i])) for i in order]
+
+
+class CorpusTfidf:
+    """语料自身的稀疏TF-IDF：逐条文本构建文档-词频矩阵，在语料上学习IDF
+
+    每条文本单独计算 TF-IDF（L2 归一化），任意行子集（某视频、某天的评论）的关键词为这些行的均值；
+    学到的IDF表可保存为JSON，后续运行直接加载复用。
+    """
+
+    def __init__(self, matrix, vocabulary, idf=None, sublinear_tf=True, doc_weights=None):
+        from sklearn.feature_extraction.text import TfidfTransformer
+        transformer = TfidfTransformer(sublinear_tf=sublinear_tf)
+        if idf is None:
+            transformer.fit(matrix)
+        else:
+            transformer.idf_ = idf
+        self.vocabulary = vocabulary
+        self.idf = transformer.idf_
+        self.documents = matrix.shape[0]
+        self.weights = transformer.transform(matrix).tocsr()  # 文档×词 的 TF-IDF 矩阵
+        self.doc_weights = None if doc_weights is None else np.asarray(doc_weights, dtype=float)
+
+    @classmethod
+    def from_corpus(cls, corpus, word_filter, allow_pos, idf_table=None, sublinear_tf=True):
+        """用分词缓存构建文档-词频矩阵；传入 idf_table 时使用已学到的IDF，不再重新学习"""
+        matrix, vocabulary = doc_term_matrix(corpus.pairs, word_filter, allow_pos)
+        idf = None
+        if idf_table is not None:
+            idf_freq, default_idf = idf_table
+            idf = np.array([idf_freq.get(word, default_idf) for word in vocabulary], dtype=float)
+        return cls(matrix, vocabulary, idf, sublinear_tf, corpus.weights)
+
+    def top_terms(self, top_k, rows=None):
+        """rows 为行号数组或布尔掩码时只统计这些文本；文本带权重时按权重加权平均"""
+        weights = self.weights if rows is None else self.weights[rows]
+        if not weights.shape[0]:
+            return []
+        if self.doc_weights is None:
+            scores = np.asarray(weights.mean(axis=0)).ravel()
+        else:
+            doc_weights = self.doc_weights if rows is None else self.doc_weights[rows]
+            scores = weights.T @ doc_weights / (doc_weights.sum() or 1.0)
+        return top_k_terms(scores, self.vocabulary, top_k)
+
+    def idf_table(self):
+        """(词 -> IDF, 未登录词的IDF)，未登录词取中位数，与 jieba 的处理一致"""
+        default_idf = float(np.median(self.idf)) if len(self.idf) else 0.0
+        return dict(zip(self.vocabulary, self.idf.tolist())), default_idf
+
+    def save_idf(self, path):
+        """原子写入IDF表"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        idf_freq, default_idf = self.idf_table()
+        data = {'documents': self.documents, 'default_idf': default_idf, 'idf': idf_freq,
+                'updated_at': datetime.now().isoformat()}
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load_idf(path):
+        """读取保存的IDF表，返回 (词 -> IDF, 未登录词的IDF)；文件不存在或损坏时返回 None"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data['idf'], data['default_idf']
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def hour_buckets(create_times, timezone):
+    """把 create_time（Unix 秒，毫秒时间戳自动换算）向量化转换为本地时区的整点时间，缺失为NaT"""
+    values = pd.to_numeric(pd.Series(create_times), errors='coerce').to_numpy(dtype=float)
+    values = np.where(values > 1e11, values / 1000, values)
+    timestamps = pd.to_datetime(pd.Series(values), unit='s', utc=True)
+    return timestamps.dt.tz_convert(timezone).dt.floor('h')
+
+
+def bucket_digests(df, codes, n_buckets):
+    """每个时间桶成员记录（评论ID、内容、点赞数）的指纹，桶内任何记录变化都会改变指纹"""
+    columns = [c for c in ('comment_id', 'content', 'like_count') if c in df.columns]
+    hashes = pd.util.hash_pandas_object(df[columns].astype(str), index=False).to_numpy()
+    present = np.flatnonzero(codes >= 0)
+    order = present[np.argsort(codes[present], kind='stable')]
+    sorted_codes = codes[order]
+    counts = np.bincount(sorted_codes, minlength=n_buckets)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    digests = np.zeros(n_buckets, dtype=np.uint64)
+    nonempty = counts > 0
+    if nonempty.any():
+        digests[nonempty] = np.bitwise_xor.reduceat(hashes[order], starts[nonempty])
+    return [f"{count}:{digest:016x}" for count, digest in zip(counts.tolist(), digests.tolist())]
+
+
+def period_label(hour_key, granularity):
+    """由整点桶键（YYYY-MM-DDTHH:00）得到所属 小时/天/ISO周 的标签"""
+    if granularity == 'hour':
+        return hour_key
+    day = hour_key[:10]
+    if granularity == 'day':
+        return day
+    year, week, _ = datetime.fromisoformat(day).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def rollup_buckets(hour_records, granularity, top_k, idf_table=None):
+    """把可合并的整点桶聚合汇总到 小时/天/周，并按TF-IDF（默认 jieba IDF表）给出各时间段的关键词"""
+    idf_freq, default_idf = idf_table or default_idf_table()
+    periods = {}
+    for hour_key in sorted(hour_records):
+        record = hour_records[hour_key]
+        label = period_label(hour_key, granularity)
+        period = periods.get(label)
+        if period is None:
+            period = periods[label] = {'count': 0, 'likes': 0.0, 'scored': 0, 'score_sum': 0.0,
+                                       'positive': 0, 'neutral': 0, 'negative': 0, 'terms': Counter()}
+        for field in ('count', 'likes', 'scored', 'score_sum', 'positive', 'neutral', 'negative'):
+            period[field] += record[field]
+        period['terms'].update(record['terms'])
+
+    series = []
+    for label, period in periods.items():
+        terms = period.pop('terms')
+        total = sum(terms.values()) or 1
+        weights = {word: count / total * idf_freq.get(word, default_idf) for word, count in terms.items()}
+        period['avg_sentiment'] = period['score_sum'] / period['scored'] if period['scored'] else None
+        period['keywords'] = heapq.nlargest(top_k, weights.items(), key=itemgetter(1))
+        series.append({'bucket': label, **period})
+    return series
+
+
+class WordFilter:
+    """有意义词过滤器：停用词、网络用语和单字白名单在构建时确定，每个词的判定结果缓存复用"""
+
+    # 有意义的单字
+    MEANINGFUL_SINGLE_CHARS = frozenset({
+        '中', '美', '日', '韩', '欧', '俄', '印', '英', '法', '德', '澳',
+        '钱', '房', '车', '股', '债', '金', '银', '油', '气', '煤', '铁',
+        '工', '农', '商', '学', '医', '法', '理', '文', '史', '哲'
+    })
+
+    # 明显的网络用语（减少数量）
+    INTERNET_SLANG = frozenset({
+        'hhh', 'hhhh', 'emmm', 'awsl', 'orz', 'qaq', 'tql', 'yyds',
+        '绝绝子', '爱了爱了', '冲冲冲', '杀杀杀', '呜呜呜', '嘤嘤嘤',
+        '笑哭', '捂脸', '狗头', '滑稽'
+    })
+
+    def __init__(self, stop_words):
+        self.stop_words = frozenset(stop_words)
+        self._verdicts = {}
+
+    def __call__(self, word):
+        verdict = self._verdicts.get(word)
+        if verdict is None:
+            verdict = self._verdicts[word] = self._judge(word)
+        return verdict
+
+    def filter_counts(self, counts):
+        """批量过滤词频表（保留长度大于1的有意义词），每个不同的词只判定一次"""
+        return Counter({word: count for word, count in counts.items() if len(word) > 1 and self(word)})
+
+    def _judge(self, word):
+        """判断词语是否有意义 - 放宽条件"""
+        # 长度过滤 - 放宽到1个字符也可以（如"美"、"中"等）
+        if len(word) < 1:
+            return False
+        
+        # 对于单字符，只保留有意义的
+        if len(word) == 1:
+            return word in self.MEANINGFUL_SINGLE_CHARS
+        
+        # 停用词过滤
+        lowered = word.lower()
+        if lowered in self.stop_words:
+            return False
+        
+        # 纯数字过滤（但保留年份等）
+        if word.isdigit():
+            # 保留年份
+            if len(word) == 4 and word.startswith(('19', '20')):
+                return True
+            # 保留大额数字（可能是金额、播放量等）
+            if len(word) >= 4:
+                return True
+            return False
+        
+        # 重复字符过滤（如：哈哈哈、呵呵呵）
+        if len(set(word)) == 1 and len(word) > 2:
+            return False
+        
+        # 明显的网络用语过滤
+        if lowered in self.INTERNET_SLANG:
+            return False
+        
+        return True
+
+
+def discover_data_files(data_dir='data'):
+    """扫描目录中按日期命名的数据文件，返回按日期排序的 [(日期, {类型: 路径})]"""
+    by_date = defaultdict(dict)
+    if os.path.isdir(data_dir):
+        for name in sorted(os.listdir(data_dir)):
+            match = DATED_FILE_PATTERN.match(name)
+            if match:
+                by_date[match.group(2)][match.group(1)] = os.path.join(data_dir, name)
+    return sorted(by_date.items())
+
+
+def resolve_input_files(patterns, since=None, until=None):
+    """展开输入文件通配符，按文件名识别数据类型，返回 {类型: [路径]}
+
+    文件名带日期（search_*_YYYY-MM-DD.json）时只保留 [since, until] 内的文件；指定了日期范围时跳过不带日期的文件。
+    """
+    data_files = defaultdict(list)
+    for pattern in patterns:
+        paths = sorted(glob.glob(pattern))
+        if not paths:
+            print(f"⚠️ 没有匹配的输入文件: {pattern}")
+        for path in paths:
+            name = os.path.basename(path)
+            match = DATED_FILE_PATTERN.match(name)
+            if match:
+                kind, date = match.groups()
+            else:
+                kind_match = INPUT_KIND_PATTERN.search(name)
+                kind, date = (kind_match.group(1) if kind_match else None), None
+            if kind is None:
+                print(f"⚠️ 无法从文件名判断数据类型，已跳过: {path}")
+                continue
+            if since or until:
+                if date is None:
+                    print(f"⚠️ 文件名不含日期，不在日期范围内处理: {path}")
+                    continue
+                if (since and date < since) or (until and date > until):
+                    continue
+            if path not in data_files[kind]:
+                data_files[kind].append(path)
+    return dict(data_files)
+
+
+def data_file_paths(data_files, kind):
+    """某类数据的文件列表，data_files 中的值可以是单个路径或路径列表"""
+    paths = (data_files or DATA_FILES).get(kind) or []
+    return [paths] if isinstance(paths, str) else list(paths)
+
+
+def value_counter(series, fill_missing=True):
+    """把一列数值转换为 {取值: 次数} 计数表（缺失记为0或忽略），计数表可直接相加合并"""
+    values = pd.to_numeric(pd.Series(series), errors='coerce')
+    values = (values.fillna(0) if fill_missing else values.dropna()).astype(np.int64)
+    return Counter({str(value): int(count) for value, count in values.value_counts().items()})
+
+
+def label_counts(series):
+    """分类列的 {取值: 次数}，按次数降序，不含次数为0的类别；列不存在（None）时为空"""
+    if series is None:
+        return {}
+    return {str(value): int(count) for value, count in series.value_counts().items() if count}
+
+
+def counter_stats(counter):
+    """由 {取值: 次数} 计数表计算均值、最大值、最小值和中位数"""
+    if not counter:
+        return {'mean': 0.0, 'max': 0.0, 'min': 0.0, 'median': 0.0}
+    values = np.array([float(value) for value in counter.keys()])
+    counts = np.array(list(counter.values()), dtype=np.int64)
+    order = np.argsort(values)
+    values, counts = values[order], counts[order]
+    cumulative = np.cumsum(counts)
+    total = cumulative[-1]
+    lower = values[np.searchsorted(cumulative, (total - 1) // 2, side='right')]
+    upper = values[np.searchsorted(cumulative, total // 2, side='right')]
+    return {
+        'mean': float((values * counts).sum() / total),
+        'max': float(values[-1]),
+        'min': float(values[0]),
+        'median': float((lower + upper) / 2),
+    }
+
+
+def sentiment_histogram(scores, weights=None):
+    """情绪得分在 [0, 1] 上的等宽直方图，传入 weights 时为加权计数"""
+    counts, _ = np.histogram(np.clip(scores, 0.0, 1.0), bins=SENTIMENT_BINS, range=(0.0, 1.0), weights=weights)
+    return counts.tolist()
+
+
+def score_summary(scores):
+    """情绪得分数组的条数、均值、标准差、最小/最大值与四分位数"""
+    scores = np.asarray(scores, dtype=float)
+    scores = scores[~np.isnan(scores)]
+    if not len(scores):
+        return {'count': 0}
+    p25, median, p75 = np.percentile(scores, [25, 50, 75])
+    return {
+        'count': int(len(scores)),
+        'mean': float(scores.mean()),
+        'std': float(scores.std()),
+        'min': float(scores.min()),
+        'p25': float(p25),
+        'median': float(median),
+        'p75': float(p75),
+        'max': float(scores.max()),
+    }
+
+
+# 结果中的逐条得分数组：(分析部分, 键)，output.score_arrays 为 npy 时写为 .npy 旁路文件
+SCORE_ARRAYS = (('comment_analysis', 'sentiment_scores'), ('content_analysis', 'title_sentiment_scores'))
+
+
+def load_analysis_results(path):
+    """读取 analysis_results.json，把 .npy 旁路文件中的逐条得分数组读回原来的键"""
+    with open(path, 'r', encoding='utf-8') as f:
+        results = json.load(f)
+    for section, key in SCORE_ARRAYS:
+        analysis = results.get(section) or {}
+        if key + '_file' in analysis:
+            analysis[key] = np.load(os.path.join(os.path.dirname(path), analysis[key + '_file']))
+    return results
+
+
+LIKE_WEIGHT_FUNCTIONS = ('log', 'capped', 'raw')
+
+
+def like_weights(like_counts, function='log', cap=1000):
+    """把点赞数换算为计数权重（不小于1）：log 为 1+ln(1+点赞)，capped 为 1+min(点赞, cap)，raw 为 1+点赞"""
+    likes = np.clip(np.nan_to_num(np.asarray(like_counts, dtype=float)), 0.0, None)
+    if function == 'log':
+        return 1.0 + np.log1p(likes)
+    if function == 'capped':
+        return 1.0 + np.minimum(likes, cap)
+    if function == 'raw':
+        return 1.0 + likes
+    raise ValueError(f"未知的点赞加权方式: {function}")
+
+
+class IncrementalState:
+    """增量分析的持久化状态：已处理文件、已见记录ID，以及可合并的计数表、情绪直方图和词频"""
+
+    # 状态文件格式版本，格式变化后旧状态自动重建
+    VERSION = 3
+
+    def __init__(self, fingerprint=None, term_capacity=None):
+        self.fingerprint = fingerprint
+        self.term_capacity = term_capacity
+        self.files = {}  # 已处理文件 -> [大小, 修改时间]
+        self.seen = {kind: set() for kind in RECORD_KEYS}
+        self.comments = {
+            'total': 0,
+            'valid': 0,
+            'lengths': Counter(),
+            'likes': Counter(),
+            'sex': Counter(),
+            'sentiment': Counter(),
+            'sentiment_histogram': [0] * SENTIMENT_BINS,
+            'sentiment_sum': 0.0,
+            'keywords': KeywordStats(term_capacity),
+        }
+        self.contents = {
+            'total': 0,
+            'play_counts': Counter(),
+            'title_sentiment': Counter(),
+            'title_sentiment_histogram': [0] * SENTIMENT_BINS,
+            'title_keywords': KeywordStats(term_capacity),
+            'desc_keywords': KeywordStats(term_capacity),
+        }
+        self.creators = {
+            'total': 0,
+            'sex': Counter(),
+            'fans': Counter(),
+            'sign_keywords': KeywordStats(term_capacity),
+        }
+
+    @classmethod
+    def load(cls, path, fingerprint, term_capacity=None):
+        """读取状态文件；不存在或配置指纹不一致时返回空状态（重新全量构建）"""
+        state = cls(fingerprint, term_capacity)
+        if not os.path.exists(path):
+            return state
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if (data.get('fingerprint') != fingerprint or data.get('version') != cls.VERSION
+                or data.get('term_capacity') != term_capacity):
+            print("⚠️ 增量状态与当前配置不一致，将重新处理全部数据文件")
+            return state
+        state.files = data.get('files', {})
+        state.seen = {kind: set(data.get('seen', {}).get(kind, [])) for kind in RECORD_KEYS}
+        for section in ('comments', 'contents', 'creators'):
+            cls._restore(getattr(state, section), data.get(section, {}))
+        return state
+
+    @staticmethod
+    def _restore(target, data):
+        """按默认结构还原计数表与关键词统计的类型"""
+        for key, default in target.items():
+            if key not in data:
+                continue
+            if isinstance(default, KeywordStats):
+                target[key] = KeywordStats.from_dict(data[key])
+            elif isinstance(default, Counter):
+                target[key] = Counter(data[key])
+            else:
+                target[key] = data[key]
+
+    @staticmethod
+    def _dump(section):
+        return {key: value.to_dict() if isinstance(value, KeywordStats) else value
+                for key, value in section.items()}
+
+    def save(self, path):
+        """原子写入状态文件"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        data = {
+            'version': self.VERSION,
+            'fingerprint': self.fingerprint,
+            'term_capacity': self.term_capacity,
+            'updated_at': datetime.now().isoformat(),
+            'files': self.files,
+            'seen': {kind: sorted(ids) for kind, ids in self.seen.items()},
+            'comments': self._dump(self.comments),
+            'contents': self._dump(self.contents),
+            'creators': self._dump(self.creators),
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _file_signature(path):
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime]
+
+    def is_processed(self, path):
+        """文件是否已处理且之后未被修改"""
+        return self.files.get(path) == self._file_signature(path)
+
+    def mark_processed(self, path):
+        self.files[path] = self._file_signature(path)
+
+    def take_unseen(self, kind, df):
+        """筛选出未处理过的记录（按主键去重）并登记其ID"""
+        key = RECORD_KEYS[kind]
+        if key not in df.columns:
+            return df
+        ids = df[key].astype(str)
+        fresh = ~ids.isin(self.seen[kind]) & ~ids.duplicated()
+        self.seen[kind].update(ids[fresh])
+        return df[fresh.to_numpy()]
+
 
 class BilibiliTextAnalyzer:
     def __init__(self, config_path="config.yaml"):
@@ -28,9 +1278,47 @@ class BilibiliTextAnalyzer:
   
         # 精简停用词列表，保留更多有意义词汇
         self.stop_words = self._load_stop_words()
+        self.word_filter = WordFilter(self.stop_words)
 
-        # 添加自定义词典
-        self._add_custom_words()
+        # 自定义词典在首次分词时随 jieba 一起加载
+        self._jieba_ready = False
+
+        # 分词缓存：清理后文本 -> (词序列, 词性序列)
+        self._segment_cache = {}
+
+        # 情绪阈值只读取一次
+        self.positive_threshold = self.config.get("analysis", {}).get("positive_threshold", 0.6)
+        self.negative_threshold = self.config.get("analysis", {}).get("negative_threshold", 0.4)
+
+        # 向量化情感模型，首次使用时构建
+        self._nb_model = None
+
+        # 持久化缓存，首次使用时打开
+        self._cache = None
+
+        # 各分析阶段共享的类型化DataFrame，以及由其派生的全量评论情绪、词频矩阵
+        self._frames = {}
+        self._comment_views = {}
+        # 近似重复检测为 downweight 模式时各评论的计数权重（按评论DataFrame索引）
+        self._comment_weights = None
+        # corpus TF-IDF 引擎在评论语料上学到的IDF表
+        self._comment_idf = None
+
+        # 输出目录（命令行 --output-dir 可覆盖）
+        self.results_dir = (self.config.get("output", {}) or {}).get("results_dir", "results")
+
+        # 图表渲染（visualization.render_workers > 1 时在子进程中并行渲染，为0时使用全部CPU核心）
+        render_workers = (self.config.get("visualization", {}) or {}).get("render_workers", 1)
+        self.renderer = ChartRenderer(int(render_workers or os.cpu_count() or 1))
+        self._font_warned = False
+        self._missing_warned = set()
+
+        # 分阶段性能记录
+        profiling_cfg = self.config.get("profiling", {}) or {}
+        self.profiler = StageProfiler(
+            enabled=profiling_cfg.get("enabled", True),
+            cprofile_dir=profiling_cfg.get("cprofile_dir", "results/profiles") if profiling_cfg.get("cprofile", False) else None,
+        )
 
     def _load_config(self, config_path):
         """加载配置文件"""
@@ -72,8 +1360,8 @@ class BilibiliTextAnalyzer:
         
         return basic_stop_words
     
-    def _add_custom_words(self):
-        """添加自定义词典"""
+    def _custom_words(self):
+        """自定义词典词汇"""
         # 经济金融相关专业词汇
         economic_words = [
             '宏观经济', '微观经济', '货币政策', '财政政策', '通胀', '通缩', 'GDP',
@@ -98,19 +1386,213 @@ class BilibiliTextAnalyzer:
             '老龄化', '少子化', '人口红利', '产业转型', '数字经济'
         ]
         
-        # 添加到jieba词典
-        for word in economic_words + bilibili_words + social_economic_words:
-            jieba.add_word(word)
+        return economic_words + bilibili_words + social_economic_words
+
+    def _jieba_dict_cache(self):
+        """序列化的 jieba 词典（含自定义词）保存路径，留空则每次运行重新添加自定义词"""
+        return (self.config.get("cache", {}) or {}).get("jieba_dict", "cache/jieba_dict.json") or None
+
+    def _add_custom_words(self):
+        """添加自定义词典：首次分词前导入 jieba 并加载含自定义词的词典"""
+        if not self._jieba_ready:
+            load_jieba(self._custom_words(), self._jieba_dict_cache())
+            self._jieba_ready = True
+
+    def _parallel_config(self):
+        """读取并行配置，返回 (进程数, 每块条数)"""
+        parallel_cfg = self.config.get("analysis", {}).get("parallel", {}) or {}
+        workers = parallel_cfg.get("workers", 1) or os.cpu_count() or 1
+        chunk_size = parallel_cfg.get("chunk_size", 2000)
+        return int(workers), int(chunk_size)
     
-    def load_data(self):
-        """加载数据"""
+    def _cache_fingerprint(self):
+        """影响缓存内容的配置指纹：阈值、自定义词典与情感后端"""
+        return self._cache_fingerprints()['buckets']
+
+    def _cache_fingerprints(self):
+        """各类缓存内容各自依赖的配置指纹：分词只取决于词典，情绪结果还取决于阈值与情感后端，
+        时间桶聚合同时包含两者；配置变化时只让受影响的那一类缓存失效"""
+        sentiment_cfg = self.config.get("analysis", {}).get("sentiment", {}) or {}
+        tokens = {'custom_words': self._custom_words(), 'jieba': jieba_dict_signature()}
+        # 情感后端使用 jieba 分词时，词典变化也会改变得分
+        sentiment = dict(tokens, thresholds=[self.positive_threshold, self.negative_threshold],
+                         sentiment=sentiment_cfg)
+        payloads = {'tokens': tokens, 'sentiment': sentiment, 'buckets': sentiment}
+        return {kind: hashlib.sha1(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+                .hexdigest() for kind, payload in payloads.items()}
+
+    def get_cache(self):
+        """返回持久化缓存，未启用时返回None"""
+        cache_cfg = self.config.get("cache", {}) or {}
+        if not cache_cfg.get("enabled", False):
+            return None
+        if self._cache is None:
+            self._cache = AnalysisCache(cache_cfg.get("path", "cache/analysis_cache.sqlite"),
+                                        self._cache_fingerprints(),
+                                        cache_cfg.get("max_size_mb", 512))
+        return self._cache
+
+    def iter_data_chunks(self, kind, data_files=None):
+        """以分块方式流式读取某类数据（comments / contents / creators），有多个文件时依次读取"""
+        chunk_size = self.config.get("analysis", {}).get("load_chunk_size", 50000)
+        for file_path in data_file_paths(data_files, kind):
+            yield from iter_record_chunks(file_path, chunk_size)
+
+    def _columnar_config(self):
+        """读取列式缓存配置，未安装 pyarrow 时视为关闭"""
+        columnar_cfg = self.config.get("columnar", {}) or {}
+        enabled = columnar_cfg.get("enabled", False) and pq is not None
+        return enabled, columnar_cfg.get("dir", "cache/columnar"), columnar_cfg.get("compression", "zstd")
+
+    def columnar_path(self, file_path):
+        """原始数据文件对应的Parquet缓存路径；按绝对路径的哈希区分不同目录下的同名文件"""
+        _, columnar_dir, _ = self._columnar_config()
+        base = os.path.splitext(os.path.basename(file_path))[0]
+        digest = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:12]
+        return os.path.join(columnar_dir, f"{base}-{digest}.parquet")
+
+    def _columnar_is_fresh(self, file_path, parquet_path):
+        """Parquet缓存是否与源文件一致（比较记录的源文件大小与修改时间）"""
+        if not os.path.exists(parquet_path):
+            return False
+        metadata = pq.read_schema(parquet_path).metadata or {}
+        stat = os.stat(file_path)
+        return (metadata.get(b'source_size') == str(stat.st_size).encode()
+                and metadata.get(b'source_mtime') == str(stat.st_mtime).encode())
+
+    def convert_to_columnar(self, kind, data_files=None, force=False):
+        """把某类数据的各个原始JSON文件转换为Parquet列式文件，返回路径列表；未启用或转换失败时返回None"""
+        if not self._columnar_config()[0]:
+            return None
+        parquet_paths = []
+        for file_path in data_file_paths(data_files, kind):
+            parquet_path = self._convert_file(kind, file_path, force)
+            if parquet_path is None:
+                return None
+            parquet_paths.append(parquet_path)
+        return parquet_paths
+
+    def _convert_file(self, kind, file_path, force=False):
+        """一次性把单个原始JSON转换为压缩的Parquet列式文件，已是最新时直接返回路径"""
+        _, _, compression = self._columnar_config()
+        chunk_size = self.config.get("analysis", {}).get("load_chunk_size", 50000)
+        parquet_path = self.columnar_path(file_path)
+        if not force and self._columnar_is_fresh(file_path, parquet_path):
+            return parquet_path
+
+        print(f"🗜️ 转换为列式存储: {file_path} -> {parquet_path}")
+        os.makedirs(os.path.dirname(parquet_path) or '.', exist_ok=True)
+        # 临时文件名带进程号，同时运行的多个分析不会写到同一个文件
+        tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+        source_stat = os.stat(file_path)
+        writer = None
+        schema = None
         try:
-            with open('data/search_comments_2025-07-14.json', 'r', encoding='utf-8') as f:
-                self.comments_data = json.load(f)
-            with open('data/search_contents_2025-07-14.json', 'r', encoding='utf-8') as f:
-                self.contents_data = json.load(f)
-            with open('data/search_creators_2025-07-14.json', 'r', encoding='utf-8') as f:
-                self.creators_data = json.load(f)
+            for chunk in iter_record_chunks(file_path, chunk_size):
+                df = normalize_columns(pd.DataFrame.from_records(chunk), kind)
+                if writer is None:
+                    schema = arrow_schema(df, source_stat)
+                    writer = pq.ParquetWriter(tmp_path, schema, compression=compression, use_dictionary=True)
+                extra = [c for c in df.columns if c not in schema.names]
+                if extra:
+                    print(f"⚠️ 忽略首块数据中不存在的字段: {extra}")
+                df = df.reindex(columns=schema.names)
+                writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+            if writer is None:
+                return None
+        except Exception:
+            if writer is not None:
+                writer.close()
+                writer = None
+                os.remove(tmp_path)
+            raise
+        finally:
+            if writer is not None:
+                writer.close()
+        os.replace(tmp_path, parquet_path)
+        return parquet_path
+
+    def read_columns(self, kind, columns=None, data_files=None):
+        """按需读取某类数据的指定列：有列式缓存时以内存映射方式只读这些列，否则回退到JSON"""
+        parquet_paths = self.convert_to_columnar(kind, data_files)
+        if parquet_paths is None:
+            return self._load_frame(kind, data_files, columns)
+        frames = []
+        for parquet_path in parquet_paths:
+            available = pq.read_schema(parquet_path).names
+            selected = None if columns is None else [c for c in columns if c in available]
+            frames.append(pq.read_table(parquet_path, columns=selected, memory_map=True).to_pandas())
+        if not frames:
+            return []
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+    def _load_frame(self, kind, data_files=None, columns=None):
+        """逐块构建DataFrame，避免整份JSON以Python字典形式驻留内存；合并各块时峰值约为最终DataFrame的两倍
+
+        指定 columns 时每块只保留这些列。
+        """
+        frames = []
+        for chunk in self.iter_data_chunks(kind, data_files):
+            df = pd.DataFrame.from_records(chunk)
+            if columns is not None:
+                df = df[[c for c in columns if c in df.columns]]
+            frames.append(df)
+        if not frames:
+            return []
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True)
+
+    def frame(self, kind):
+        """按需构建并缓存某类数据的类型化DataFrame（含派生列），供各分析阶段共享"""
+        if kind in self._frames:
+            return self._frames[kind]
+        data = {'comments': self.comments_data, 'contents': self.contents_data, 'creators': self.creators_data}[kind]
+        self._frames[kind] = self._typed_frame(kind, data)
+        return self._frames[kind]
+
+    def _typed_frame(self, kind, data):
+        """为一批记录统一数值类型并添加派生列"""
+        with self.profiler.stage('frames', items=len(data)):
+            # load_data 已产出DataFrame时直接在其上添加派生列，不再复制
+            df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+            if kind == 'comments':
+                if 'content' in df.columns:
+                    df['content_length'] = df['content'].astype(str).str.len()
+                if 'like_count' in df.columns:
+                    df['like_count'] = pd.to_numeric(df['like_count'], errors='coerce').fillna(0)
+            elif kind == 'contents':
+                if 'video_play_count' in df.columns:
+                    df['video_play_count'] = pd.to_numeric(df['video_play_count'], errors='coerce')
+            elif kind == 'creators':
+                if 'total_fans' in df.columns:
+                    df['total_fans'] = pd.to_numeric(df['total_fans'], errors='coerce').fillna(0)
+        return df
+
+    def load_data(self, data_files=None, kinds=None, columns=None):
+        """加载数据；kinds 为要加载的数据类型（默认全部），其余类型置空
+
+        columns 为 {类型: 字段列表}，默认为 ANALYSIS_COLUMNS；有列式缓存时只读这些列，JSON 回退时逐块只保留这些列。
+        """
+        kinds = set(RECORD_KEYS if kinds is None else kinds)
+        columns = columns or ANALYSIS_COLUMNS
+        try:
+            with self.profiler.stage('load') as record:
+                loaded = {}
+                for kind in RECORD_KEYS:
+                    if kind not in kinds:
+                        loaded[kind] = []
+                    else:
+                        kind_columns = columns.get(kind, ANALYSIS_COLUMNS[kind])
+                        loaded[kind] = self.read_columns(kind, kind_columns, data_files)
+                self.comments_data = loaded['comments']
+                self.contents_data = loaded['contents']
+                self.creators_data = loaded['creators']
+                record['items'] = len(self.comments_data) + len(self.contents_data) + len(self.creators_data)
+            self._frames = {}
+            self._comment_views = {}
+            self._comment_weights = None
+            self._comment_idf = None
             print("✅ 数据加载成功")
             print(f"评论数据: {len(self.comments_data)} 条")
             print(f"视频数据: {len(self.contents_data)} 条")
@@ -120,131 +1602,263 @@ class BilibiliTextAnalyzer:
     
     def clean_text(self, text):
         """清理文本数据 - 保留更多有用信息"""
-        if not text or pd.isna(text):
+        if not text:
             return ""
-        
-        text = str(text)
+        if not isinstance(text, str):
+            if pd.isna(text):
+                return ""
+            text = str(text)
         
         # 移除URL链接
-        text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-        
-        # 移除邮箱
-        text = re.sub(r'\S+@\S+', '', text)
+        text = URL_PATTERN.sub('', text)
         
-        # 移除@用户名
-        text = re.sub(r'@[^\s]+', '', text)
+        # 移除邮箱和@用户名
+        text = MENTION_PATTERN.sub('', text)
         
         # 移除#话题#
-        text = re.sub(r'#[^#]+#', '', text)
-        
-        # 保留有意义的数字组合（年份、金额等）
-        # 只移除单独的纯数字，保留与文字组合的数字
-        text = re.sub(r'\b\d{1,3}\b(?!\d)', '', text)  # 只移除1-3位的独立数字
-        
-        # 移除多余空白
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
-    
-    def is_meaningful_word(self, word):
-        """判断词语是否有意义 - 放宽条件"""
-        # 长度过滤 - 放宽到1个字符也可以（如"美"、"中"等）
-        if len(word) < 1:
-            return False
-        
-        # 对于单字符，只保留有意义的
-        if len(word) == 1:
-            meaningful_single_chars = {
-                '中', '美', '日', '韩', '欧', '俄', '印', '英', '法', '德', '澳',
-                '钱', '房', '车', '股', '债', '金', '银', '油', '气', '煤', '铁',
-                '工', '农', '商', '学', '医', '法', '理', '文', '史', '哲'
-            }
-            return word in meaningful_single_chars
-        
-        # 停用词过滤
-        if word.lower() in self.stop_words:
-            return False
-        
-        # 纯数字过滤（但保留年份等）
-        if word.isdigit():
-            # 保留年份
-            if len(word) == 4 and word.startswith(('19', '20')):
-                return True
-            # 保留大额数字（可能是金额、播放量等）
-            if len(word) >= 4:
-                return True
-            return False
-        
-        # 重复字符过滤（如：哈哈哈、呵呵呵）
-        if len(set(word)) == 1 and len(word) > 2:
-            return False
-        
-        # 明显的网络用语过滤（减少数量）
-        obvious_internet_slang = {
-            'hhh', 'hhhh', 'emmm', 'awsl', 'orz', 'qaq', 'tql', 'yyds',
-            '绝绝子', '爱了爱了', '冲冲冲', '杀杀杀', '呜呜呜', '嘤嘤嘤',
-            '笑哭', '捂脸', '狗头', '滑稽'
-        }
-        if word.lower() in obvious_internet_slang:
-            return False
+        text = TOPIC_PATTERN.sub('', text)
         
-        return True
+        # 保留有意义的数字组合（年份、金额等）
+        # 只移除单独的纯数字，保留与文字组合的数字
+        text = SHORT_NUMBER_PATTERN.sub('', text)  # 只移除1-3位的独立数字
+        
+        # 移除多余空白
+        return ' '.join(text.split())
+
+    def clean_series(self, series):
+        """批量清理一列文本，返回与原索引对齐的Series，结果与逐条调用 clean_text 一致"""
+        series = pd.Series(series)
+        clean = self.clean_text
+        return pd.Series([clean(text) for text in series.tolist()], index=series.index, dtype=object)
+    
+    def is_meaningful_word(self, word):
+        """判断词语是否有意义 - 放宽条件"""
+        return self.word_filter(word)
     
-    def extract_keywords_advanced(self, text_list, top_k=30):
+    def segment_text(self, text):
+        """对清理后的文本分词并标注词性，结果按文本缓存"""
+        cached = self._segment_cache.get(text)
+        if cached is None:
+            self._add_custom_words()
+            cached = self._segment_cache[text] = segment_one(text)
+        return cached
+
+    def _segment_missing(self, cleaned_texts):
+        """把未缓存的文本分块交给进程池分词，按原顺序写回缓存"""
+        missing = [t for t in dict.fromkeys(cleaned_texts) if t not in self._segment_cache]
+        workers, chunk_size = self._parallel_config()
+        if workers <= 1 or len(missing) <= chunk_size:
+            return
+        self._add_custom_words()
+        results = parallel_map(_segment_texts, chunked(missing, chunk_size), workers,
+                               initializer=_init_segment_worker,
+                               initargs=(self._custom_words(), self._jieba_dict_cache()))
+        offset = 0
+        for segmented in results:
+            for text, seg in zip(missing[offset:offset + len(segmented)], segmented):
+                self._segment_cache[text] = seg
+            offset += len(segmented)
+
+    def tokenize_corpus(self, text_list, comment_ids=None, weights=None, keep_tokens=None):
+        """清理并分词一组文本，返回可被各关键词算法共享的分词结果
+
+        传入 comment_ids 时会读写持久化缓存，只对新增或修改过的评论分词；
+        传入 weights 时各文本按权重计入关键词统计。
+        keep_tokens 默认在 space_saving 模式下为 False：按块分词并直接累加进近似关键词统计，
+        不保留逐条分词结果，也不留在进程内的分词缓存中；需要逐条结果（如文档-词频矩阵）时传 True。
+        """
+        if keep_tokens is None:
+            keep_tokens = self._term_capacity() is None
+        if not keep_tokens:
+            return self._stream_corpus(text_list, comment_ids, weights)
+        return self._tokenize(text_list, comment_ids, weights)
+
+    def _stream_corpus(self, text_list, comment_ids=None, weights=None):
+        """按 load_chunk_size 分块分词并累加进 Space-Saving 关键词统计，内存只与块大小和摘要容量有关"""
+        chunk_size = self.config.get("analysis", {}).get("load_chunk_size", 50000)
+        stats = KeywordStats(self._term_capacity())
+        for start in range(0, len(text_list), chunk_size):
+            end = start + chunk_size
+            chunk = self._tokenize(text_list[start:end],
+                                   None if comment_ids is None else comment_ids[start:end],
+                                   None if weights is None else weights[start:end])
+            with self.profiler.stage('keyword_stats', items=len(chunk)):
+                stats.add_corpus(chunk)
+            self._segment_cache.clear()
+        return TokenizedCorpus.from_stats(stats)
+
+    def _tokenize(self, text_list, comment_ids=None, weights=None):
+        """清理并分词一组文本，保留逐条分词结果"""
+        cache = self.get_cache() if comment_ids is not None else None
+        cleaned_texts = []
+        cache_keys = []
+        rows = []
+        kept_weights = [] if weights is not None else None
+        with self.profiler.stage('clean') as record:
+            for i, text in enumerate(text_list):
+                if text:
+                    cleaned = self.clean_text(text)
+                    if cleaned:
+                        cleaned_texts.append(cleaned)
+                        rows.append(i)
+                        if kept_weights is not None:
+                            kept_weights.append(weights[i])
+                        if cache is not None:
+                            cache_keys.append((str(comment_ids[i]), AnalysisCache.content_hash(text)))
+            record['items'] = len(cleaned_texts)
+
+        if cache is not None:
+            cached = cache.get_many(cache_keys, 'tokens')
+            for key, cleaned in zip(cache_keys, cleaned_texts):
+                if key in cached:
+                    self._segment_cache[cleaned] = cached[key]
+
+        with self.profiler.stage('segment', items=len(cleaned_texts)):
+            # 多进程模式下先并行分词未缓存的文本
+            self._segment_missing(cleaned_texts)
+
+            words, pairs = [], []
+            for cleaned in cleaned_texts:
+                text_words, text_pairs = self.segment_text(cleaned)
+                words.append(text_words)
+                pairs.append(text_pairs)
+
+        if cache is not None:
+            cache.put_tokens([(key, self._segment_cache[cleaned])
+                              for key, cleaned in zip(cache_keys, cleaned_texts) if key not in cached])
+        return TokenizedCorpus(words, pairs, kept_weights, np.asarray(rows, dtype=np.int64))
+
+    def extract_keywords_advanced(self, text_list, top_k=30, corpus=None):
         """高级关键词提取 - 多种方法组合"""
         # 将 top_k 参数传递给方法时，优先使用 config.yaml
         top_k = self.config.get("analysis", {}).get("top_keywords", top_k)
 
-        # 清理和合并文本
-        cleaned_texts = []
-        for text in text_list:
-            if text:
-                cleaned = self.clean_text(text)
-                if cleaned:
-                    cleaned_texts.append(cleaned)
+        # 清理并分词（可直接传入已分词的语料）
+        if corpus is None:
+            corpus = self.tokenize_corpus(text_list)
         
-        if not cleaned_texts:
+        if not len(corpus):
             return []
         
-        combined_text = ' '.join(cleaned_texts)
-        
+        return self.rank_keywords(self.keyword_stats(corpus), top_k, corpus)
+
+    def keyword_stats(self, corpus):
+        """语料的可合并关键词统计，同一语料只构建一次"""
+        with self.profiler.stage('keyword_stats', items=len(corpus)):
+            return corpus.keyword_stats(self._term_capacity())
+
+    def frequency_summary(self, stats):
+        """词频计数方式及误差：近似计数时给出跟踪词数与单词频次的最大高估量"""
+        if isinstance(stats.term_freq, SpaceSaving):
+            return {
+                'mode': 'space_saving',
+                'capacity': stats.term_freq.capacity,
+                'tracked_terms': len(stats.term_freq),
+                'max_error': stats.frequency_error(),
+                'error_bound': stats.term_freq.total / stats.term_freq.capacity,
+            }
+        return {'mode': 'exact', 'tracked_terms': len(stats.term_freq), 'max_error': 0}
+
+    def _term_capacity(self):
+        """词频计数方式：exact 返回None（精确计数），space_saving 返回跟踪的词数上限"""
+        analysis_cfg = self.config.get("analysis", {}) or {}
+        if analysis_cfg.get("frequency_counter", "exact") != "space_saving":
+            return None
+        return int(analysis_cfg.get("frequency_capacity", 20000))
+
+    def _tfidf_config(self):
+        """TF-IDF 引擎配置，返回 (引擎名 jieba / corpus, tfidf 配置)；corpus 引擎缺少依赖时回退到 jieba"""
+        analysis_cfg = self.config.get("analysis", {}) or {}
+        engine = analysis_cfg.get("tfidf_engine", "jieba")
+        if engine == 'corpus' and not self._has_dependencies('corpus TF-IDF 引擎', ('scipy', 'sklearn'), '改用 jieba 引擎'):
+            engine = 'jieba'
+        return engine, analysis_cfg.get("tfidf", {}) or {}
+
+    def _has_dependencies(self, feature, modules, fallback='已跳过'):
+        """可选功能需要的包是否都已安装（只查找不导入）；缺少时提示一次，由调用方跳过该功能或回退"""
+        missing = [OPTIONAL_PACKAGES.get(m, m) for m in modules if importlib.util.find_spec(m) is None]
+        if missing and feature not in self._missing_warned:
+            self._missing_warned.add(feature)
+            print(f"⚠️ {feature}需要安装 {'、'.join(missing)}（pip install -r requirements-optional.txt），{fallback}")
+        return not missing
+
+    def corpus_tfidf(self, corpus, allow_pos, persist=False):
+        """语料的 corpus TF-IDF 引擎，按词性集合缓存在语料上
+
+        persist 为 True 时（评论语料）按配置加载已保存的IDF表复用，或把新学到的IDF表保存下来。
+        """
+        key = tuple(allow_pos)
+        engine = corpus.tfidf_engines.get(key)
+        if engine is None:
+            tfidf_cfg = self._tfidf_config()[1]
+            idf_path = tfidf_cfg.get("idf_path", "cache/comment_idf.json")
+            idf_table = CorpusTfidf.load_idf(idf_path) if persist and tfidf_cfg.get("reuse_idf", False) else None
+            with self.profiler.stage('tfidf_engine', items=len(corpus)):
+                engine = CorpusTfidf.from_corpus(corpus, self.word_filter, allow_pos, idf_table,
+                                                 tfidf_cfg.get("sublinear_tf", True))
+            if persist and idf_table is None and key == KEYWORD_POS_EXTENDED:
+                engine.save_idf(idf_path)
+            corpus.tfidf_engines[key] = engine
+        return engine
+
+    def comment_idf_table(self):
+        """分组、时间序列等关键词打分用的IDF表：corpus 引擎时为评论语料学到（或已保存）的IDF，否则为 None（jieba 通用IDF）"""
+        engine, tfidf_cfg = self._tfidf_config()
+        if engine != 'corpus':
+            return None
+        if self._comment_idf is None:
+            self._comment_idf = CorpusTfidf.load_idf(tfidf_cfg.get("idf_path", "cache/comment_idf.json"))
+        return self._comment_idf
+
+    def tfidf_keywords(self, stats, top_k, allow_pos, corpus=None):
+        """按配置的引擎计算TF-IDF关键词
+
+        corpus 引擎在逐条文本的稀疏矩阵上计算；只有合并后的统计（增量模式、space_saving 流式分词）时
+        用其文档频率得到的IDF加权。
+        """
+        if self._tfidf_config()[0] == 'corpus':
+            if corpus is not None and corpus.has_tokens:
+                return self.corpus_tfidf(corpus, allow_pos).top_terms(top_k)
+            return stats.tfidf(top_k, allow_pos, stats.idf_table())
+        return stats.tfidf(top_k, allow_pos)
+
+    def rank_keywords(self, stats, top_k, corpus=None):
+        """在（可能由多个分片合并的）关键词统计上计算组合关键词排名"""
+        if not len(stats):
+            return []
+
         # 方法1: TF-IDF (权重较高)
-        tfidf_keywords = jieba.analyse.extract_tags(
-            combined_text, 
-            topK=top_k*2,
-            withWeight=True,
-            allowPOS=('n', 'nr', 'ns', 'nt', 'nz', 'vn', 'an', 'v', 'a', 'nrt')
-        )
+        with self.profiler.stage('keywords_tfidf', items=len(stats)):
+            tfidf_keywords = self.tfidf_keywords(stats, top_k*2, KEYWORD_POS, corpus)
         
         # 方法2: TextRank (权重中等)
-        textrank_keywords = jieba.analyse.textrank(
-            combined_text, 
-            topK=top_k*2,
-            withWeight=True,
-            allowPOS=('n', 'nr', 'ns', 'nt', 'nz', 'vn', 'an', 'v', 'a', 'nrt')
-        )
+        with self.profiler.stage('keywords_textrank', items=len(stats)):
+            textrank_keywords = stats.textrank(top_k*2, KEYWORD_POS)
         
         # 方法3: 词频统计 (权重较低)
-        words = jieba.lcut(combined_text)
-        word_freq = Counter([w for w in words if len(w) > 1 and self.is_meaningful_word(w)])
-        freq_keywords = [(word, freq/len(words)) for word, freq in word_freq.most_common(top_k*2)]
-        
+        with self.profiler.stage('keywords_frequency', items=len(stats)):
+            freq_keywords = stats.frequency(top_k*2, self.word_filter)
+
+        return self._combine_keywords(tfidf_keywords, textrank_keywords, freq_keywords, top_k)
+
+    def _combine_keywords(self, tfidf_keywords, textrank_keywords, freq_keywords, top_k):
+        """按 TF-IDF 0.5、TextRank 0.3、词频 0.2 加权合并三种排名"""
         # 合并结果并加权
         keyword_scores = {}
         
         # TF-IDF权重 * 0.5
         for word, weight in tfidf_keywords:
-            if self.is_meaningful_word(word):
+            if self.word_filter(word):
                 keyword_scores[word] = keyword_scores.get(word, 0) + weight * 0.5
         
         # TextRank权重 * 0.3
         for word, weight in textrank_keywords:
-            if self.is_meaningful_word(word):
+            if self.word_filter(word):
                 keyword_scores[word] = keyword_scores.get(word, 0) + weight * 0.3
         
         # 词频权重 * 0.2
         for word, weight in freq_keywords:
-            if self.is_meaningful_word(word):
+            if self.word_filter(word):
                 keyword_scores[word] = keyword_scores.get(word, 0) + weight * 0.2
         
         # 排序并返回
@@ -252,48 +1866,41 @@ class BilibiliTextAnalyzer:
         
         return sorted_keywords[:top_k]
     
-    def extract_keywords(self, text_list, top_k=20, method='tfidf'):
+    def extract_keywords(self, text_list, top_k=20, method='tfidf', corpus=None):
         """提取关键词 - 兼容原接口"""
         # 将 top_k 参数传递给方法时，优先使用 config.yaml
         top_k = self.config.get("analysis", {}).get("top_keywords", top_k)
 
         if method == 'advanced':
-            return self.extract_keywords_advanced(text_list, top_k)
+            return self.extract_keywords_advanced(text_list, top_k, corpus=corpus)
         
-        # 清理和合并文本
-        cleaned_texts = []
-        for text in text_list:
-            if text:
-                cleaned = self.clean_text(text)
-                if cleaned:
-                    cleaned_texts.append(cleaned)
+        # 清理并分词（可直接传入已分词的语料）
+        if corpus is None:
+            corpus = self.tokenize_corpus(text_list)
         
-        if not cleaned_texts:
+        if not len(corpus):
             return []
         
-        combined_text = ' '.join(cleaned_texts)
-        
+        return self.method_keywords(self.keyword_stats(corpus), top_k, method, corpus)
+
+    def method_keywords(self, stats, top_k, method='tfidf', corpus=None):
+        """在关键词统计上用单一方法（tfidf / textrank）提取关键词"""
+        if not len(stats):
+            return []
+
         if method == 'tfidf':
             # 使用TF-IDF方法 - 放宽词性限制
-            keywords = jieba.analyse.extract_tags(
-                combined_text, 
-                topK=top_k*3,  # 提取更多，然后过滤
-                withWeight=True,
-                allowPOS=('n', 'nr', 'ns', 'nt', 'nz', 'vn', 'an', 'v', 'a', 'nrt', 'ad', 'vd')
-            )
+            with self.profiler.stage('keywords_tfidf', items=len(stats)):
+                keywords = self.tfidf_keywords(stats, top_k*3, KEYWORD_POS_EXTENDED, corpus)  # 提取更多，然后过滤
         else:
             # 使用TextRank方法
-            keywords = jieba.analyse.textrank(
-                combined_text, 
-                topK=top_k*3, 
-                withWeight=True,
-                allowPOS=('n', 'nr', 'ns', 'nt', 'nz', 'vn', 'an', 'v', 'a', 'nrt', 'ad', 'vd')
-            )
+            with self.profiler.stage('keywords_textrank', items=len(stats)):
+                keywords = stats.textrank(top_k*3, KEYWORD_POS_EXTENDED)
         
         # 过滤无意义词汇
         meaningful_keywords = []
         for word, weight in keywords:
-            if self.is_meaningful_word(word):
+            if self.word_filter(word):
                 meaningful_keywords.append((word, weight))
         
         # 返回前top_k个有意义的关键词
@@ -301,32 +1908,232 @@ class BilibiliTextAnalyzer:
     
     def sentiment_analysis(self, text):
         """情绪分析"""
-        if not text or pd.isna(text):
-            return 0.5, "中性"
-        try:
-            s = SnowNLP(str(text))
-            sentiment_score = s.sentiments
-            # 使用 config.yaml 的阈值
-            pos_thres = self.config.get("analysis", {}).get("positive_threshold", 0.6)
-            neg_thres = self.config.get("analysis", {}).get("negative_threshold", 0.4)
-            if sentiment_score > pos_thres:
-                sentiment_label = "积极"
-            elif sentiment_score < neg_thres:
-                sentiment_label = "消极"
+        scores, labels = self.sentiment_batch([text], workers=1)
+        return float(scores[0]), labels[0]
+
+    def sentiment_batch(self, texts, workers=None, chunk_size=None, comment_ids=None):
+        """批量情绪分析：分块在进程池中打分，返回 (得分数组, 标签数组)
+
+        传入 comment_ids 时会读写持久化缓存，只对新增或修改过的评论打分。
+        """
+        cache = self.get_cache() if comment_ids is not None else None
+        if cache is None:
+            scores = self._score_texts(texts, workers, chunk_size)
+            labels = label_sentiments(scores, self.positive_threshold, self.negative_threshold)
+            return np.nan_to_num(scores, nan=0.5), labels
+
+        texts = list(texts)
+        keys = [(str(cid), AnalysisCache.content_hash(text)) for cid, text in zip(comment_ids, texts)]
+        cached = cache.get_many(keys, 'sentiment')
+        scores = np.empty(len(texts))
+        labels = np.empty(len(texts), dtype=object)
+        missing = []
+        for i, key in enumerate(keys):
+            if key in cached:
+                scores[i], labels[i] = cached[key]
+            else:
+                missing.append(i)
+
+        if missing:
+            new_scores = self._score_texts([texts[i] for i in missing], workers, chunk_size)
+            new_labels = label_sentiments(new_scores, self.positive_threshold, self.negative_threshold)
+            new_scores = np.nan_to_num(new_scores, nan=0.5)
+            scores[missing] = new_scores
+            labels[missing] = new_labels
+            cache.put_sentiments(zip([keys[i] for i in missing], new_scores, new_labels))
+        return scores, labels
+
+    def _score_texts(self, texts, workers=None, chunk_size=None):
+        """按配置的后端计算情绪得分，空文本或出错时为NaN"""
+        default_workers, default_chunk_size = self._parallel_config()
+        workers = workers or default_workers
+        chunk_size = chunk_size or default_chunk_size
+        sentiment_cfg = self.config.get("analysis", {}).get("sentiment", {}) or {}
+        with self.profiler.stage('sentiment') as record:
+            if (sentiment_cfg.get("backend", "snownlp") == "vectorized"
+                    and self._has_dependencies('vectorized 情感后端', ('scipy',), '改用 SnowNLP 逐条打分')):
+                parts = list(self._vectorized_sentiment(texts, workers, chunk_size, sentiment_cfg.get("tokenizer", "snownlp")))
             else:
-                sentiment_label = "中性"
-            return sentiment_score, sentiment_label
-        except:
-            return 0.5, "中性"
+                parts = list(parallel_map(score_sentiments, chunked(texts, chunk_size), workers))
+            scores = np.concatenate(parts) if parts else np.empty(0)
+            record['items'] = len(scores)
+        return scores
+
+    def _vectorized_sentiment(self, texts, workers, chunk_size, tokenizer):
+        """向量化贝叶斯打分：分词后按块做稀疏矩阵运算"""
+        if self._nb_model is None:
+            self._nb_model = NaiveBayesSentiment()
+        if tokenizer == "jieba":
+            # 复用关键词流程的jieba分词缓存，速度快但与SnowNLP分词存在差异
+            for chunk in chunked(texts, chunk_size):
+                token_lists = []
+                for text in chunk:
+                    cleaned = self.clean_text(text)
+                    token_lists.append([w for w in self.segment_text(cleaned)[0] if w.strip()] if cleaned else None)
+                yield self._nb_model.score(token_lists)
+        else:
+            for token_lists in parallel_map(snownlp_tokens, chunked(texts, chunk_size), workers):
+                yield self._nb_model.score(token_lists)
     
-    def analyze_comments(self):
-        """分析评论数据"""
+    def detect_duplicates(self):
+        """MinHash/LSH 近似重复（复制粘贴、刷屏）评论检测，按配置折叠、降权或只报告重复簇，返回簇统计"""
+        print("\n=== 重复/刷屏评论检测 ===")
+        if len(self.comments_data) == 0:
+            print("❌ 没有评论数据")
+            return None
+
+        dedup_cfg = self.config.get("analysis", {}).get("dedup", {}) or {}
+        mode = dedup_cfg.get("mode", "collapse")
+        if mode not in ('collapse', 'downweight', 'report'):
+            print(f"⚠️ 未知的去重模式 {mode}，仅报告重复簇")
+            mode = 'report'
+        params = {
+            'threshold': dedup_cfg.get("threshold", 0.8),
+            'shingle_size': dedup_cfg.get("shingle_size", 3),
+            'num_perm': dedup_cfg.get("num_perm", 128),
+            'bands': dedup_cfg.get("bands", 16),
+            'min_length': dedup_cfg.get("min_length", 8),
+        }
+        df_comments = self.frame('comments')
+
+        with self.profiler.stage('dedup_minhash', items=len(df_comments)):
+            # 去掉空白后比较；过短的常见短评（如“哈哈哈”“支持”）不参与检测
+            compact = self.clean_series(df_comments['content']).str.replace(' ', '', regex=False)
+            rows = np.flatnonzero((compact.str.len() >= max(params['min_length'], 1)).to_numpy())
+            signatures = minhash_signatures(compact.iloc[rows].tolist(), params['num_perm'],
+                                            params['shingle_size'])
+        with self.profiler.stage('dedup_lsh', items=len(rows)):
+            labels, checked = lsh_clusters(signatures, params['bands'], params['threshold'])
+
+        # 只保留成员数大于1的簇，按簇大小从大到小重新编号
+        sizes = np.bincount(labels, minlength=1)
+        duplicated = sizes[labels] > 1
+        members = pd.DataFrame({
+            'row': rows[duplicated],
+            'label': labels[duplicated],
+            'size': sizes[labels[duplicated]],
+            'like_count': df_comments['like_count'].to_numpy()[rows[duplicated]],
+        })
+        members = members.sort_values(['size', 'label', 'like_count', 'row'],
+                                      ascending=[False, True, False, True], kind='stable')
+        members['cluster_id'] = pd.factorize(members['label'])[0]
+        # 每簇点赞最多的一条作为代表
+        members['representative'] = ~members['cluster_id'].duplicated()
+        n_clusters = int(members['cluster_id'].nunique())
+        redundant = int(len(members) - n_clusters)
+
+        details = df_comments.iloc[members['row'].to_numpy()]
+        clusters = pd.DataFrame({
+            'cluster_id': members['cluster_id'].to_numpy(),
+            'size': members['size'].to_numpy(),
+            'representative': members['representative'].to_numpy(),
+            'comment_id': details['comment_id'].to_numpy() if 'comment_id' in details.columns else None,
+            'video_id': details['video_id'].to_numpy() if 'video_id' in details.columns else None,
+            'like_count': members['like_count'].to_numpy(),
+            'content': details['content'].to_numpy(),
+        })
+        clusters_path = self.output_path('duplicate_clusters.csv')
+        clusters.to_csv(clusters_path, index=False, encoding='utf-8-sig')
+
+        max_clusters = dedup_cfg.get("max_clusters_in_results", 20)
+        grouped = clusters.groupby('cluster_id', sort=True)
+        summary = grouped.agg(size=('size', 'first'), like_sum=('like_count', 'sum'),
+                              video_count=('video_id', 'nunique'))
+        samples = clusters[clusters['representative']].set_index('cluster_id')['content']
+        top_clusters = [{
+            'cluster_id': int(cluster_id),
+            'size': int(row['size']),
+            'like_sum': float(row['like_sum']),
+            'video_count': int(row['video_count']),
+            'sample': str(samples[cluster_id])[:100],
+        } for cluster_id, row in summary.head(max_clusters).iterrows()]
+
+        print(f"参与检测评论: {len(rows)} 条，候选相似对: {checked} 个")
+        print(f"重复簇: {n_clusters} 个，涉及评论 {len(members)} 条，冗余评论 {redundant} 条 "
+              f"({redundant / len(df_comments) * 100:.1f}%)")
+        for cluster in top_clusters[:5]:
+            print(f"  ×{cluster['size']}: {' '.join(cluster['sample'][:40].split())}")
+        print(f"📁 重复簇明细已保存到 {clusters_path}")
+
+        if mode == 'collapse':
+            drop = members.loc[~members['representative'], 'row'].to_numpy()
+            self._frames['comments'] = df_comments.drop(index=df_comments.index[drop]).reset_index(drop=True)
+            self._comment_views = {}
+            print(f"已折叠重复评论，保留 {len(self._frames['comments'])} 条")
+        elif mode == 'downweight':
+            weights = np.ones(len(df_comments))
+            weights[members['row'].to_numpy()] = 1.0 / members['size'].to_numpy()
+            self._comment_weights = pd.Series(weights, index=df_comments.index)
+            print("重复簇内评论按 1/簇大小 计入情绪分布与关键词")
+
+        return {
+            'mode': mode,
+            'params': params,
+            'comments': int(len(df_comments)),
+            'checked_comments': int(len(rows)),
+            'candidate_pairs': int(checked),
+            'clusters': n_clusters,
+            'duplicate_comments': int(len(members)),
+            'redundant_comments': redundant,
+            'duplicate_ratio': redundant / len(df_comments),
+            'largest_cluster': int(members['size'].max()) if len(members) else 0,
+            'size_distribution': {str(size): int(count) for size, count
+                                  in summary['size'].value_counts().sort_index().items()},
+            'top_clusters': top_clusters,
+        }
+
+    def comment_weights(self, index):
+        """按评论DataFrame索引取降权系数，未启用 downweight 时返回 None"""
+        if self._comment_weights is None:
+            return None
+        return self._comment_weights.loc[index].to_numpy()
+
+    def basic_statistics(self):
+        """只做基础统计（评论量、长度、点赞、播放量、粉丝数与性别分布），不分词、不做情绪分析和绘图"""
+        stats = {}
+        if len(self.comments_data):
+            df_comments = self.frame('comments')
+            lengths = df_comments['content_length']
+            like_counts = df_comments['like_count']
+            stats['comments'] = {
+                'total': int(len(df_comments)),
+                'valid': int(df_comments['content'].notna().sum()),
+                'avg_length': float(lengths.mean()),
+                'max_length': int(lengths.max()),
+                'min_length': int(lengths.min()),
+                'avg_likes': float(like_counts.mean()),
+                'max_likes': int(like_counts.max()),
+                'median_likes': float(like_counts.median()),
+                'sex_distribution': label_counts(df_comments.get('sex')),
+            }
+        if len(self.contents_data):
+            play_counts = self.frame('contents')['video_play_count'].fillna(0)
+            stats['contents'] = {
+                'total_videos': int(len(play_counts)),
+                'avg_play_count': float(play_counts.mean()),
+                'max_play_count': int(play_counts.max()),
+                'median_play_count': float(play_counts.median()),
+            }
+        if len(self.creators_data):
+            df_creators = self.frame('creators')
+            fan_counts = df_creators['total_fans']
+            stats['creators'] = {
+                'total_creators': int(len(df_creators)),
+                'avg_fans': float(fan_counts.mean()),
+                'max_fans': int(fan_counts.max()),
+                'median_fans': float(fan_counts.median()),
+                'gender_distribution': label_counts(df_creators.get('sex')),
+            }
+        return stats
+
+    def analyze_comments(self, keywords=True):
+        """分析评论数据；keywords 为 False 时只做统计与情绪分析，不分词"""
         print("\n=== 评论文本分析 ===")
-        if not self.comments_data:
+        if len(self.comments_data) == 0:
             print("❌ 没有评论数据")
             return None
 
-        df_comments = pd.DataFrame(self.comments_data)
+        df_comments = self.frame('comments')
         total_comments = len(df_comments)
         valid_comments = df_comments['content'].notna().sum()
         print(f"总评论数: {total_comments}")
@@ -336,13 +2143,13 @@ class BilibiliTextAnalyzer:
         if 'sex' in df_comments.columns:
             print("\n--- 评论性别分布 ---")
             sex_counts = df_comments['sex'].value_counts(dropna=False)
+            sex_counts = sex_counts[sex_counts > 0]
             for sex, count in sex_counts.items():
                 percent = count / total_comments * 100
                 print(f"{sex if pd.notna(sex) and sex != '' else '未知'}: {count} ({percent:.1f}%)")
         else:
             sex_counts = {}
 
-        df_comments['content_length'] = df_comments['content'].astype(str).str.len()
         print(f"平均评论长度: {df_comments['content_length'].mean():.2f} 字符")
         print(f"最长评论: {df_comments['content_length'].max()} 字符")
         print(f"最短评论: {df_comments['content_length'].min()} 字符")
@@ -351,41 +2158,42 @@ class BilibiliTextAnalyzer:
         sample_size = self.config.get("analysis", {}).get("comment_sample_size", 5000)
         top_k = self.config.get("analysis", {}).get("top_keywords", 20)
 
-        # 情绪分析
+        # 情绪分析（comment_sample_size 为空或0时对全部评论打分）
         print("\n--- 评论情绪分析 ---")
-        sentiments = []
-        sentiment_labels = []
-        sample_size = min(sample_size, len(df_comments))
-        sample_comments = df_comments.sample(n=sample_size)['content'].tolist()
-        for comment in sample_comments:
-            score, label = self.sentiment_analysis(comment)
-            sentiments.append(score)
-            sentiment_labels.append(label)
-        sentiment_counts = Counter(sentiment_labels)
-        print(f"积极评论: {sentiment_counts['积极']} ({sentiment_counts['积极']/len(sentiment_labels)*100:.1f}%)")
-        print(f"中性评论: {sentiment_counts['中性']} ({sentiment_counts['中性']/len(sentiment_labels)*100:.1f}%)")
-        print(f"消极评论: {sentiment_counts['消极']} ({sentiment_counts['消极']/len(sentiment_labels)*100:.1f}%)")
-        print(f"平均情绪得分: {np.mean(sentiments):.3f}")
-
-        # 关键词提取
-        print("\n--- 评论关键词分析 ---")
-        comment_texts = [str(comment) for comment in df_comments['content'].dropna()]
-        print("🔍 使用高级组合方法提取关键词:")
-        advanced_keywords = self.extract_keywords_advanced(comment_texts, top_k=top_k)
-        for i, (word, weight) in enumerate(advanced_keywords[:15], 1):
-            print(f"{i:2d}. {word}: {weight:.4f}")
+        if sample_size and sample_size < len(df_comments):
+            sample_df = df_comments.sample(n=sample_size)
+        else:
+            sample_df = df_comments
+        sample_ids = sample_df['comment_id'].tolist() if 'comment_id' in sample_df.columns else None
+        sentiments, sentiment_labels = self.sentiment_batch(sample_df['content'].tolist(), comment_ids=sample_ids)
+        # 重复评论降权时，情绪分布按权重计数
+        weights = self.comment_weights(sample_df.index)
+        if weights is None:
+            sentiment_counts = Counter(sentiment_labels)
+        else:
+            sentiment_counts = Counter()
+            for label, weight in zip(sentiment_labels, weights):
+                sentiment_counts[label] += weight
+            sentiment_counts = Counter({label: round(count, 2) for label, count in sentiment_counts.items()})
+        total_weight = sum(sentiment_counts.values())
+        print(f"积极评论: {sentiment_counts['积极']} ({sentiment_counts['积极']/total_weight*100:.1f}%)")
+        print(f"中性评论: {sentiment_counts['中性']} ({sentiment_counts['中性']/total_weight*100:.1f}%)")
+        print(f"消极评论: {sentiment_counts['消极']} ({sentiment_counts['消极']/total_weight*100:.1f}%)")
+        print(f"平均情绪得分: {np.average(sentiments, weights=weights):.3f}")
 
-        print("\n🔍 使用TF-IDF方法提取关键词:")
-        tfidf_keywords = self.extract_keywords(comment_texts, top_k=top_k, method='tfidf')
-        for i, (word, weight) in enumerate(tfidf_keywords[:15], 1):
-            print(f"{i:2d}. {word}: {weight:.4f}")
+        # 关键词提取（不选 keywords 阶段时跳过分词）
+        keyword_results = self.comment_keywords(df_comments, top_k) if keywords else {}
 
-        print("\n🔍 使用TextRank方法提取关键词:")
-        textrank_keywords = self.extract_keywords(comment_texts, top_k=top_k, method='textrank')
-        for i, (word, weight) in enumerate(textrank_keywords[:15], 1):
-            print(f"{i:2d}. {word}: {weight:.4f}")
+        # 点赞加权视图（在配置中开启），复用上面的情绪得分与分词结果
+        like_weighted = None
+        if (self.config.get("analysis", {}).get("like_weighting", {}) or {}).get("enabled", False):
+            with self.profiler.stage('like_weighting'):
+                # 加权关键词需要稀疏矩阵，缺少 scipy 时只输出加权情绪分布
+                weighted_keywords = keywords and self._has_dependencies('点赞加权关键词', ('scipy',))
+                like_weighted = self.like_weighted_analysis(sample_df, sentiments, sentiment_labels, top_k,
+                                                            weighted_keywords)
 
-        like_counts = pd.to_numeric(df_comments['like_count'], errors='coerce').fillna(0)
+        like_counts = df_comments['like_count']
         print(f"\n--- 点赞数统计 ---")
         print(f"平均点赞数: {like_counts.mean():.2f}")
         print(f"最高点赞数: {like_counts.max()}")
@@ -394,10 +2202,10 @@ class BilibiliTextAnalyzer:
         return {
             'sentiment_distribution': dict(sentiment_counts),
             'sentiment_scores': sentiments,
-            'advanced_keywords': advanced_keywords,
-            'tfidf_keywords': tfidf_keywords,
-            'textrank_keywords': textrank_keywords,
-            'keywords': advanced_keywords,
+            'sentiment_summary': score_summary(sentiments),
+            'sentiment_histogram': sentiment_histogram(sentiments, weights),
+            **keyword_results,
+            'like_weighted': like_weighted,
             'basic_stats': {
                 'total': int(total_comments),
                 'valid': int(valid_comments),
@@ -411,52 +2219,151 @@ class BilibiliTextAnalyzer:
             'sex_distribution': sex_counts.to_dict() if hasattr(sex_counts, "to_dict") else {}
         }
     
-    def analyze_video_content(self):
-        """分析视频内容"""
+    def comment_keywords(self, df_comments, top_k):
+        """对全部有效评论分词一次，用组合算法、TF-IDF、TextRank 提取关键词并统计词频"""
+        print("\n--- 评论关键词分析 ---")
+        valid_df = df_comments[df_comments['content'].notna()]
+        comment_texts = [str(comment) for comment in valid_df['content']]
+        comment_ids = valid_df['comment_id'].tolist() if 'comment_id' in valid_df.columns else None
+        # 只分词一次，三种方法共享分词结果
+        comment_corpus = self.tokenize_corpus(comment_texts, comment_ids=comment_ids,
+                                              weights=self.comment_weights(valid_df.index))
+        if self._tfidf_config()[0] == 'corpus' and not comment_corpus.has_tokens:
+            # space_saving 模式不保留逐条分词结果，IDF 由近似文档频率得到
+            self._comment_idf = self.keyword_stats(comment_corpus).idf_table()
+            print(f"TF-IDF 引擎: corpus（近似文档频率，{len(comment_corpus)} 条评论）")
+        elif self._tfidf_config()[0] == 'corpus':
+            # 在评论语料上学习（或加载已保存的）IDF，分组、时间序列关键词也使用这张表
+            for allow_pos in (KEYWORD_POS, KEYWORD_POS_EXTENDED):
+                engine = self.corpus_tfidf(comment_corpus, allow_pos, persist=True)
+            self._comment_idf = engine.idf_table()
+            print(f"TF-IDF 引擎: corpus（{engine.documents} 条评论，词表 {len(engine.vocabulary)} 个词）")
+        print("🔍 使用高级组合方法提取关键词:")
+        advanced_keywords = self.extract_keywords_advanced(comment_texts, top_k=top_k, corpus=comment_corpus)
+        for i, (word, weight) in enumerate(advanced_keywords[:15], 1):
+            print(f"{i:2d}. {word}: {weight:.4f}")
+
+        print("\n🔍 使用TF-IDF方法提取关键词:")
+        tfidf_keywords = self.extract_keywords(comment_texts, top_k=top_k, method='tfidf', corpus=comment_corpus)
+        for i, (word, weight) in enumerate(tfidf_keywords[:15], 1):
+            print(f"{i:2d}. {word}: {weight:.4f}")
+
+        print("\n🔍 使用TextRank方法提取关键词:")
+        textrank_keywords = self.extract_keywords(comment_texts, top_k=top_k, method='textrank', corpus=comment_corpus)
+        for i, (word, weight) in enumerate(textrank_keywords[:15], 1):
+            print(f"{i:2d}. {word}: {weight:.4f}")
+
+        frequency_summary = self.frequency_summary(self.keyword_stats(comment_corpus))
+        if frequency_summary['mode'] == 'space_saving':
+            print(f"\n词频为 Space-Saving 近似计数：跟踪 {frequency_summary['tracked_terms']} 个词，"
+                  f"单词频次最大高估 {frequency_summary['max_error']}")
+
+        return {
+            'advanced_keywords': advanced_keywords,
+            'tfidf_keywords': tfidf_keywords,
+            'textrank_keywords': textrank_keywords,
+            'keywords': advanced_keywords,
+            'keyword_frequency': frequency_summary,
+        }
+
+    def like_weighted_analysis(self, sample_df, sentiments, sentiment_labels, top_k, keywords=True):
+        """按点赞数加权的情绪分布、情绪直方图与关键词（keywords 为 False 时不含关键词）
+
+        复用已算好的采样评论情绪得分和共享的评论文档-词频矩阵，只在其上做向量化加权，不重新分词或打分。
+        """
+        like_cfg = self.config.get("analysis", {}).get("like_weighting", {}) or {}
+        function = like_cfg.get("function", "log")
+        if function not in LIKE_WEIGHT_FUNCTIONS:
+            print(f"⚠️ 未知的点赞加权方式 {function}，改用 log")
+            function = 'log'
+        cap = like_cfg.get("cap", 1000)
+        df_comments = self.frame('comments')
+
+        # 情绪：采样评论的得分按点赞加权（重复评论降权时两种权重相乘）
+        weights = like_weights(sample_df['like_count'].to_numpy(), function, cap)
+        dedup_weights = self.comment_weights(sample_df.index)
+        if dedup_weights is not None:
+            weights = weights * dedup_weights
+        scores = np.asarray(sentiments, dtype=float)
+        labels = np.asarray(sentiment_labels, dtype=object)
+        distribution = {label: round(float(weights[labels == label].sum()), 2) for label in ('积极', '中性', '消极')}
+        total_weight = sum(distribution.values()) or 1.0
+        avg_sentiment = float(np.average(scores, weights=weights)) if len(scores) else None
+
+        print(f"\n--- 点赞加权（{function}） ---")
+        for label, weight in distribution.items():
+            print(f"{label}评论: {weight / total_weight * 100:.1f}%")
+        if avg_sentiment is not None:
+            print(f"加权平均情绪得分: {avg_sentiment:.3f}")
+
+        result = {
+            'function': function,
+            'cap': cap if function == 'capped' else None,
+            'sentiment_distribution': distribution,
+            'avg_sentiment': avg_sentiment,
+            'sentiment_histogram': sentiment_histogram(scores, weights),
+        }
+        if not keywords:
+            return result
+
+        # 关键词：全部有效评论的文档-词频矩阵按点赞加权
+        matrix, vocabulary, doc_rows = self.comment_term_matrix()
+        doc_weights = like_weights(df_comments['like_count'].to_numpy()[doc_rows], function, cap)
+        dedup_weights = self.comment_weights(df_comments.index[doc_rows])
+        if dedup_weights is not None:
+            doc_weights = doc_weights * dedup_weights
+        result['tfidf_keywords'] = group_top_terms(matrix, vocabulary, np.zeros(len(doc_rows), dtype=np.int64), 1,
+                                                   top_k, doc_weights, self.comment_idf_table())[0]
+        term_weights = matrix.T @ doc_weights
+        total_terms = term_weights.sum() or 1.0
+        result['frequency_keywords'] = [(vocabulary[i], float(term_weights[i] / total_terms))
+                                        for i in np.argsort(-term_weights, kind='stable')[:top_k] if term_weights[i] > 0]
+        print("加权TF-IDF关键词: " + '、'.join(word for word, _ in result['tfidf_keywords'][:15]))
+        return result
+
+    def analyze_video_content(self, keywords=True):
+        """分析视频内容；keywords 为 False 时跳过标题、简介关键词"""
         print("\n=== 视频内容分析 ===")
         
-        if not self.contents_data:
+        if len(self.contents_data) == 0:
             print("❌ 没有视频内容数据")
             return None
         
-        df_contents = pd.DataFrame(self.contents_data)
+        df_contents = self.frame('contents')
         
         # 基本统计
         print(f"总视频数: {len(df_contents)}")
         
         # 播放量统计
-        play_counts = pd.to_numeric(df_contents['video_play_count'], errors='coerce').fillna(0)
+        play_counts = df_contents['video_play_count'].fillna(0)
         print(f"平均播放量: {play_counts.mean():.0f}")
         print(f"最高播放量: {play_counts.max():.0f}")
         print(f"播放量中位数: {play_counts.median():.0f}")
         
-        # 标题分析
-        print("\n--- 视频标题分析 ---")
         titles = df_contents['title'].dropna().tolist()
-        title_keywords = self.extract_keywords_advanced(titles, top_k=20)
-        
-        print("标题热门关键词:")
-        for i, (word, weight) in enumerate(title_keywords[:15], 1):
-            print(f"{i:2d}. {word}: {weight:.4f}")
-        
-        # 描述分析
-        print("\n--- 视频描述分析 ---")
-        descriptions = df_contents['desc'].dropna().tolist()
-        desc_keywords = self.extract_keywords_advanced(descriptions, top_k=20)
-        
-        print("描述热门关键词:")
-        for i, (word, weight) in enumerate(desc_keywords[:15], 1):
-            print(f"{i:2d}. {word}: {weight:.4f}")
+        keyword_results = {}
+        if keywords:
+            # 标题分析
+            print("\n--- 视频标题分析 ---")
+            title_keywords = self.extract_keywords_advanced(titles, top_k=20)
+
+            print("标题热门关键词:")
+            for i, (word, weight) in enumerate(title_keywords[:15], 1):
+                print(f"{i:2d}. {word}: {weight:.4f}")
+
+            # 描述分析
+            print("\n--- 视频描述分析 ---")
+            descriptions = df_contents['desc'].dropna().tolist()
+            desc_keywords = self.extract_keywords_advanced(descriptions, top_k=20)
+
+            print("描述热门关键词:")
+            for i, (word, weight) in enumerate(desc_keywords[:15], 1):
+                print(f"{i:2d}. {word}: {weight:.4f}")
+            keyword_results = {'title_keywords': title_keywords, 'desc_keywords': desc_keywords}
         
         # 标题情绪分析
         print("\n--- 标题情绪分析 ---")
-        title_sentiments = []
-        title_sentiment_labels = []
-        
-        for title in titles:
-            score, label = self.sentiment_analysis(title)
-            title_sentiments.append(score)
-            title_sentiment_labels.append(label)
+        title_sentiments, title_sentiment_labels = self.sentiment_batch(titles)
         
         title_sentiment_counts = Counter(title_sentiment_labels)
         print(f"积极标题: {title_sentiment_counts['积极']} ({title_sentiment_counts['积极']/len(title_sentiment_labels)*100:.1f}%)")
@@ -464,10 +2371,11 @@ class BilibiliTextAnalyzer:
         print(f"消极标题: {title_sentiment_counts['消极']} ({title_sentiment_counts['消极']/len(title_sentiment_labels)*100:.1f}%)")
         
         return {
-            'title_keywords': title_keywords,
-            'desc_keywords': desc_keywords,
+            **keyword_results,
             'title_sentiment': dict(title_sentiment_counts),
             'title_sentiment_scores': title_sentiments,
+            'title_sentiment_summary': score_summary(title_sentiments),
+            'title_sentiment_histogram': sentiment_histogram(title_sentiments),
             'video_stats': {
                 'total_videos': int(len(df_contents)),
                 'avg_play_count': float(play_counts.mean()),
@@ -476,185 +2384,381 @@ class BilibiliTextAnalyzer:
             }
         }
     
-    def analyze_creators(self):
-        """分析创作者数据"""
+    def analyze_creators(self, keywords=True):
+        """分析创作者数据；keywords 为 False 时跳过个性签名关键词"""
         print("\n=== 创作者分析 ===")
         
-        if not self.creators_data:
+        if len(self.creators_data) == 0:
             print("❌ 没有创作者数据")
             return None
         
-        df_creators = pd.DataFrame(self.creators_data)
+        df_creators = self.frame('creators')
         
         # 性别分布
         gender_dist = df_creators['sex'].value_counts()
+        gender_dist = gender_dist[gender_dist > 0]
         print("--- 创作者性别分布 ---")
         for gender, count in gender_dist.items():
             print(f"{gender}: {count} ({count/len(df_creators)*100:.1f}%)")
         
         # 粉丝数分析
-        fan_counts = pd.to_numeric(df_creators['total_fans'], errors='coerce').fillna(0)
+        fan_counts = df_creators['total_fans']
         print(f"\n--- 粉丝数统计 ---")
         print(f"平均粉丝数: {fan_counts.mean():.0f}")
         print(f"最高粉丝数: {fan_counts.max():.0f}")
         print(f"粉丝数中位数: {fan_counts.median():.0f}")
         
-        # 个性签名关键词分析
-        print("\n--- 个性签名关键词 ---")
-        signs = df_creators['sign'].dropna().tolist()
-        sign_keywords = self.extract_keywords_advanced(signs, top_k=15)
-        
-        for i, (word, weight) in enumerate(sign_keywords[:15], 1):
-            print(f"{i:2d}. {word}: {weight:.4f}")
-        
-        return {
+        result = {
             'gender_distribution': dict(gender_dist),
             'fan_stats': {
                 'avg_fans': float(fan_counts.mean()),
                 'max_fans': int(fan_counts.max()),
                 'median_fans': float(fan_counts.median())
             },
-            'sign_keywords': sign_keywords
         }
-    
-    def generate_wordcloud(self, keywords, title="词云图", save_path=None):
-        """生成词云图"""
+        if keywords:
+            # 个性签名关键词分析
+            print("\n--- 个性签名关键词 ---")
+            signs = df_creators['sign'].dropna().tolist()
+            result['sign_keywords'] = self.extract_keywords_advanced(signs, top_k=15)
+
+            for i, (word, weight) in enumerate(result['sign_keywords'][:15], 1):
+                print(f"{i:2d}. {word}: {weight:.4f}")
+        return result
+
+    def analyze_groups(self):
+        """按视频、创作者分组分析：评论数、点赞统计、情绪分布与关键词，一次计算全部分组"""
+        print("\n=== 视频/创作者分组分析 ===")
+        if len(self.comments_data) == 0:
+            print("❌ 没有评论数据")
+            return None
+
+        group_cfg = self.config.get("analysis", {}).get("grouped", {}) or {}
+        top_k = group_cfg.get("top_keywords", 5)
+        max_groups = group_cfg.get("max_groups_in_results", 50)
+        df_comments = self.frame('comments')
+
+        with self.profiler.stage('groups_join', items=len(df_comments)):
+            comments = pd.DataFrame({
+                'video_id': df_comments['video_id'].astype(str),
+                'like_count': df_comments['like_count'].to_numpy(),
+            })
+            # 以 video_id 为哈希索引，把评论关联到视频及其创作者
+            if len(self.contents_data):
+                df_contents = self.frame('contents').drop_duplicates('video_id', keep='last')
+                videos = pd.DataFrame({
+                    'title': df_contents['title'].to_numpy(),
+                    'creator_id': df_contents['user_id'].astype(str).to_numpy(),
+                    'video_play_count': df_contents['video_play_count'].to_numpy(),
+                }, index=pd.Index(df_contents['video_id'].astype(str), name='video_id'))
+            else:
+                videos = pd.DataFrame(columns=['title', 'creator_id', 'video_play_count'],
+                                      index=pd.Index([], name='video_id'))
+            comments['creator_id'] = comments['video_id'].map(videos['creator_id'])
+
+        # 对全部有效评论打分（读写持久化缓存）
+        scores, labels = self.comment_sentiments()
+        comments['score'] = scores
+        comments['positive'] = labels == '积极'
+        comments['neutral'] = labels == '中性'
+        comments['negative'] = labels == '消极'
+
+        # 文档-词频稀疏矩阵只构建一次，视频与创作者分组共享
+        matrix, vocabulary, doc_rows = self.comment_term_matrix()
+
+        with self.profiler.stage('groups_aggregate', items=len(comments)):
+            video_table = self._group_table(comments, 'video_id', matrix, vocabulary, doc_rows, top_k)
+            video_table = video_table.join(videos, on='video_id')
+            creator_table = self._group_table(comments, 'creator_id', matrix, vocabulary, doc_rows, top_k)
+            video_totals = videos.groupby('creator_id').agg(video_count=('title', 'size'),
+                                                            total_play_count=('video_play_count', 'sum'))
+            creator_table = creator_table.join(video_totals, on='creator_id')
+            if len(self.creators_data):
+                df_creators = self.frame('creators').drop_duplicates('user_id', keep='last')
+                profiles = pd.DataFrame({
+                    'nickname': df_creators['nickname'].to_numpy(),
+                    'total_fans': df_creators['total_fans'].to_numpy(),
+                }, index=pd.Index(df_creators['user_id'].astype(str), name='creator_id'))
+                creator_table = creator_table.join(profiles, on='creator_id')
+
+        video_table = video_table.sort_values('comment_count', ascending=False, kind='stable')
+        creator_table = creator_table.sort_values('comment_count', ascending=False, kind='stable')
+        paths = [self.output_path('video_groups.csv'), self.output_path('creator_groups.csv')]
+        for table, path in zip((video_table, creator_table), paths):
+            table.assign(keywords=[' '.join(word for word, _ in terms) for terms in table['keywords']]) \
+                 .to_csv(path, index=False, encoding='utf-8-sig')
+        print(f"视频分组: {len(video_table)} 个，创作者分组: {len(creator_table)} 个")
+        print(f"📁 分组结果已保存到 {'、'.join(paths)}")
+
+        print("\n--- 评论最多的视频 ---")
+        for i, row in enumerate(video_table.head(10).itertuples(), 1):
+            title = row.title if isinstance(row.title, str) else row.video_id
+            print(f"{i:2d}. {title[:30]}: {row.comment_count} 条评论，平均情绪 {row.sentiment_mean:.3f}")
+
+        return {
+            'video_count': int(len(video_table)),
+            'creator_count': int(len(creator_table)),
+            'videos': video_table.head(max_groups).to_dict('records'),
+            'creators': creator_table.head(max_groups).to_dict('records'),
+        }
+
+    def comment_sentiments(self, rows=None):
+        """评论情绪得分与标签数组，与评论DataFrame逐行对齐（空评论为NaN/None）
+
+        全量结果在各分析阶段间共享；rows 指定行号时只对这些行打分。
+        """
+        shared = self._comment_views.get('sentiments')
+        if shared is not None:
+            return shared if rows is None else (shared[0][rows], shared[1][rows])
+        df_comments = self.frame('comments')
+        positions = np.arange(len(df_comments)) if rows is None else np.asarray(rows)
+        content = df_comments['content'].iloc[positions]
+        valid = content.notna().to_numpy()
+        texts = [str(text) for text in content[valid]]
+        comment_ids = (df_comments['comment_id'].iloc[positions][valid].tolist()
+                       if 'comment_id' in df_comments.columns else None)
+        scores, labels = self.sentiment_batch(texts, comment_ids=comment_ids)
+        all_scores = np.full(len(positions), np.nan)
+        all_scores[valid] = scores
+        all_labels = np.full(len(positions), None, dtype=object)
+        all_labels[valid] = labels
+        if rows is None:
+            self._comment_views['sentiments'] = (all_scores, all_labels)
+        return all_scores, all_labels
+
+    def comment_term_matrix(self, rows=None):
+        """评论的文档-词频稀疏矩阵，返回 (矩阵, 词表, 矩阵各行对应的评论行号)
+
+        全量结果在各分析阶段间共享；rows 指定行号时只处理这些行，返回的行号为其在 rows 中的位置。
+        """
+        shared = self._comment_views.get('terms')
+        if shared is not None and rows is None:
+            return shared
+        df_comments = self.frame('comments')
+        positions = np.arange(len(df_comments)) if rows is None else np.asarray(rows)
+        content = df_comments['content'].iloc[positions]
+        valid = content.notna().to_numpy()
+        texts = [str(text) for text in content[valid]]
+        comment_ids = (df_comments['comment_id'].iloc[positions][valid].tolist()
+                       if 'comment_id' in df_comments.columns else None)
+        corpus = self.tokenize_corpus(texts, comment_ids=comment_ids, keep_tokens=True)
+        with self.profiler.stage('term_matrix', items=len(corpus)):
+            matrix, vocabulary = doc_term_matrix(corpus.pairs, self.word_filter)
+        # 清理后为空的评论不在语料中，按语料记录的位置对齐矩阵行
+        result = (matrix, vocabulary, np.flatnonzero(valid)[corpus.rows])
+        if rows is None:
+            self._comment_views['terms'] = result
+        return result
+
+    def _group_table(self, comments, key, matrix, vocabulary, doc_rows, top_k):
+        """按 key 分组聚合评论数、点赞统计与情绪分布，并附上每组TF-IDF关键词"""
+        codes, uniques = pd.factorize(comments[key])
+        grouped = comments[codes >= 0].groupby(codes[codes >= 0])
+        table = grouped.agg(
+            comment_count=('like_count', 'size'),
+            like_sum=('like_count', 'sum'),
+            like_mean=('like_count', 'mean'),
+            like_max=('like_count', 'max'),
+            like_median=('like_count', 'median'),
+            sentiment_mean=('score', 'mean'),
+            positive=('positive', 'sum'),
+            neutral=('neutral', 'sum'),
+            negative=('negative', 'sum'),
+        ).reset_index(drop=True)
+        table.insert(0, key, np.asarray(uniques, dtype=object))
+        table['keywords'] = group_top_terms(matrix, vocabulary, codes[doc_rows], len(uniques), top_k,
+                                            idf_table=self.comment_idf_table())
+        return table
+
+    def analyze_time_series(self):
+        """按 create_time 分桶的评论量、情绪与关键词趋势；整点桶聚合可缓存，只重算成员有变化的桶"""
+        print("\n=== 时间序列分析 ===")
+        if len(self.comments_data) == 0:
+            print("❌ 没有评论数据")
+            return None
+        df_comments = self.frame('comments')
+        if 'create_time' not in df_comments.columns:
+            print("❌ 评论数据缺少 create_time 字段")
+            return None
+
+        ts_cfg = self.config.get("analysis", {}).get("timeseries", {}) or {}
+        granularities = [g for g in ts_cfg.get("granularities", ['day', 'week']) if g in ('hour', 'day', 'week')]
+        timezone = ts_cfg.get("timezone", "Asia/Shanghai")
+        top_k = ts_cfg.get("top_keywords", 5)
+
+        with self.profiler.stage('timeseries_bucket', items=len(df_comments)):
+            hours = hour_buckets(df_comments['create_time'], timezone)
+            codes, uniques = pd.factorize(hours)
+            hour_keys = [t.strftime('%Y-%m-%dT%H:00') for t in uniques]
+            digests = bucket_digests(df_comments, codes, len(hour_keys))
+        cache_keys = [f"{timezone}|{key}" for key in hour_keys]
+
+        cache = self.get_cache()
+        cached = cache.get_buckets(dict(zip(cache_keys, digests))) if cache is not None else {}
+        stale = np.array([i for i, key in enumerate(cache_keys) if key not in cached], dtype=np.int64)
+        print(f"整点时间桶: {len(hour_keys)} 个，复用缓存 {len(hour_keys) - len(stale)} 个，重新计算 {len(stale)} 个")
+
+        records = {hour_keys[i]: cached[cache_keys[i]] for i in range(len(hour_keys)) if cache_keys[i] in cached}
+        if len(stale):
+            computed = self._compute_hour_buckets(df_comments, codes, stale)
+            for i, record in zip(stale, computed):
+                records[hour_keys[i]] = record
+            if cache is not None:
+                cache.put_buckets([(cache_keys[i], digests[i], record) for i, record in zip(stale, computed)])
+
+        with self.profiler.stage('timeseries_rollup', items=len(records)):
+            idf_table = self.comment_idf_table()
+            series = {granularity: rollup_buckets(records, granularity, top_k, idf_table)
+                      for granularity in granularities}
+        for granularity, periods in series.items():
+            print(f"{granularity}: {len(periods)} 个时间段")
+        if 'day' in series:
+            print("\n--- 最近的每日趋势 ---")
+            for period in series['day'][-7:]:
+                sentiment = f"{period['avg_sentiment']:.3f}" if period['avg_sentiment'] is not None else "-"
+                keywords = '、'.join(word for word, _ in period['keywords'])
+                print(f"{period['bucket']}: {period['count']} 条评论，平均情绪 {sentiment}，关键词 {keywords}")
+
+        return {'timezone': timezone, 'unknown_time': int((codes < 0).sum()), **series}
+
+    def _compute_hour_buckets(self, df_comments, codes, stale):
+        """计算指定整点桶的可合并聚合：评论量、点赞和、情绪计数与得分和、候选词词频"""
+        with self.profiler.stage('timeseries_compute') as record:
+            lookup = np.full(int(codes.max()) + 1, -1, dtype=np.int64)
+            lookup[stale] = np.arange(len(stale))
+            rows = np.flatnonzero((codes >= 0) & np.isin(codes, stale))
+            groups = lookup[codes[rows]]
+            n = len(stale)
+            record['items'] = len(rows)
+
+        scores, labels = self.comment_sentiments(rows)
+        matrix, vocabulary, doc_rows = self.comment_term_matrix(rows)
+
+        with self.profiler.stage('timeseries_compute'):
+            scored = ~np.isnan(scores)
+            likes = df_comments['like_count'].to_numpy(dtype=float)[rows] if 'like_count' in df_comments.columns \
+                else np.zeros(len(rows))
+            counts = np.bincount(groups, minlength=n)
+            like_sums = np.bincount(groups, weights=likes, minlength=n)
+            scored_counts = np.bincount(groups[scored], minlength=n)
+            score_sums = np.bincount(groups[scored], weights=scores[scored], minlength=n)
+            label_counts = {name: np.bincount(groups[labels == label], minlength=n)
+                            for name, label in (('positive', '积极'), ('neutral', '中性'), ('negative', '消极'))}
+            bucket_terms = group_term_counts(matrix, groups[doc_rows], n)
+            vocabulary = np.array(vocabulary, dtype=object)
+
+            computed = []
+            for i in range(n):
+                start, end = bucket_terms.indptr[i], bucket_terms.indptr[i + 1]
+                computed.append({
+                    'count': int(counts[i]),
+                    'likes': float(like_sums[i]),
+                    'scored': int(scored_counts[i]),
+                    'score_sum': float(score_sums[i]),
+                    'positive': int(label_counts['positive'][i]),
+                    'neutral': int(label_counts['neutral'][i]),
+                    'negative': int(label_counts['negative'][i]),
+                    'terms': dict(zip(vocabulary[bucket_terms.indices[start:end]].tolist(),
+                                      bucket_terms.data[start:end].astype(int).tolist())),
+                })
+        return computed
+
+    def output_path(self, name):
+        """输出目录（output.results_dir）下的文件路径，目录不存在时创建；name 为绝对路径时原样返回"""
+        os.makedirs(self.results_dir, exist_ok=True)
+        return os.path.join(self.results_dir, name)
+
+    def image_path(self, path):
+        """按 output.image_format 设置图片扩展名，返回输出目录下的绝对路径（子进程渲染不受工作目录变化影响）"""
+        image_format = (self.config.get("output", {}) or {}).get("image_format", "png")
+        return os.path.abspath(os.path.splitext(self.output_path(path))[0] + '.' + image_format.lstrip('.'))
+
+    def cjk_font(self):
+        """词云与图表使用的中文字体 (路径, 字体名)，只查找一次"""
+        wc_cfg = self.config.get("analysis", {}).get("wordcloud", {}) or {}
+        preferred = (self.config.get("visualization", {}) or {}).get("font_family")
+        font_path, font_name = resolve_cjk_font(preferred, wc_cfg.get("font_path"))
+        if font_path is None and not self._font_warned:
+            print("⚠️ 未找到中文字体，词云与图表中的中文可能无法显示（可在 analysis.wordcloud.font_path 指定字体文件）")
+            self._font_warned = True
+        return font_path, font_name
+
+    def _dpi(self):
+        return (self.config.get("visualization", {}) or {}).get("dpi", 300)
+
+    def wait_for_charts(self):
+        """等待后台渲染的图表全部写出"""
+        self.renderer.wait()
+
+    def plot_time_series(self, time_series, save_path='time_trends.png'):
+        """绘制评论量与情绪的时间趋势图，返回图片路径"""
+        granularity = next((g for g in ('day', 'week', 'hour') if time_series.get(g)), None)
+        if granularity is None:
+            print("❌ 没有时间序列数据，无法绘制趋势图")
+            return None
+        save_path = self.image_path(save_path)
+        self.renderer.submit('时间趋势图', render_time_series, time_series[granularity],
+                             (self.positive_threshold, self.negative_threshold), save_path, self._dpi(),
+                             self.cjk_font()[0])
+        return save_path
+
+    def generate_wordcloud(self, keywords, title="词云图", save_path='wordcloud.png'):
+        """生成词云图，返回图片路径"""
         if not keywords:
             print("❌ 没有关键词数据，无法生成词云")
-            return
+            return None
         word_freq = {word: weight for word, weight in keywords}
         # 读取词云配置
-        wc_cfg = self.config.get("analysis", {}).get("wordcloud", {})
-        width = wc_cfg.get("width", 1000)
-        height = wc_cfg.get("height", 500)
-        max_words = wc_cfg.get("max_words", 150)
-        background_color = wc_cfg.get("background_color", "white")
-        colormap = wc_cfg.get("colormap", "viridis")
-        wordcloud = WordCloud(
-            font_path='C:/Windows/Fonts/simhei.ttf',
-            width=width,
-            height=height,
-            background_color=background_color,
-            max_words=max_words,
-            colormap=colormap,
-            prefer_horizontal=0.7
-        ).generate_from_frequencies(word_freq)
-        plt.figure(figsize=(15, 8))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.title(title, fontsize=18)
-        plt.axis('off')
-        plt.tight_layout()
-        if save_path:
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
-            print(f"💾 词云图已保存到: {save_path}")
-        plt.show()
+        wc_cfg = dict(self.config.get("analysis", {}).get("wordcloud", {}) or {})
+        cache_dir = wc_cfg.pop("cache_dir", "cache/wordclouds")
+        font_path = self.cjk_font()[0]
+        save_path = self.image_path(save_path)
+        self.renderer.submit('词云图', render_wordcloud, word_freq, title, save_path, wc_cfg, self._dpi(),
+                             font_path, os.path.abspath(cache_dir) if cache_dir else None)
+        return save_path
     
     def create_visualizations(self, comment_analysis, content_analysis, creator_analysis):
-        """创建可视化图表"""
-        fig, axes = plt.subplots(2, 3, figsize=(20, 14))
-        
-        # 1. 评论情绪分布
+        """创建可视化图表，返回图片路径"""
+        data = {}
         if comment_analysis and 'sentiment_distribution' in comment_analysis:
-            sentiment_data = comment_analysis['sentiment_distribution']
-            colors = ['#ff9999', '#66b3ff', '#99ff99']
-            axes[0, 0].pie(sentiment_data.values(), labels=sentiment_data.keys(), 
-                          autopct='%1.1f%%', colors=colors)
-            axes[0, 0].set_title('评论情绪分布', fontsize=14)
-        
-        # 2. 评论长度分布
-        if self.comments_data:
-            df_comments = pd.DataFrame(self.comments_data)
-            df_comments['content_length'] = df_comments['content'].astype(str).str.len()
-            axes[0, 1].hist(df_comments['content_length'], bins=50, alpha=0.7, color='skyblue')
-            axes[0, 1].set_title('评论长度分布', fontsize=14)
-            axes[0, 1].set_xlabel('评论长度 (字符)')
-            axes[0, 1].set_ylabel('频次')
-        
-        # 3. 评论&创作者性别分布（合并显示，双y轴）
-        if (comment_analysis and 'sex_distribution' in comment_analysis) or (creator_analysis and 'gender_distribution' in creator_analysis):
-            comment_sex = comment_analysis.get('sex_distribution', {}) if comment_analysis else {}
-            creator_sex = creator_analysis.get('gender_distribution', {}) if creator_analysis else {}
-            # 统一性别标签
-            def _normalize_sex_label(label):
-                if str(label) in ['男', 'male', 'Male', '1', 1]:
-                    return '男'
-                elif str(label) in ['女', 'female', 'Female', '2', 2]:
-                    return '女'
-                elif str(label) in ['保密', '', None, '0', 0]:
-                    return '未知'
-                return str(label)
-            comment_sex_norm = {}
-            for k, v in comment_sex.items():
-                label = _normalize_sex_label(k)
-                comment_sex_norm[label] = comment_sex_norm.get(label, 0) + v
-            creator_sex_norm = {}
-            for k, v in creator_sex.items():
-                label = _normalize_sex_label(k)
-                creator_sex_norm[label] = creator_sex_norm.get(label, 0) + v
-            all_labels = ['男', '女', '未知']
-            x = np.arange(len(all_labels))
-            comment_counts = [comment_sex_norm.get(l, 0) for l in all_labels]
-            creator_counts = [creator_sex_norm.get(l, 0) for l in all_labels]
-            bar_width = 0.35
-        
-            # 主y轴画评论用户
-            axes[0, 2].bar(x - bar_width/2, comment_counts, width=bar_width, label='评论用户', color='skyblue', alpha=0.8, edgecolor='black', zorder=2)
-            axes[0, 2].set_ylabel('评论用户人数')
-            # 副y轴画创作者
-            ax2 = axes[0, 2].twinx()
-            ax2.bar(x + bar_width/2, creator_counts, width=bar_width, label='创作者', color='pink', alpha=0.8, edgecolor='black', zorder=3)
-            ax2.set_ylabel('创作者人数')
-        
-            axes[0, 2].set_xticks(list(x))
-            axes[0, 2].set_xticklabels(all_labels)
-            axes[0, 2].set_title('评论用户与创作者性别分布', fontsize=14)
-            axes[0, 2].grid(axis='y', linestyle='--', alpha=0.5, zorder=1)
-        
-            # 合并图例
-            handles1, labels1 = axes[0, 2].get_legend_handles_labels()
-            handles2, labels2 = ax2.get_legend_handles_labels()
-            axes[0, 2].legend(handles1 + handles2, labels1 + labels2, loc='upper right')
-        
-        # 4. 视频播放量分布
-        if self.contents_data:
-            df_contents = pd.DataFrame(self.contents_data)
-            play_counts = pd.to_numeric(df_contents['video_play_count'], errors='coerce').dropna()
-            axes[1, 0].hist(play_counts, bins=30, alpha=0.7, color='lightgreen')
-            axes[1, 0].set_title('视频播放量分布', fontsize=14)
-            axes[1, 0].set_xlabel('播放量')
-            axes[1, 0].set_ylabel('频次')
-        
-        # 5. 热门关键词
+            data['sentiment_distribution'] = dict(comment_analysis['sentiment_distribution'])
+        if len(self.comments_data) > 0:
+            data['content_length'] = self.frame('comments')['content_length'].to_numpy()
+        if comment_analysis and 'sex_distribution' in comment_analysis:
+            data['comment_sex'] = dict(comment_analysis['sex_distribution'])
+        if creator_analysis and 'gender_distribution' in creator_analysis:
+            data['creator_sex'] = dict(creator_analysis['gender_distribution'])
+        if len(self.contents_data) > 0:
+            data['play_counts'] = self.frame('contents')['video_play_count'].dropna().to_numpy()
         if comment_analysis and 'keywords' in comment_analysis:
-            keywords = comment_analysis['keywords'][:12]  # 显示更多关键词
-            words = [word for word, _ in keywords]
-            weights = [weight for _, weight in keywords]
-            
-            y_pos = range(len(words))
-            axes[1, 1].barh(y_pos, weights, color='orange')
-            axes[1, 1].set_yticks(y_pos)
-            axes[1, 1].set_yticklabels(words)
-            axes[1, 1].set_title('评论热门关键词', fontsize=14)
-            axes[1, 1].set_xlabel('权重')
-        
-        # 6. 标题情绪分布
+            data['keywords'] = list(comment_analysis['keywords'][:12])
         if content_analysis and 'title_sentiment' in content_analysis:
-            title_sentiment = content_analysis['title_sentiment']
-            axes[1, 2].pie(title_sentiment.values(), labels=title_sentiment.keys(), 
-                          autopct='%1.1f%%', colors=['#ff9999', '#66b3ff', '#99ff99'])
-            axes[1, 2].set_title('视频标题情绪分布', fontsize=14)
-        
-        plt.tight_layout()
-        
-        # 保存图表
-        save_path = 'results/analysis_charts.png'
-        os.makedirs('results', exist_ok=True)
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
-        print(f"💾 分析图表已保存到: {save_path}")
-        
-        plt.show()
+            data['title_sentiment'] = dict(content_analysis['title_sentiment'])
+
+        save_path = self.image_path('analysis_charts.png')
+        self.renderer.submit('分析图表', render_analysis_charts, data, save_path, self._dpi(), self.cjk_font()[0])
+        return save_path
     
+    def write_score_arrays(self, results):
+        """output.score_arrays 为 npy 时把逐条情绪得分写为输出目录下的 .npy 文件，结果中只记录文件名
+
+        JSON 中保留得分摘要与直方图，不再逐个写出浮点数；设为 json 时得分数组仍内联在结果中。
+        """
+        if (self.config.get("output", {}) or {}).get("score_arrays", "npy") != "npy":
+            return results
+        for section, key in SCORE_ARRAYS:
+            analysis = results.get(section)
+            if not analysis or key not in analysis:
+                continue
+            name = key + '.npy'
+            path = self.output_path(name)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.asarray(analysis.pop(key), dtype=np.float64))
+            os.replace(tmp_path, path)
+            analysis[key + '_file'] = name
+        return results
+
     def convert_to_serializable(self, obj):
         """将对象转换为JSON可序列化的格式"""
         if isinstance(obj, np.integer):
@@ -672,56 +2776,329 @@ class BilibiliTextAnalyzer:
         else:
             return obj
     
-    def comprehensive_analysis(self):
-        """综合分析"""
+    def set_workers(self, workers):
+        """覆盖配置中的分词/情绪分析进程数与图表渲染进程数"""
+        self.config.setdefault("analysis", {}).setdefault("parallel", {})["workers"] = workers
+        self.config.setdefault("visualization", {})["render_workers"] = workers
+        # 与 _parallel_config 一致，0 表示使用全部CPU核心
+        self.renderer.workers = int(workers or os.cpu_count() or 1)
+
+    def _stage_enabled(self, stages, stage):
+        """阶段是否被选中；dedup / groups / timeseries 还需在配置中开启（见 STAGE_CONFIG_KEYS）并装有 scipy"""
+        if stage not in stages:
+            return False
+        config_key = STAGE_CONFIG_KEYS.get(stage)
+        if config_key is not None and not (self.config.get("analysis", {}).get(config_key, {}) or {}).get("enabled", False):
+            return False
+        return self._has_dependencies(f"{stage} 阶段", STAGE_DEPENDENCIES.get(stage, ()))
+
+    def comprehensive_analysis(self, stages=None, data_files=None):
+        """综合分析：stages 为要执行的阶段（见 ANALYSIS_STAGES，默认全部），data_files 为 {类型: 路径或路径列表}"""
+        stages = set(ANALYSIS_STAGES if stages is None else stages)
         print("🚀 开始综合文本分析...")
         
-        # 加载数据
-        self.load_data()
+        # 加载数据（只读取选中阶段用到的数据和列）
+        needed = defaultdict(set)
+        for stage, stage_columns in STAGE_COLUMNS.items():
+            if self._stage_enabled(stages, stage):
+                for kind, kind_columns in stage_columns.items():
+                    needed[kind].update(kind_columns)
+        columns = {kind: [c for c in ANALYSIS_COLUMNS[kind] if c in needed[kind]] for kind in needed}
+        self.load_data(data_files, columns, columns)
+        keywords = 'keywords' in stages
+
+        # 近似重复/刷屏评论检测（在配置中开启），按 mode 折叠或降权后再进入各分析阶段
+        dedup = None
+        if self._stage_enabled(stages, 'dedup'):
+            with self.profiler.stage('dedup'):
+                dedup = self.detect_duplicates()
         
         # 分析评论
-        comment_analysis = self.analyze_comments()
+        comment_analysis = self.analyze_comments(keywords) if 'comments' in stages else None
         
         # 分析视频内容
-        content_analysis = self.analyze_video_content()
+        content_analysis = self.analyze_video_content(keywords) if 'content' in stages else None
         
         # 分析创作者
-        creator_analysis = self.analyze_creators()
-        
+        creator_analysis = self.analyze_creators(keywords) if 'creators' in stages else None
+
+        # 按视频/创作者分组分析（需要对全部评论打分，在配置中开启）
+        group_analysis = None
+        if self._stage_enabled(stages, 'groups'):
+            with self.profiler.stage('groups'):
+                group_analysis = self.analyze_groups()
+
+        # 按 create_time 的时间序列分析（需要对全部评论打分，在配置中开启）
+        time_series = None
+        if self._stage_enabled(stages, 'timeseries'):
+            with self.profiler.stage('timeseries'):
+                time_series = self.analyze_time_series()
+        
+        # 多进程渲染时只提交任务，图片在后台写出；字体文件路径随任务传入，由渲染进程自行登记
+        charts = {}
+
         # 生成可视化
-        print("\n=== 生成可视化图表 ===")
-        self.create_visualizations(comment_analysis, content_analysis, creator_analysis)
+        if 'charts' in stages:
+            print("\n=== 生成可视化图表 ===")
+            with self.profiler.stage('charts'):
+                charts['analysis_charts'] = self.create_visualizations(comment_analysis, content_analysis, creator_analysis)
+                if time_series:
+                    charts['time_trends'] = self.plot_time_series(time_series)
         
         # 生成词云图
-        if comment_analysis and 'keywords' in comment_analysis:
-            print("\n=== 生成评论词云图 ===")
-            self.generate_wordcloud(comment_analysis['keywords'], 
-                                  "评论关键词词云", 
-                                  "results/comment_wordcloud.png")
-        
-        if content_analysis and 'title_keywords' in content_analysis:
-            print("\n=== 生成标题词云图 ===")
-            self.generate_wordcloud(content_analysis['title_keywords'], 
-                                  "视频标题关键词词云",
-                                  "results/title_wordcloud.png")
+        if 'wordcloud' in stages:
+            for analysis, key, title, name, label in (
+                    (comment_analysis, 'keywords', "评论关键词词云", "comment_wordcloud.png", "评论"),
+                    (content_analysis, 'title_keywords', "视频标题关键词词云", "title_wordcloud.png", "标题"),
+                    (content_analysis, 'desc_keywords', "视频简介关键词词云", "desc_wordcloud.png", "视频简介"),
+                    (creator_analysis, 'sign_keywords', "创作者签名关键词词云", "sign_wordcloud.png", "创作者签名")):
+                if analysis and analysis.get(key):
+                    print(f"\n=== 生成{label}词云图 ===")
+                    with self.profiler.stage('wordcloud', items=1):
+                        charts[os.path.splitext(name)[0]] = self.generate_wordcloud(analysis[key], title, name)
         
         print("\n✅ 分析完成！")
         
         return {
             'comment_analysis': comment_analysis,
             'content_analysis': content_analysis,
-            'creator_analysis': creator_analysis
+            'creator_analysis': creator_analysis,
+            'dedup': dedup,
+            'group_analysis': group_analysis,
+            'time_series': time_series,
+            'charts': {name: os.path.relpath(path) for name, path in charts.items() if path},
+        }
+
+    def _incremental_config(self):
+        """读取增量模式配置，返回 (数据目录, 状态文件路径)"""
+        incremental_cfg = self.config.get("incremental", {}) or {}
+        return (incremental_cfg.get("data_dir", "data"),
+                incremental_cfg.get("state_path", "cache/incremental_state.json"))
+
+    def incremental_analysis(self, data_dir=None):
+        """增量分析：只处理新数据文件中未见过的记录，合并进持久化状态后由状态生成完整结果"""
+        print("🚀 开始增量文本分析...")
+        default_dir, state_path = self._incremental_config()
+        state = IncrementalState.load(state_path, self._cache_fingerprint(), self._term_capacity())
+        merge = {
+            'comments': self._merge_comments,
+            'contents': self._merge_contents,
+            'creators': self._merge_creators,
+        }
+
+        for date, data_files in discover_data_files(data_dir or default_dir):
+            pending = [kind for kind in RECORD_KEYS
+                       if kind in data_files and not state.is_processed(data_files[kind])]
+            if not pending:
+                continue
+            print(f"\n=== 合并 {date} 的数据 ===")
+            for kind in pending:
+                with self.profiler.stage('load') as record:
+                    df = self.read_columns(kind, ANALYSIS_COLUMNS[kind], data_files)
+                    record['items'] = len(df)
+                new_df = state.take_unseen(kind, df) if len(df) else df
+                print(f"{kind}: {len(df)} 条，其中新增 {len(new_df)} 条")
+                if len(new_df):
+                    merge[kind](state, new_df)
+                state.mark_processed(data_files[kind])
+            # 每个日期处理完即保存，中断后可从下一个日期继续
+            state.save(state_path)
+
+        print(f"\n💾 增量状态已保存到 {state_path}")
+        return self.incremental_results(state)
+
+    def _merge_comments(self, state, df):
+        """把一批新评论的计数、情绪直方图和词频合并进状态（新增评论全部打分，不再采样）"""
+        summary = state.comments
+        df = self._typed_frame('comments', df)
+        valid_df = df[df['content'].notna()]
+        summary['total'] += len(df)
+        summary['valid'] += len(valid_df)
+        summary['lengths'].update(value_counter(df['content_length'], fill_missing=False))
+        summary['likes'].update(value_counter(df['like_count']))
+        if 'sex' in df.columns:
+            sex = df['sex'].astype(object).fillna('未知').replace('', '未知').astype(str)
+            summary['sex'].update(sex.value_counts().to_dict())
+
+        texts = [str(text) for text in valid_df['content']]
+        comment_ids = valid_df['comment_id'].tolist() if 'comment_id' in valid_df.columns else None
+        scores, labels = self.sentiment_batch(texts, comment_ids=comment_ids)
+        summary['sentiment'].update(Counter(labels))
+        summary['sentiment_histogram'] = [a + b for a, b in zip(summary['sentiment_histogram'],
+                                                                sentiment_histogram(scores))]
+        summary['sentiment_sum'] += float(scores.sum())
+        summary['keywords'].merge(self.keyword_stats(self.tokenize_corpus(texts, comment_ids=comment_ids)))
+
+    def _merge_contents(self, state, df):
+        """把一批新视频的播放量、标题情绪和标题/描述词频合并进状态"""
+        summary = state.contents
+        df = self._typed_frame('contents', df)
+        summary['total'] += len(df)
+        summary['play_counts'].update(value_counter(df['video_play_count']))
+
+        titles = df['title'].dropna().tolist()
+        summary['title_keywords'].merge(self.keyword_stats(self.tokenize_corpus(titles)))
+        summary['desc_keywords'].merge(self.keyword_stats(self.tokenize_corpus(df['desc'].dropna().tolist())))
+        scores, labels = self.sentiment_batch(titles)
+        summary['title_sentiment'].update(Counter(labels))
+        summary['title_sentiment_histogram'] = [a + b for a, b in zip(summary['title_sentiment_histogram'],
+                                                                      sentiment_histogram(scores))]
+
+    def _merge_creators(self, state, df):
+        """把一批新创作者的性别、粉丝数和签名词频合并进状态"""
+        summary = state.creators
+        df = self._typed_frame('creators', df)
+        summary['total'] += len(df)
+        summary['sex'].update({str(k): int(v) for k, v in df['sex'].value_counts().items() if v > 0})
+        summary['fans'].update(value_counter(df['total_fans']))
+        summary['sign_keywords'].merge(self.keyword_stats(self.tokenize_corpus(df['sign'].dropna().tolist())))
+
+    def incremental_results(self, state):
+        """由增量状态生成与全量分析结构一致的结果"""
+        top_k = self.config.get("analysis", {}).get("top_keywords", 20)
+        results = {'comment_analysis': None, 'content_analysis': None, 'creator_analysis': None}
+
+        comments = state.comments
+        if comments['total']:
+            lengths = counter_stats(comments['lengths'])
+            likes = counter_stats(comments['likes'])
+            advanced_keywords = self.rank_keywords(comments['keywords'], top_k)
+            scored = sum(comments['sentiment'].values())
+            results['comment_analysis'] = {
+                'sentiment_distribution': dict(comments['sentiment']),
+                'sentiment_histogram': comments['sentiment_histogram'],
+                'avg_sentiment': comments['sentiment_sum'] / scored if scored else None,
+                'advanced_keywords': advanced_keywords,
+                'tfidf_keywords': self.method_keywords(comments['keywords'], top_k, 'tfidf'),
+                'textrank_keywords': self.method_keywords(comments['keywords'], top_k, 'textrank'),
+                'keywords': advanced_keywords,
+                'keyword_frequency': self.frequency_summary(comments['keywords']),
+                'basic_stats': {
+                    'total': comments['total'],
+                    'valid': comments['valid'],
+                    'avg_length': lengths['mean'],
+                    'max_length': int(lengths['max']),
+                    'min_length': int(lengths['min']),
+                    'avg_likes': likes['mean'],
+                    'max_likes': int(likes['max']),
+                    'median_likes': likes['median'],
+                },
+                'sex_distribution': dict(comments['sex']),
+            }
+
+        contents = state.contents
+        if contents['total']:
+            plays = counter_stats(contents['play_counts'])
+            results['content_analysis'] = {
+                'title_keywords': self.rank_keywords(contents['title_keywords'], top_k),
+                'desc_keywords': self.rank_keywords(contents['desc_keywords'], top_k),
+                'title_sentiment': dict(contents['title_sentiment']),
+                'title_sentiment_histogram': contents['title_sentiment_histogram'],
+                'video_stats': {
+                    'total_videos': contents['total'],
+                    'avg_play_count': plays['mean'],
+                    'max_play_count': int(plays['max']),
+                    'median_play_count': plays['median'],
+                },
+            }
+
+        creators = state.creators
+        if creators['total']:
+            fans = counter_stats(creators['fans'])
+            results['creator_analysis'] = {
+                'gender_distribution': dict(creators['sex'].most_common()),
+                'fan_stats': {
+                    'avg_fans': fans['mean'],
+                    'max_fans': int(fans['max']),
+                    'median_fans': fans['median'],
+                },
+                'sign_keywords': self.rank_keywords(creators['sign_keywords'], top_k),
+            }
+
+        results['incremental'] = {
+            'processed_files': sorted(state.files),
+            'records': {kind: len(ids) for kind, ids in state.seen.items()},
         }
+        return results
+
+def _iso_date(value):
+    """命令行日期参数：YYYY-MM-DD"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date().isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"日期格式应为 YYYY-MM-DD: {value}")
+
+
+def _stage_list(value):
+    """命令行阶段参数：逗号分隔，只能是 ANALYSIS_STAGES 中的阶段"""
+    stages = [stage.strip() for stage in value.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in ANALYSIS_STAGES]
+    if unknown or not stages:
+        raise argparse.ArgumentTypeError(f"未知的阶段: {', '.join(unknown) or value}（可选 {','.join(ANALYSIS_STAGES)}）")
+    return stages
 
-def main():
+
+def main(argv=None):
     """主函数"""
-    analyzer = BilibiliTextAnalyzer()
-    results = analyzer.comprehensive_analysis()
+    parser = argparse.ArgumentParser(description="B站评论、视频与创作者文本分析")
+    parser.add_argument('--config', default='config.yaml', help="配置文件路径")
+    parser.add_argument('--input', nargs='+', default=None, metavar='GLOB',
+                        help="输入文件通配符，可写多个，如 'data/search_*_2025-07-*.json'；"
+                             "按文件名中的 comments / contents / creators 识别类型（默认使用内置的三个数据文件）")
+    parser.add_argument('--since', type=_iso_date, default=None,
+                        help="只分析文件名日期不早于该日期的数据文件（YYYY-MM-DD）")
+    parser.add_argument('--until', type=_iso_date, default=None,
+                        help="只分析文件名日期不晚于该日期的数据文件（YYYY-MM-DD）")
+    parser.add_argument('--stages', type=_stage_list, default=list(ANALYSIS_STAGES),
+                        help=f"要执行的阶段，逗号分隔（默认全部：{','.join(ANALYSIS_STAGES)}）；"
+                             "如 comments,report 只刷新评论情绪与统计，不分词、不绘图")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="分词、情绪分析与图表渲染的进程数（覆盖配置，1 为单进程，0 为全部CPU核心）")
+    parser.add_argument('--output-dir', default=None,
+                        help="输出目录（默认使用 config.yaml 中的 output.results_dir）")
+    parser.add_argument('--incremental', action='store_true',
+                        help="增量模式：只处理新出现的按日期命名的数据文件，合并进已有汇总后重新生成结果")
+    parser.add_argument('--data-dir', default=None,
+                        help="增量模式扫描的数据目录（默认使用 config.yaml 中的 incremental.data_dir）")
+    parser.add_argument('--stats-only', action='store_true',
+                        help="只输出评论量、长度、点赞、播放量、粉丝数等基础统计，不加载分词、情绪分析与绘图相关的库")
+    args = parser.parse_args(argv)
+
+    analyzer = BilibiliTextAnalyzer(args.config)
+    if args.output_dir:
+        analyzer.results_dir = args.output_dir
+    if args.workers is not None:
+        analyzer.set_workers(args.workers)
+    data_files = None
+    if args.input or args.since or args.until:
+        data_files = resolve_input_files(args.input or list(DATA_FILES.values()), args.since, args.until)
+        print("📂 输入文件: " + ('；'.join(f"{kind} {len(paths)} 个" for kind, paths in data_files.items()) or "无"))
+
+    if args.stats_only:
+        analyzer.load_data(data_files)
+        with analyzer.profiler.stage('basic_stats'):
+            stats = analyzer.basic_statistics()
+        stats['analysis_timestamp'] = datetime.now().isoformat()
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        stats_path = analyzer.output_path('basic_stats.json')
+        with open(stats_path, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+        print(f"📁 基础统计已保存到 {stats_path}")
+        return
+    if args.incremental:
+        results = analyzer.incremental_analysis(args.data_dir)
+    else:
+        results = analyzer.comprehensive_analysis(args.stages, data_files)
     
     # 保存分析结果
     try:
+        # 逐条得分写为 .npy 旁路文件，JSON 只保留摘要与直方图
+        with analyzer.profiler.stage('score_arrays'):
+            analyzer.write_score_arrays(results)
+
         # 转换为可序列化的格式
-        serializable_results = analyzer.convert_to_serializable(results)
+        with analyzer.profiler.stage('serialize'):
+            serializable_results = analyzer.convert_to_serializable(results)
         
         # 保存更多关键词
         if 'comment_analysis' in serializable_results and serializable_results['comment_analysis']:
@@ -748,19 +3125,33 @@ def main():
         serializable_results['analysis_timestamp'] = datetime.now().isoformat()
         
         # 保存到文件
-        os.makedirs('results', exist_ok=True)
-        with open('results/analysis_results.json', 'w', encoding='utf-8') as f:
-            json.dump(serializable_results, f, ensure_ascii=False, indent=2)
-        print("📁 分析结果已保存到 results/analysis_results.json")
+        results_path = analyzer.output_path('analysis_results.json')
+        with analyzer.profiler.stage('save_results'):
+            with open(results_path, 'w', encoding='utf-8') as f:
+                json.dump(serializable_results, f, ensure_ascii=False, indent=2)
+        print(f"📁 分析结果已保存到 {results_path}")
         
         # 生成分析报告
-        generate_analysis_report(serializable_results)
+        if 'report' in args.stages:
+            with analyzer.profiler.stage('report'):
+                generate_analysis_report(serializable_results, analyzer.results_dir)
+        
+        # 等待后台渲染的图表写出
+        with analyzer.profiler.stage('render_wait'):
+            analyzer.wait_for_charts()
+        
+        # 保存各阶段性能指标
+        if analyzer.profiler.enabled:
+            analyzer.profiler.summary()
+            metrics_path = analyzer.output_path('analysis_metrics.json')
+            analyzer.profiler.save(metrics_path)
+            print(f"⏱️ 性能指标已保存到 {metrics_path}")
         
     except Exception as e:
         print(f"⚠️ 保存结果时出错: {e}")
 
-def generate_analysis_report(results):
-    """生成分析报告"""
+def generate_analysis_report(results, results_dir='results'):
+    """生成分析报告，保存到 results_dir/analysis_report.md"""
     try:
         report_content = f"""# B站数据分析报告
 
@@ -786,14 +3177,18 @@ def generate_analysis_report(results):
 - 积极评论: {sentiment_dist.get('积极', 0)} 条 ({sentiment_dist.get('积极', 0)/(sentiment_dist.get('积极', 0)+sentiment_dist.get('中性', 0)+sentiment_dist.get('消极', 0))*100:.1f}%)
 - 中性评论: {sentiment_dist.get('中性', 0)} 条 ({sentiment_dist.get('中性', 0)/(sentiment_dist.get('积极', 0)+sentiment_dist.get('中性', 0)+sentiment_dist.get('消极', 0))*100:.1f}%)
 - 消极评论: {sentiment_dist.get('消极', 0)} 条 ({sentiment_dist.get('消极', 0)/(sentiment_dist.get('积极', 0)+sentiment_dist.get('中性', 0)+sentiment_dist.get('消极', 0))*100:.1f}%)
-
-#### 热门关键词 (高级组合算法)
 """
             if 'advanced_keywords' in results['comment_analysis']:
+                report_content += "\n#### 热门关键词 (高级组合算法)\n"
                 keywords = results['comment_analysis']['advanced_keywords'][:20]
                 for i, (word, weight) in enumerate(keywords, 1):
                     report_content += f"{i}. {word} (权重: {weight:.4f})\n"
             
+            frequency_summary = results['comment_analysis'].get('keyword_frequency') or {}
+            if frequency_summary.get('mode') == 'space_saving':
+                report_content += (f"\n> 词频为 Space-Saving 近似计数（跟踪 {frequency_summary['tracked_terms']:,} 个词），"
+                                   f"单词频次最大高估 {frequency_summary['max_error']:,}\n")
+            
             if 'tfidf_keywords' in results['comment_analysis']:
                 report_content += "\n#### 热门关键词 (TF-IDF)\n"
                 keywords = results['comment_analysis']['tfidf_keywords'][:15]
@@ -805,6 +3200,41 @@ def generate_analysis_report(results):
                 keywords = results['comment_analysis']['textrank_keywords'][:15]
                 for i, (word, weight) in enumerate(keywords, 1):
                     report_content += f"{i}. {word} (权重: {weight:.4f})\n"
+            
+            like_weighted = results['comment_analysis'].get('like_weighted')
+            if like_weighted:
+                weighted_dist = like_weighted['sentiment_distribution']
+                weighted_total = sum(weighted_dist.values()) or 1
+                report_content += f"""
+#### 点赞加权（{like_weighted['function']}）
+- 积极/中性/消极: {weighted_dist.get('积极', 0)/weighted_total*100:.1f}% / {weighted_dist.get('中性', 0)/weighted_total*100:.1f}% / {weighted_dist.get('消极', 0)/weighted_total*100:.1f}%
+"""
+                if like_weighted.get('avg_sentiment') is not None:
+                    report_content += f"- 加权平均情绪得分: {like_weighted['avg_sentiment']:.3f}\n"
+                if like_weighted.get('tfidf_keywords'):
+                    report_content += "\n加权TF-IDF关键词:\n"
+                    for i, (word, weight) in enumerate(like_weighted['tfidf_keywords'][:15], 1):
+                        report_content += f"{i}. {word} (权重: {weight:.4f})\n"
+        
+        # 重复/刷屏评论部分
+        if results.get('dedup'):
+            dedup = results['dedup']
+            mode_label = {'collapse': '已折叠，每簇保留点赞最多的一条',
+                          'downweight': '簇内评论按 1/簇大小 计入情绪分布与关键词',
+                          'report': '仅报告，未改动分析数据'}.get(dedup['mode'], dedup['mode'])
+            report_content += f"""
+#### 重复/刷屏评论（MinHash/LSH，相似度 ≥ {dedup['params']['threshold']}）
+- **重复簇**: {dedup['clusters']:,} 个，涉及评论 {dedup['duplicate_comments']:,} 条
+- **冗余评论**: {dedup['redundant_comments']:,} 条 ({dedup['duplicate_ratio']*100:.1f}%)，{mode_label}
+- **最大簇**: {dedup['largest_cluster']:,} 条（完整结果见 {os.path.join(results_dir, 'duplicate_clusters.csv')}）
+
+| 簇大小 | 总点赞 | 视频数 | 示例 |
+|---|---|---|---|
+"""
+            for cluster in dedup['top_clusters'][:10]:
+                sample = cluster['sample'][:50].replace('|', '｜').replace('\n', ' ')
+                report_content += (f"| {cluster['size']} | {cluster['like_sum']:,.0f} | "
+                                   f"{cluster['video_count']} | {sample} |\n")
         
         # 视频内容分析部分
         if 'content_analysis' in results and results['content_analysis']:
@@ -822,10 +3252,9 @@ def generate_analysis_report(results):
 - 积极标题: {title_sentiment.get('积极', 0)} 个
 - 中性标题: {title_sentiment.get('中性', 0)} 个
 - 消极标题: {title_sentiment.get('消极', 0)} 个
-
-#### 视频标题热门关键词
 """
             if 'title_keywords' in results['content_analysis']:
+                report_content += "\n#### 视频标题热门关键词\n"
                 keywords = results['content_analysis']['title_keywords'][:15]
                 for i, (word, weight) in enumerate(keywords, 1):
                     report_content += f"{i}. {word} (权重: {weight:.4f})\n"
@@ -847,18 +3276,69 @@ def generate_analysis_report(results):
 - **平均粉丝数**: {fan_stats['avg_fans']:,.0f}
 - **最高粉丝数**: {fan_stats['max_fans']:,}
 - **粉丝数中位数**: {fan_stats['median_fans']:,.0f}
-
-#### 个性签名热门关键词
 """
             if 'sign_keywords' in results['creator_analysis']:
+                report_content += "\n#### 个性签名热门关键词\n"
                 keywords = results['creator_analysis']['sign_keywords'][:10]
                 for i, (word, weight) in enumerate(keywords, 1):
                     report_content += f"{i}. {word} (权重: {weight:.4f})\n"
         
+        # 分组分析部分
+        if results.get('group_analysis'):
+            group_analysis = results['group_analysis']
+            report_content += f"""
+### 视频/创作者分组分析
+- **视频数**: {group_analysis['video_count']:,} 个（完整结果见 {os.path.join(results_dir, 'video_groups.csv')}）
+- **创作者数**: {group_analysis['creator_count']:,} 人（完整结果见 {os.path.join(results_dir, 'creator_groups.csv')}）
+
+#### 评论最多的视频
+| 视频 | 评论数 | 平均点赞 | 平均情绪 | 积极/中性/消极 | 关键词 |
+|---|---|---|---|---|---|
+"""
+            for video in group_analysis['videos'][:10]:
+                keywords = '、'.join(word for word, _ in video['keywords'])
+                report_content += (f"| {video.get('title') or video['video_id']} | {video['comment_count']} | "
+                                   f"{video['like_mean']:.1f} | {video['sentiment_mean']:.3f} | "
+                                   f"{video['positive']}/{video['neutral']}/{video['negative']} | {keywords} |\n")
+
+            report_content += """
+#### 评论最多的创作者
+| 创作者 | 视频数 | 评论数 | 平均情绪 | 关键词 |
+|---|---|---|---|---|
+"""
+            for creator in group_analysis['creators'][:10]:
+                keywords = '、'.join(word for word, _ in creator['keywords'])
+                report_content += (f"| {creator.get('nickname') or creator['creator_id']} | {creator.get('video_count', 0)} | "
+                                   f"{creator['comment_count']} | {creator['sentiment_mean']:.3f} | {keywords} |\n")
+        
+        # 时间趋势部分
+        if results.get('time_series'):
+            time_series = results['time_series']
+            report_content += f"""
+### 时间趋势（{time_series['timezone']}）
+![时间趋势]({os.path.basename((results.get('charts') or {}).get('time_trends') or 'time_trends.png')})
+"""
+            for granularity, title, limit in (('day', '每日', 14), ('week', '每周', 12)):
+                periods = time_series.get(granularity) or []
+                if not periods:
+                    continue
+                report_content += f"""
+#### {title}评论量与情绪（最近 {min(limit, len(periods))} 个时间段）
+| 时间段 | 评论数 | 平均情绪 | 积极/中性/消极 | 关键词 |
+|---|---|---|---|---|
+"""
+                for period in periods[-limit:]:
+                    sentiment = f"{period['avg_sentiment']:.3f}" if period['avg_sentiment'] is not None else "-"
+                    keywords = '、'.join(word for word, _ in period['keywords'])
+                    report_content += (f"| {period['bucket']} | {period['count']} | {sentiment} | "
+                                       f"{period['positive']}/{period['neutral']}/{period['negative']} | {keywords} |\n")
+        
         # 保存报告
-        with open('results/analysis_report.md', 'w', encoding='utf-8') as f:
+        os.makedirs(results_dir, exist_ok=True)
+        report_path = os.path.join(results_dir, 'analysis_report.md')
+        with open(report_path, 'w', encoding='utf-8') as f:
             f.write(report_content)
-        print("📊 分析报告已保存到 results/analysis_report.md")
+        print(f"📊 分析报告已保存到 {report_path}")
         
     except Exception as e:
         print(f"⚠️ 生成报告时出错: {e}")
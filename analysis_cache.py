@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+
+class AnalysisCache:
+    """评论情绪得分与分词结果的本地SQLite缓存，以 comment_id + 内容哈希 为键"""
+
+    # 各类缓存内容失效时执行的语句；情绪与分词结果共用一行，两者都失效后删除该行
+    INVALIDATE = {
+        'sentiment': "UPDATE entries SET score = NULL, label = NULL",
+        'tokens': "UPDATE entries SET tokens = NULL",
+        'buckets': "DELETE FROM buckets",
+    }
+
+    def __init__(self, path, fingerprints, max_size_mb=512):
+        """fingerprints 为 {sentiment / tokens / buckets: 配置指纹}，某类指纹变化时只清除该类缓存"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "comment_id TEXT, content_hash TEXT, score REAL, label TEXT, tokens TEXT, "
+            "last_used REAL, PRIMARY KEY (comment_id, content_hash))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON entries (last_used)")
+        # 时间序列分析的整点桶聚合，以桶键 + 成员指纹判定是否需要重算
+        self.conn.execute("CREATE TABLE IF NOT EXISTS buckets (bucket TEXT PRIMARY KEY, digest TEXT, data TEXT)")
+
+        # 按类型比对指纹：切换情感后端或阈值不影响已缓存的分词结果
+        for kind, statement in self.INVALIDATE.items():
+            key = f"fingerprint:{kind}"
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            if row is None or row[0] != fingerprints[kind]:
+                self.conn.execute(statement)
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, fingerprints[kind]))
+        self.conn.execute("DELETE FROM entries WHERE score IS NULL AND tokens IS NULL")
+        # 旧版本的整体指纹
+        self.conn.execute("DELETE FROM meta WHERE key = 'fingerprint'")
+        self.conn.commit()
+
+    @staticmethod
+    def content_hash(text):
+        """文本内容哈希"""
+        return hashlib.blake2b(str(text).encode('utf-8'), digest_size=16).hexdigest()
+
+    def get_many(self, keys, field):
+        """批量查询，keys 为 (comment_id, 内容哈希) 列表，返回命中项 {键: 值}"""
+        column = {'sentiment': 'score, label', 'tokens': 'tokens'}[field]
+        wanted = set(keys)
+        comment_ids = list(dict.fromkeys(cid for cid, _ in wanted))
+        found = {}
+        for start in range(0, len(comment_ids), 900):
+            batch = comment_ids[start:start + 900]
+            rows = self.conn.execute(
+                f"SELECT comment_id, content_hash, {column} FROM entries "
+                f"WHERE comment_id IN ({','.join('?' * len(batch))}) AND {column.split(',')[0]} IS NOT NULL",
+                batch,
+            )
+            for row in rows:
+                key = (row[0], row[1])
+                if key in wanted:
+                    found[key] = (row[2], row[3]) if field == 'sentiment' else self._decode_tokens(row[2])
+        if found:
+            now = datetime.now().timestamp()
+            self.conn.executemany("UPDATE entries SET last_used = ? WHERE comment_id = ? AND content_hash = ?",
+                                  [(now, cid, h) for cid, h in found])
+            self.conn.commit()
+        return found
+
+    def put_sentiments(self, items):
+        """写入情绪结果，items 为 ((comment_id, 哈希), 得分, 标签) 列表"""
+        now = datetime.now().timestamp()
+        self.conn.executemany(
+            "INSERT INTO entries (comment_id, content_hash, score, label, last_used) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (comment_id, content_hash) DO UPDATE SET score = excluded.score, "
+            "label = excluded.label, last_used = excluded.last_used",
+            [(cid, h, float(score), str(label), now) for (cid, h), score, label in items],
+        )
+        self._evict()
+
+    def put_tokens(self, items):
+        """写入分词结果，items 为 ((comment_id, 哈希), (词序列, 词性序列)) 列表"""
+        now = datetime.now().timestamp()
+        self.conn.executemany(
+            "INSERT INTO entries (comment_id, content_hash, tokens, last_used) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (comment_id, content_hash) DO UPDATE SET tokens = excluded.tokens, "
+            "last_used = excluded.last_used",
+            [(cid, h, self._encode_tokens(seg), now) for (cid, h), seg in items],
+        )
+        self._evict()
+
+    def get_buckets(self, digests):
+        """批量读取时间桶聚合，digests 为 {桶键: 成员指纹}，只返回指纹一致的桶"""
+        keys = list(digests)
+        found = {}
+        for start in range(0, len(keys), 900):
+            batch = keys[start:start + 900]
+            rows = self.conn.execute(
+                f"SELECT bucket, digest, data FROM buckets WHERE bucket IN ({','.join('?' * len(batch))})", batch)
+            for bucket, digest, data in rows:
+                if digests[bucket] == digest:
+                    found[bucket] = json.loads(data)
+        return found
+
+    def put_buckets(self, items):
+        """写入时间桶聚合，items 为 (桶键, 成员指纹, 聚合字典) 列表"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO buckets (bucket, digest, data) VALUES (?, ?, ?)",
+            [(bucket, digest, json.dumps(data, ensure_ascii=False)) for bucket, digest, data in items],
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def _encode_tokens(segmented):
+        words, pairs = segmented
+        return json.dumps([words, [w for w, _ in pairs], [f for _, f in pairs]], ensure_ascii=False)
+
+    @staticmethod
+    def _decode_tokens(raw):
+        words, pos_words, flags = json.loads(raw)
+        return tuple(words), tuple(zip(pos_words, flags))
+
+    def _used_bytes(self):
+        page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free_pages) * page_size
+
+    def _evict(self):
+        """超过容量上限时按最近使用时间淘汰最旧的条目"""
+        self.conn.commit()
+        while self._used_bytes() > self.max_bytes:
+            total = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if not total:
+                break
+            self.conn.execute(
+                "DELETE FROM entries WHERE rowid IN "
+                "(SELECT rowid FROM entries ORDER BY last_used LIMIT ?)",
+                (max(total // 5, 1),),
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
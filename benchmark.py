@@ -0,0 +1,321 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from analysis import BilibiliTextAnalyzer, generate_analysis_report
+
+# 合成语料使用的词汇
+TOPIC_WORDS = [
+    '经济', '消费', '国家', '中国', '美国', '工资', '社会', '工作', '企业', '发展',
+    '房价', '年轻人', '就业', '市场', '政策', '收入', '教育', '医疗', '养老', '人口',
+    '宏观经济', '货币政策', '通胀', '资本市场', '房地产', '股票', '基金', '理财', '央行', '银行',
+    '内卷', '躺平', '打工人', '摆烂', '消费主义', '精神内耗', '就业压力', '老龄化', '数字经济', '产业转型',
+]
+FILLER_WORDS = [
+    '我觉得', '其实', '真的', '但是', '因为', '所以', '现在', '以前', '大家', '我们',
+    '这个', '就是', '还是', '已经', '可能', '确实', '一直', '问题', '时候', '感觉',
+    '很', '太', '不', '没有', '有', '是', '的', '了', '吗', '呢',
+]
+PUNCTUATION = ['，', '。', '！', '？', '…', ' ']
+NOISE = ['http://b23.tv/abc123', '@某位网友 ', '#热门话题#', '[doge]', '哈哈哈', '2024年', '666', '3000块']
+SEXES = ['男', '女', '保密']
+
+# 默认测试规模
+DEFAULT_SIZES = [10000]
+
+
+def synthetic_text(rng, min_words=3, max_words=30):
+    """生成一段带噪声的合成中文评论"""
+    parts = []
+    for _ in range(rng.randint(min_words, max_words)):
+        parts.append(rng.choice(TOPIC_WORDS) if rng.random() < 0.35 else rng.choice(FILLER_WORDS))
+        if rng.random() < 0.15:
+            parts.append(rng.choice(PUNCTUATION))
+    if rng.random() < 0.1:
+        parts.insert(rng.randint(0, len(parts)), rng.choice(NOISE))
+    return ''.join(parts)
+
+
+def write_json_array(path, records):
+    """逐条写出JSON数组，生成千万级数据时不占用大量内存"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for i, record in enumerate(records):
+            if i:
+                f.write(', ')
+            f.write(json.dumps(record, ensure_ascii=False))
+        f.write(']')
+
+
+def generate_datasets(n_comments, out_dir, seed=42):
+    """按真实字段结构生成评论/视频/创作者三份合成数据，返回文件路径字典"""
+    rng = random.Random(seed)
+    n_videos = max(n_comments // 50, 1)
+    n_creators = max(n_videos // 2, 1)
+    base_time = 1752000000
+    creator_ids = [str(100000 + i) for i in range(n_creators)]
+    video_ids = [str(900000000 + i) for i in range(n_videos)]
+    os.makedirs(out_dir, exist_ok=True)
+
+    def comments():
+        for i in range(n_comments):
+            yield {
+                'comment_id': str(200000000000 + i),
+                'parent_comment_id': 0,
+                'create_time': base_time + rng.randint(0, 86400 * 30),
+                'video_id': rng.choice(video_ids),
+                'content': synthetic_text(rng),
+                'user_id': str(rng.randint(1, 10 ** 8)),
+                'nickname': f'用户{i}',
+                'sex': rng.choice(SEXES),
+                'sign': '',
+                'avatar': 'https://i0.hdslb.com/bfs/face/member/noface.jpg',
+                'sub_comment_count': str(rng.randint(0, 20)),
+                'last_modify_ts': base_time * 1000,
+                'like_count': int(rng.paretovariate(1.2)) - 1,
+            }
+
+    def contents():
+        for i, video_id in enumerate(video_ids):
+            yield {
+                'video_id': video_id,
+                'video_type': 'video',
+                'title': synthetic_text(rng, 3, 10),
+                'desc': synthetic_text(rng, 5, 40),
+                'create_time': base_time - rng.randint(0, 86400 * 365),
+                'user_id': rng.choice(creator_ids),
+                'nickname': f'UP主{i}',
+                'avatar': 'https://i0.hdslb.com/bfs/face/member/noface.jpg',
+                'liked_count': str(rng.randint(0, 10 ** 5)),
+                'video_play_count': str(int(rng.paretovariate(0.8) * 1000)),
+                'video_comment': str(rng.randint(0, 10 ** 4)),
+                'video_url': f'https://www.bilibili.com/video/av{video_id}',
+                'video_cover_url': '',
+                'source_keyword': '经济',
+            }
+
+    def creators():
+        for creator_id in creator_ids:
+            yield {
+                'user_id': creator_id,
+                'nickname': f'UP主{creator_id}',
+                'sex': rng.choice(SEXES),
+                'sign': synthetic_text(rng, 2, 15),
+                'avatar': 'https://i0.hdslb.com/bfs/face/member/noface.jpg',
+                'last_modify_ts': base_time * 1000,
+                'total_fans': int(rng.paretovariate(0.9) * 100),
+                'total_liked': rng.randint(0, 10 ** 7),
+                'user_rank': rng.randint(1, 6),
+                'is_official': -1,
+            }
+
+    files = {
+        'comments': os.path.join(out_dir, 'search_comments_benchmark.json'),
+        'contents': os.path.join(out_dir, 'search_contents_benchmark.json'),
+        'creators': os.path.join(out_dir, 'search_creators_benchmark.json'),
+    }
+    write_json_array(files['comments'], comments())
+    write_json_array(files['contents'], contents())
+    write_json_array(files['creators'], creators())
+    return files
+
+
+def time_stage(timings, name, func, items=None, verbose=False):
+    """计时执行一个阶段，记录耗时、处理条数与吞吐量；出错时记录错误信息"""
+    output = io.StringIO()
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    result = None
+    error = None
+    try:
+        if verbose:
+            result = func()
+        else:
+            with contextlib.redirect_stdout(output):
+                result = func()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - start
+    entry = {
+        'wall_seconds': round(wall, 4),
+        'cpu_seconds': round(time.process_time() - cpu_start, 4),
+        'items': items,
+        'items_per_second': round(items / wall, 1) if items and wall > 0 else None,
+    }
+    if error:
+        entry['error'] = error
+    timings[name] = entry
+    status = f"❌ {error}" if error else f"{wall:.3f}s"
+    print(f"  {name:<24} {status}")
+    return result
+
+
+def run_benchmark(size, config_path, work_dir, sentiment_sample=None, use_cache=False, verbose=False):
+    """在给定规模的合成数据上运行各分析阶段并计时"""
+    print(f"\n📦 生成 {size:,} 条评论的合成数据...")
+    data_dir = os.path.join(work_dir, f'data_{size}')
+    gen_start = time.perf_counter()
+    files = generate_datasets(size, data_dir)
+    print(f"  数据生成耗时 {time.perf_counter() - gen_start:.2f}s")
+
+    analyzer = BilibiliTextAnalyzer(config_path)
+    analysis_cfg = analyzer.config.setdefault('analysis', {})
+    if sentiment_sample is not None:
+        analysis_cfg['comment_sample_size'] = sentiment_sample
+    # 列式缓存写到工作目录下，不在项目自身的 cache/ 中留下每次运行路径都不同的 Parquet 文件；
+    # 未指定 --use-cache 时不转换，load_data 计时反映直接读取JSON的耗时，而非一次性的格式转换
+    columnar_cfg = analyzer.config.setdefault('columnar', {})
+    columnar_cfg['dir'] = os.path.join(work_dir, 'cache', 'columnar')
+    if not use_cache:
+        analyzer.config.setdefault('cache', {})['enabled'] = False
+        columnar_cfg['enabled'] = False
+    top_k = analysis_cfg.get('top_keywords', 20)
+    sample_size = analysis_cfg.get('comment_sample_size', 5000) or size
+
+    timings = {}
+    print(f"⏱️ 规模 {size:,} 各阶段耗时:")
+    time_stage(timings, 'load_data', lambda: analyzer.load_data(files), size, verbose)
+    texts = [str(t) for t in analyzer.comments_data['content'].dropna()]
+    time_stage(timings, 'clean_text', lambda: [analyzer.clean_text(t) for t in texts], len(texts), verbose)
+    corpus = time_stage(timings, 'tokenize', lambda: analyzer.tokenize_corpus(texts), len(texts), verbose)
+    time_stage(timings, 'keywords_advanced',
+               lambda: analyzer.extract_keywords_advanced(texts, top_k, corpus=corpus), len(texts), verbose)
+    time_stage(timings, 'keywords_tfidf',
+               lambda: analyzer.extract_keywords(texts, top_k, 'tfidf', corpus=corpus), len(texts), verbose)
+    time_stage(timings, 'keywords_textrank',
+               lambda: analyzer.extract_keywords(texts, top_k, 'textrank', corpus=corpus), len(texts), verbose)
+    sample = texts[:min(sample_size, len(texts))]
+    time_stage(timings, 'sentiment', lambda: analyzer.sentiment_batch(sample), len(sample), verbose)
+
+    # 完整分析阶段（分词缓存已预热）
+    comment_analysis = time_stage(timings, 'analyze_comments', analyzer.analyze_comments, size, verbose)
+    content_analysis = time_stage(timings, 'analyze_video_content', analyzer.analyze_video_content,
+                                  len(analyzer.contents_data), verbose)
+    creator_analysis = time_stage(timings, 'analyze_creators', analyzer.analyze_creators,
+                                  len(analyzer.creators_data), verbose)
+
+    # 可视化与报告写入工作目录下的 results/，词云缓存也放在工作目录下，不影响项目自身的 cache/
+    analyzer.results_dir = os.path.join(work_dir, 'results')
+    analysis_cfg.setdefault('wordcloud', {})['cache_dir'] = os.path.join(work_dir, 'cache', 'wordclouds')
+    time_stage(timings, 'visualizations',
+               lambda: analyzer.create_visualizations(comment_analysis, content_analysis, creator_analysis),
+               None, verbose)
+    if comment_analysis:
+        time_stage(timings, 'wordcloud',
+                   lambda: analyzer.generate_wordcloud(comment_analysis['keywords'], "评论关键词词云",
+                                                       "comment_wordcloud.png"),
+                   None, verbose)
+    results = {
+        'comment_analysis': comment_analysis,
+        'content_analysis': content_analysis,
+        'creator_analysis': creator_analysis,
+        'analysis_timestamp': datetime.now().isoformat(),
+    }
+    serializable = time_stage(timings, 'serialize', lambda: analyzer.convert_to_serializable(results),
+                              None, verbose)
+    time_stage(timings, 'report', lambda: generate_analysis_report(serializable, analyzer.results_dir),
+               None, verbose)
+    # 多进程渲染时图表在后台写出，单独记录等待时间
+    time_stage(timings, 'render_wait', analyzer.wait_for_charts, None, verbose)
+
+    return {
+        'size': size,
+        'videos': len(analyzer.contents_data),
+        'creators': len(analyzer.creators_data),
+        'stages': timings,
+        'total_seconds': round(sum(t['wall_seconds'] for t in timings.values()), 4),
+    }
+
+
+def git_revision():
+    """当前代码版本，便于对比不同提交的结果"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare_results(current, baseline_path, threshold=1.2, min_seconds=0.05):
+    """与历史结果对比，列出变慢超过阈值的阶段（耗时过短的阶段受噪声影响大，不判定回退）"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    baseline_runs = {run['size']: run for run in baseline.get('runs', [])}
+    regressions = []
+    print(f"\n=== 与 {baseline_path} ({baseline.get('revision')}) 对比 ===")
+    for run in current['runs']:
+        old_run = baseline_runs.get(run['size'])
+        if not old_run:
+            print(f"规模 {run['size']:,}: 历史结果中无此规模，跳过")
+            continue
+        print(f"规模 {run['size']:,}:")
+        for stage, entry in run['stages'].items():
+            old_entry = old_run['stages'].get(stage)
+            if not old_entry or not old_entry['wall_seconds'] or 'error' in entry:
+                continue
+            ratio = entry['wall_seconds'] / old_entry['wall_seconds']
+            regressed = ratio > threshold and max(entry['wall_seconds'], old_entry['wall_seconds']) >= min_seconds
+            flag = '⚠️' if regressed else '  '
+            print(f"  {flag} {stage:<24} {old_entry['wall_seconds']:.3f}s -> {entry['wall_seconds']:.3f}s ({ratio:.2f}x)")
+            if regressed:
+                regressions.append({'size': run['size'], 'stage': stage, 'ratio': round(ratio, 3)})
+    return regressions
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="B站文本分析流水线基准测试")
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help="评论规模列表，逗号分隔，如 10000,100000,1000000,10000000")
+    parser.add_argument('--config', default='config.yaml', help="分析配置文件")
+    parser.add_argument('--sentiment-sample', type=int, default=None,
+                        help="情绪分析采样条数（默认读取 comment_sample_size，0 为全量）")
+    parser.add_argument('--output', default='results/benchmark_results.json', help="结果文件路径")
+    parser.add_argument('--compare', default=None, help="与历史结果文件对比")
+    parser.add_argument('--threshold', type=float, default=1.2, help="判定性能回退的耗时倍数")
+    parser.add_argument('--work-dir', default=None, help="合成数据与输出的工作目录（默认临时目录）")
+    parser.add_argument('--use-cache', action='store_true', help="启用持久化缓存与列式缓存（默认关闭以测量冷启动耗时）")
+    parser.add_argument('--verbose', action='store_true', help="显示各阶段的原始输出")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    config_path = os.path.abspath(args.config)
+    output_path = os.path.abspath(args.output)
+
+    with tempfile.TemporaryDirectory(prefix='bili_benchmark_') as tmp_dir:
+        work_dir = os.path.abspath(args.work_dir) if args.work_dir else tmp_dir
+        runs = [run_benchmark(size, config_path, work_dir, args.sentiment_sample, args.use_cache, args.verbose)
+                for size in sizes]
+
+    results = {
+        'timestamp': datetime.now().isoformat(),
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'runs': runs,
+    }
+    if args.compare:
+        results['regressions'] = compare_results(results, args.compare, args.threshold)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n📁 基准测试结果已保存到 {output_path}")
+
+    if results.get('regressions'):
+        print(f"⚠️ 发现 {len(results['regressions'])} 个阶段性能回退")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import cProfile
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+try:
+    import resource
+except ImportError:  # Windows 无 resource 模块
+    resource = None
+
+
+def peak_rss_mb(who=None):
+    """进程生命周期内的峰值常驻内存（MB），平台不支持时返回None"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    # Linux 单位为KB，macOS 为字节
+    return usage / (1024 * 1024) if sys.platform == 'darwin' else usage / 1024
+
+
+class StageProfiler:
+    """分阶段性能记录：墙钟时间、CPU时间、内存峰值增长和处理条数，可选为每个阶段保存 cProfile 结果
+
+    ru_maxrss 是整个进程生命周期的高水位，不能单独反映某个阶段：peak_rss_growth_mb 为阶段结束时与进入时
+    高水位之差（该阶段把进程峰值抬高了多少，未超过此前峰值时为0），process_high_water_rss_mb 为阶段结束时的进程高水位。
+    """
+
+    def __init__(self, enabled=True, cprofile_dir=None):
+        self.enabled = enabled
+        self.cprofile_dir = cprofile_dir
+        self.stages = {}
+        self._profiles = {}
+        self._active_profiler = None
+
+    @contextmanager
+    def stage(self, name, items=None):
+        """记录一个阶段；同名阶段多次执行时累加，可在 with 块内设置 record['items']"""
+        record = {'items': items}
+        if not self.enabled:
+            yield record
+            return
+
+        # 同一时刻只能有一个 cProfile 生效，嵌套阶段的数据包含在外层阶段的结果中；同名阶段累加
+        profiler = None
+        if self.cprofile_dir and self._active_profiler is None:
+            profiler = self._active_profiler = self._profiles.setdefault(name, cProfile.Profile())
+            profiler.enable()
+        rss_before = peak_rss_mb()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            if profiler is not None:
+                profiler.disable()
+                self._active_profiler = None
+                os.makedirs(self.cprofile_dir, exist_ok=True)
+                profiler.dump_stats(os.path.join(self.cprofile_dir, f"{name}.prof"))
+            rss_after = peak_rss_mb()
+
+            stats = self.stages.setdefault(name, {
+                'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'items': 0,
+                'peak_rss_growth_mb': 0.0, 'process_high_water_rss_mb': None,
+            })
+            stats['calls'] += 1
+            stats['wall_seconds'] += wall
+            stats['cpu_seconds'] += cpu
+            if record.get('items'):
+                stats['items'] += int(record['items'])
+            if rss_after is not None:
+                stats['peak_rss_growth_mb'] += rss_after - rss_before
+                stats['process_high_water_rss_mb'] = max(stats['process_high_water_rss_mb'] or 0.0, rss_after)
+
+    def to_dict(self):
+        """导出结构化的性能指标"""
+        stages = {}
+        for name, stats in self.stages.items():
+            entry = {k: round(v, 4) if isinstance(v, float) else v for k, v in stats.items()}
+            entry['items_per_second'] = (round(stats['items'] / stats['wall_seconds'], 1)
+                                         if stats['items'] and stats['wall_seconds'] > 0 else None)
+            stages[name] = entry
+        children_rss = peak_rss_mb(resource.RUSAGE_CHILDREN) if resource is not None else None
+        return {
+            'stages': stages,
+            'process_peak_rss_mb': peak_rss_mb(),
+            'children_peak_rss_mb': children_rss,
+        }
+
+    def summary(self):
+        """打印各阶段耗时汇总"""
+        print("\n--- 各阶段耗时 ---")
+        for name, stats in self.stages.items():
+            high_water = stats['process_high_water_rss_mb']
+            growth = f"+{stats['peak_rss_growth_mb']:.0f}MB" if high_water is not None else "-"
+            rss = f"{high_water:.0f}MB" if high_water is not None else "-"
+            print(f"{name:<20} {stats['wall_seconds']:8.3f}s  CPU {stats['cpu_seconds']:8.3f}s  "
+                  f"峰值增长 {growth:>7}  进程高水位 {rss:>7}  条数 {stats['items']}")
+
+    def save(self, path):
+        """保存性能指标为JSON"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,386 @@
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+# 常见中文字体（Windows / macOS / Linux），按顺序选用第一个已安装的
+CJK_FONT_FAMILIES = (
+    'SimHei', 'Microsoft YaHei', 'PingFang SC', 'Hiragino Sans GB', 'Heiti SC', 'STHeiti',
+    'Noto Sans CJK SC', 'Source Han Sans SC', 'WenQuanYi Micro Hei', 'WenQuanYi Zen Hei', 'Droid Sans Fallback',
+)
+CJK_FONT_PATHS = (
+    'C:/Windows/Fonts/simhei.ttf', 'C:/Windows/Fonts/msyh.ttc', 'C:/Windows/Fonts/simsun.ttc',
+    '/System/Library/Fonts/PingFang.ttc', '/System/Library/Fonts/Hiragino Sans GB.ttc', '/Library/Fonts/Songti.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc', '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc',
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc', '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+)
+
+
+# matplotlib 与 wordcloud 在首次绘图时才导入，只做统计的运行不必承担它们的导入与初始化开销
+_PYPLOT = None
+
+
+def load_pyplot():
+    """按需导入 pyplot：服务器无界面环境使用 Agg 后端（只保存图片），首次导入时设置中文字体"""
+    global _PYPLOT
+    if _PYPLOT is None:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        # 设置中文字体（都未安装时退回 DejaVu Sans）
+        plt.rcParams['font.sans-serif'] = list(CJK_FONT_FAMILIES) + ['DejaVu Sans']
+        plt.rcParams['axes.unicode_minus'] = False
+        _PYPLOT = plt
+    return _PYPLOT
+
+
+def normalize_sex_label(label):
+    """统一性别标签为 男 / 女 / 未知"""
+    if str(label) in ['男', 'male', 'Male', '1', 1]:
+        return '男'
+    elif str(label) in ['女', 'female', 'Female', '2', 2]:
+        return '女'
+    elif str(label) in ['保密', '', None, '0', 0]:
+        return '未知'
+    return str(label)
+
+
+def render_analysis_charts(data, save_path, dpi, font_path=None):
+    """绘制六宫格分析图表并保存，data 只含可序列化的数据，可在子进程中执行"""
+    plt = use_cjk_font(font_path)
+    fig, axes = plt.subplots(2, 3, figsize=(20, 14))
+    
+    # 1. 评论情绪分布
+    if data.get('sentiment_distribution'):
+        sentiment_data = data['sentiment_distribution']
+        colors = ['#ff9999', '#66b3ff', '#99ff99']
+        axes[0, 0].pie(sentiment_data.values(), labels=sentiment_data.keys(), 
+                      autopct='%1.1f%%', colors=colors)
+        axes[0, 0].set_title('评论情绪分布', fontsize=14)
+    
+    # 2. 评论长度分布
+    if data.get('content_length') is not None:
+        axes[0, 1].hist(data['content_length'], bins=50, alpha=0.7, color='skyblue')
+        axes[0, 1].set_title('评论长度分布', fontsize=14)
+        axes[0, 1].set_xlabel('评论长度 (字符)')
+        axes[0, 1].set_ylabel('频次')
+    
+    # 3. 评论&创作者性别分布（合并显示，双y轴）
+    if data.get('comment_sex') is not None or data.get('creator_sex') is not None:
+        comment_sex = data.get('comment_sex') or {}
+        creator_sex = data.get('creator_sex') or {}
+        # 统一性别标签
+        comment_sex_norm = {}
+        for k, v in comment_sex.items():
+            label = normalize_sex_label(k)
+            comment_sex_norm[label] = comment_sex_norm.get(label, 0) + v
+        creator_sex_norm = {}
+        for k, v in creator_sex.items():
+            label = normalize_sex_label(k)
+            creator_sex_norm[label] = creator_sex_norm.get(label, 0) + v
+        all_labels = ['男', '女', '未知']
+        x = np.arange(len(all_labels))
+        comment_counts = [comment_sex_norm.get(l, 0) for l in all_labels]
+        creator_counts = [creator_sex_norm.get(l, 0) for l in all_labels]
+        bar_width = 0.35
+    
+        # 主y轴画评论用户
+        axes[0, 2].bar(x - bar_width/2, comment_counts, width=bar_width, label='评论用户', color='skyblue', alpha=0.8, edgecolor='black', zorder=2)
+        axes[0, 2].set_ylabel('评论用户人数')
+        # 副y轴画创作者
+        ax2 = axes[0, 2].twinx()
+        ax2.bar(x + bar_width/2, creator_counts, width=bar_width, label='创作者', color='pink', alpha=0.8, edgecolor='black', zorder=3)
+        ax2.set_ylabel('创作者人数')
+    
+        axes[0, 2].set_xticks(list(x))
+        axes[0, 2].set_xticklabels(all_labels)
+        axes[0, 2].set_title('评论用户与创作者性别分布', fontsize=14)
+        axes[0, 2].grid(axis='y', linestyle='--', alpha=0.5, zorder=1)
+    
+        # 合并图例
+        handles1, labels1 = axes[0, 2].get_legend_handles_labels()
+        handles2, labels2 = ax2.get_legend_handles_labels()
+        axes[0, 2].legend(handles1 + handles2, labels1 + labels2, loc='upper right')
+    
+    # 4. 视频播放量分布
+    if data.get('play_counts') is not None:
+        axes[1, 0].hist(data['play_counts'], bins=30, alpha=0.7, color='lightgreen')
+        axes[1, 0].set_title('视频播放量分布', fontsize=14)
+        axes[1, 0].set_xlabel('播放量')
+        axes[1, 0].set_ylabel('频次')
+    
+    # 5. 热门关键词
+    if data.get('keywords'):
+        keywords = data['keywords'][:12]  # 显示更多关键词
+        words = [word for word, _ in keywords]
+        weights = [weight for _, weight in keywords]
+        
+        y_pos = range(len(words))
+        axes[1, 1].barh(y_pos, weights, color='orange')
+        axes[1, 1].set_yticks(y_pos)
+        axes[1, 1].set_yticklabels(words)
+        axes[1, 1].set_title('评论热门关键词', fontsize=14)
+        axes[1, 1].set_xlabel('权重')
+    
+    # 6. 标题情绪分布
+    if data.get('title_sentiment'):
+        title_sentiment = data['title_sentiment']
+        axes[1, 2].pie(title_sentiment.values(), labels=title_sentiment.keys(), 
+                      autopct='%1.1f%%', colors=['#ff9999', '#66b3ff', '#99ff99'])
+        axes[1, 2].set_title('视频标题情绪分布', fontsize=14)
+    
+    plt.tight_layout()
+    os.makedirs(os.path.dirname(save_path) or '.', exist_ok=True)
+    fig.savefig(save_path, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return save_path
+
+
+def render_time_series(periods, thresholds, save_path, dpi, font_path=None):
+    """绘制评论量与情绪的时间趋势图并保存，可在子进程中执行"""
+    plt = use_cjk_font(font_path)
+    labels = [period['bucket'] for period in periods]
+    x = np.arange(len(labels))
+    fig, axes = plt.subplots(2, 1, figsize=(16, 10), sharex=True)
+
+    # 1. 评论量（按情绪堆叠）
+    bottom = np.zeros(len(periods))
+    for field, name, color in (('positive', '积极', '#99ff99'), ('neutral', '中性', '#66b3ff'),
+                               ('negative', '消极', '#ff9999')):
+        values = np.array([period[field] for period in periods])
+        axes[0].bar(x, values, bottom=bottom, label=name, color=color)
+        bottom += values
+    unscored = np.array([period['count'] for period in periods]) - bottom
+    if unscored.any():
+        axes[0].bar(x, unscored, bottom=bottom, label='无内容', color='lightgrey')
+    axes[0].set_title('评论量趋势', fontsize=14)
+    axes[0].set_ylabel('评论数')
+    axes[0].legend(loc='upper left')
+
+    # 2. 平均情绪与积极占比
+    sentiment = [period['avg_sentiment'] if period['avg_sentiment'] is not None else np.nan for period in periods]
+    positive_share = [period['positive'] / period['scored'] if period['scored'] else np.nan for period in periods]
+    axes[1].plot(x, sentiment, marker='o', color='orange', label='平均情绪得分')
+    axes[1].plot(x, positive_share, marker='s', color='seagreen', label='积极占比')
+    for threshold in thresholds:
+        axes[1].axhline(threshold, color='grey', linestyle='--', linewidth=0.8)
+    axes[1].set_ylim(0, 1)
+    axes[1].set_title('情绪趋势', fontsize=14)
+    axes[1].legend(loc='lower left')
+
+    step = max(len(labels) // 20, 1)
+    axes[1].set_xticks(x[::step])
+    axes[1].set_xticklabels(labels[::step], rotation=45, ha='right')
+    plt.tight_layout()
+
+    os.makedirs(os.path.dirname(save_path) or '.', exist_ok=True)
+    fig.savefig(save_path, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return save_path
+
+
+_CJK_FONTS = {}
+
+
+def resolve_cjk_font(preferred=None, font_path=None):
+    """查找可用的中文字体，返回 (字体文件路径, 字体名)，找不到时为 (None, None)；结果在进程内缓存"""
+    key = (preferred, font_path)
+    if key not in _CJK_FONTS:
+        _CJK_FONTS[key] = _find_cjk_font(preferred, font_path)
+    return _CJK_FONTS[key]
+
+
+def _find_cjk_font(preferred, font_path):
+    from matplotlib import font_manager
+    # 1. 配置中指定的字体文件
+    if font_path and os.path.exists(font_path):
+        font_manager.fontManager.addfont(font_path)
+        return font_path, font_manager.FontProperties(fname=font_path).get_name()
+    # 2. matplotlib 已登记的字体
+    installed = {}
+    for entry in font_manager.fontManager.ttflist:
+        installed.setdefault(entry.name, entry.fname)
+    for family in ([preferred] if preferred else []) + list(CJK_FONT_FAMILIES):
+        if family in installed:
+            return installed[family], family
+    # 3. 各系统的常见字体文件
+    for path in CJK_FONT_PATHS:
+        if os.path.exists(path):
+            font_manager.fontManager.addfont(path)
+            return path, font_manager.FontProperties(fname=path).get_name()
+    return None, None
+
+
+# 当前进程中已登记到 matplotlib 的字体文件
+_REGISTERED_FONTS = set()
+
+
+def use_cjk_font(font_path):
+    """在当前进程中登记中文字体文件并设为图表首选字体，返回 pyplot
+
+    以 spawn 方式启动的渲染子进程（Windows / macOS）不继承主进程的字体登记与 rcParams，每个渲染任务都先调用。
+    """
+    plt = load_pyplot()
+    if not font_path or font_path in _REGISTERED_FONTS or not os.path.exists(font_path):
+        return plt
+    from matplotlib import font_manager
+    font_manager.fontManager.addfont(font_path)
+    font_name = font_manager.FontProperties(fname=font_path).get_name()
+    plt.rcParams['font.sans-serif'] = [font_name] + [f for f in plt.rcParams['font.sans-serif'] if f != font_name]
+    _REGISTERED_FONTS.add(font_path)
+    return plt
+
+
+class WordCloudRenderer:
+    """可复用的词云渲染器：同一配置只构建一个 WordCloud 实例，布局按 (关键词权重, 配置) 缓存
+
+    关键词与配置都未变化时直接复制缓存的图片；只有标题、分辨率变化时复用缓存布局重绘，不再做螺旋排布。
+    """
+
+    MAX_CACHE_FILES = 200
+
+    def __init__(self, wc_cfg, font_path=None, cache_dir=None):
+        from wordcloud import WordCloud
+        self.config_key = json.dumps([wc_cfg, font_path], sort_keys=True, ensure_ascii=False)
+        self.font_path = font_path
+        self.cache_dir = cache_dir
+        self.wordcloud = WordCloud(
+            font_path=font_path,
+            width=wc_cfg.get("width", 1000),
+            height=wc_cfg.get("height", 500),
+            background_color=wc_cfg.get("background_color", "white"),
+            max_words=wc_cfg.get("max_words", 150),
+            colormap=wc_cfg.get("colormap", "viridis"),
+            prefer_horizontal=0.7,
+            random_state=wc_cfg.get("random_state", 42),
+        )
+
+    def layout_key(self, word_freq):
+        payload = json.dumps([self.config_key, list(word_freq.items())], ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def render(self, word_freq, title, save_path, dpi):
+        """生成并保存词云图，返回 (保存路径, 是否直接复用了缓存图片)"""
+        layout_key = self.layout_key(word_freq)
+        image_key = hashlib.sha1(f"{layout_key}|{title}|{dpi}".encode('utf-8')).hexdigest()
+        image_cache = self._cache_path(image_key + os.path.splitext(save_path)[1])
+        os.makedirs(os.path.dirname(save_path) or '.', exist_ok=True)
+        if image_cache and os.path.exists(image_cache):
+            shutil.copyfile(image_cache, save_path)
+            return save_path, True
+
+        layout = self._load_layout(layout_key)
+        if layout is None:
+            self.wordcloud.generate_from_frequencies(word_freq)
+            self._save_layout(layout_key, self.wordcloud.layout_)
+        else:
+            self.wordcloud.layout_ = layout
+
+        plt = use_cjk_font(self.font_path)
+        fig = plt.figure(figsize=(15, 8))
+        plt.imshow(self.wordcloud.to_array(), interpolation='bilinear')
+        plt.title(title, fontsize=18)
+        plt.axis('off')
+        plt.tight_layout()
+        fig.savefig(save_path, dpi=dpi, bbox_inches='tight')
+        plt.close(fig)
+        if image_cache:
+            self._atomic_copy(save_path, image_cache)
+            self._prune()
+        return save_path, False
+
+    def _cache_path(self, name):
+        return os.path.join(self.cache_dir, name) if self.cache_dir else None
+
+    def _load_layout(self, key):
+        path = self._cache_path(key + '.json')
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return [((word, count), font_size, tuple(position), orientation, color)
+                for word, count, font_size, position, orientation, color in items]
+
+    def _save_layout(self, key, layout):
+        path = self._cache_path(key + '.json')
+        if not path:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        items = [[word, float(count), int(font_size), [int(p) for p in position],
+                  None if orientation is None else int(orientation), color]
+                 for (word, count), font_size, position, orientation, color in layout]
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(items, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _atomic_copy(self, source, target):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target)
+
+    def _prune(self):
+        """缓存文件超过上限时删除最久未更新的"""
+        names = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                 if not name.endswith('.tmp')]
+        if len(names) > self.MAX_CACHE_FILES:
+            for path in sorted(names, key=os.path.getmtime)[:len(names) - self.MAX_CACHE_FILES]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+# 每个进程内按配置复用的词云渲染器
+_WORDCLOUD_RENDERERS = {}
+
+
+def render_wordcloud(word_freq, title, save_path, wc_cfg, dpi, font_path=None, cache_dir=None):
+    """按词频生成词云图并保存，可在子进程中执行；同一进程内相同配置复用 WordCloud 实例"""
+    key = json.dumps([wc_cfg, font_path, cache_dir], sort_keys=True, ensure_ascii=False)
+    renderer = _WORDCLOUD_RENDERERS.get(key)
+    if renderer is None:
+        renderer = _WORDCLOUD_RENDERERS[key] = WordCloudRenderer(wc_cfg, font_path, cache_dir)
+    save_path, reused = renderer.render(word_freq, title, save_path, dpi)
+    return f"{save_path}（关键词未变化，复用缓存）" if reused else save_path
+
+
+class ChartRenderer:
+    """图表渲染：workers > 1 时提交到子进程并行渲染，主流程（写结果、报告）无需等待图片编码"""
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self._executor = None
+        self._jobs = []  # (名称, Future)
+
+    def submit(self, label, func, *args):
+        """渲染一张图；单进程时立即执行，否则提交到进程池，wait() 时汇报结果"""
+        if self.workers <= 1:
+            try:
+                print(f"💾 {label}已保存到: {func(*args)}")
+            except Exception as e:
+                print(f"⚠️ {label}渲染失败: {e}")
+            return
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._jobs.append((label, self._executor.submit(func, *args)))
+
+    def wait(self):
+        """等待全部已提交的渲染任务完成"""
+        for label, future in self._jobs:
+            try:
+                print(f"💾 {label}已保存到: {future.result()}")
+            except Exception as e:
+                print(f"⚠️ {label}渲染失败: {e}")
+        self._jobs = []
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -120,6 +120,27 @@ def install_from_requirements(mirror_url):
     print("❌ 找不到 requirements.txt 或 requirements-core.txt 文件")
     return False
 
+def install_optional_requirements(mirror_url):
+    """安装 requirements-optional.txt 中的可选依赖，失败不影响基础分析"""
+    req_file = "requirements-optional.txt"
+    if not os.path.exists(req_file):
+        return False
+    from urllib.parse import urlparse
+    cmd = [
+        sys.executable, "-m", "pip", "install",
+        "-r", req_file,
+        "-i", mirror_url,
+        "--trusted-host", urlparse(mirror_url).hostname
+    ]
+    print(f"📦 正在从 {req_file} 安装可选依赖包...")
+    try:
+        subprocess.run(cmd, capture_output=True, text=True, check=True)
+        print("✅ 可选依赖包安装成功")
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"⚠️ 可选依赖包安装失败（相应功能将跳过或回退）: {e.stderr}")
+        return False
+
 def configure_pip_permanently(mirror_url):
     """永久配置pip使用国内镜像源"""
     try:
@@ -201,8 +222,7 @@ def test_imports():
         ("jieba", None),
         ("snownlp", None),
         ("wordcloud", None),
-        ("sklearn", None),
-        ("seaborn", "sns")
+        ("sklearn", None)
     ]
     
     print("\n=== 测试包导入 ===")
@@ -305,7 +325,7 @@ def main():
     if not install_from_requirements(mirror_url):
         print("尝试逐个安装核心包...")
         core_packages = [
-            "pandas", "numpy", "matplotlib", "seaborn", 
+            "pandas", "numpy", "matplotlib", 
             "jieba", "snownlp", "wordcloud", "scikit-learn",
             "tqdm", "jsonlines", "pyyaml" 
         ]
@@ -320,6 +340,7 @@ def main():
             print("可以稍后手动安装：")
             for pkg in failed_packages:
                 print(f"  pip install -i {mirror_url} {pkg}")
+    install_optional_requirements(mirror_url)
     
     # 设置中文字体
     print("\n=== 检查中文字体 ===")
@@ -0,0 +1,209 @@
+import heapq
+from collections import Counter
+from operator import itemgetter
+
+import numpy as np
+
+
+class SpaceSaving:
+    """Space-Saving 流式高频词计数：最多跟踪 capacity 个词，内存不随词表增长
+
+    每个被跟踪词的估计次数 count 满足 count - error ≤ 真实次数 ≤ count，且 error ≤ 总词数 / capacity。
+    词先在一个精确的小批次中计数，累计到 batch_size 个词后按可合并摘要的方式并入，
+    不同分片的摘要也可以用同样的方式 merge。
+    """
+
+    def __init__(self, capacity=20000, batch_size=None):
+        self.capacity = capacity
+        self.batch_size = batch_size or capacity
+        self._total = 0  # 已并入摘要的总次数，通过 total 读取
+        self.counts = {}  # 词 -> 估计次数（上界）
+        self.errors = {}  # 词 -> 最大高估量
+        self._pending = Counter()
+        self._pending_tokens = 0
+        self._pending_total = 0
+
+    def update(self, words, weight=1):
+        """计入一批词，每个词计 weight 次"""
+        words = list(words)
+        if weight == 1:
+            self._pending.update(words)
+        else:
+            for word in words:
+                self._pending[word] += weight
+        self._pending_tokens += len(words)
+        self._pending_total += len(words) * weight
+        if self._pending_tokens >= self.batch_size:
+            self._flush()
+
+    def update_counts(self, counts, weight=1):
+        """计入一份 {键: 次数} 计数表（如一批文本的共现次数），每个计数乘以 weight"""
+        if weight == 1:
+            self._pending.update(counts)
+        else:
+            for key, count in counts.items():
+                self._pending[key] += count * weight
+        # 按新增键数计入批次大小，保证待合并的计数表不超过 batch_size 个键
+        self._pending_tokens += len(counts)
+        self._pending_total += sum(counts.values()) * weight
+        if self._pending_tokens >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self._pending_tokens:
+            pending, self._pending = self._pending, Counter()
+            self._total += self._pending_total
+            self._pending_tokens = self._pending_total = 0
+            self._combine(pending, {}, 0)
+
+    @property
+    def total(self):
+        """已计入的总次数（含尚未并入摘要的批次）"""
+        self._flush()
+        return self._total
+
+    def floor(self):
+        """未被跟踪的词可能出现的最大次数，即当前所有估计值的最大误差"""
+        self._flush()
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def _combine(self, counts, errors, other_floor):
+        """合并另一份计数（精确计数表时 errors 为空、other_floor 为0），只保留估计值最大的 capacity 个词"""
+        floor = min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+        merged_counts, merged_errors = {}, {}
+        for word in self.counts.keys() | counts.keys():
+            merged_counts[word] = self.counts.get(word, floor) + counts.get(word, other_floor)
+            merged_errors[word] = self.errors.get(word, floor) + errors.get(word, other_floor)
+        if len(merged_counts) > self.capacity:
+            kept = heapq.nlargest(self.capacity, merged_counts, key=merged_counts.get)
+            merged_counts = {word: merged_counts[word] for word in kept}
+        self.counts = merged_counts
+        self.errors = {word: merged_errors[word] for word in merged_counts}
+
+    def merge(self, other):
+        """合并另一份 SpaceSaving 摘要或精确计数表"""
+        self._flush()
+        if isinstance(other, SpaceSaving):
+            other_floor = other.floor()
+            self._total += other.total
+            self._combine(other.counts, other.errors, other_floor)
+        else:
+            self._total += sum(other.values())
+            self._combine(other, {}, 0)
+        return self
+
+    def items(self):
+        self._flush()
+        return self.counts.items()
+
+    def most_common(self, n=None):
+        self._flush()
+        return heapq.nlargest(n or len(self.counts), self.counts.items(), key=itemgetter(1))
+
+    def error(self, word):
+        self._flush()
+        return self.errors.get(word, self.floor())
+
+    def __len__(self):
+        self._flush()
+        return len(self.counts)
+
+    def to_dict(self):
+        """序列化为JSON兼容的字典；键可以是词或 (词, 词性) 等元组"""
+        self._flush()
+        items = [[list(key) if isinstance(key, tuple) else key, count, self.errors[key]]
+                 for key, count in self.counts.items()]
+        return {'capacity': self.capacity, 'total': self.total, 'items': items}
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(data['capacity'])
+        summary._total = data.get('total', 0)
+        for key, count, error in data.get('items', []):
+            key = tuple(key) if isinstance(key, list) else key
+            summary.counts[key] = count
+            summary.errors[key] = error
+        return summary
+
+
+MIX_MULTIPLIERS = (np.uint64(0xbf58476d1ce4e5b9), np.uint64(0x94d049bb133111eb))
+
+
+def _mix64(x):
+    """splitmix64 终混函数：把 uint64 数组打散为近似均匀分布的哈希值"""
+    x = x ^ (x >> np.uint64(30))
+    x = x * MIX_MULTIPLIERS[0]
+    x = x ^ (x >> np.uint64(27))
+    x = x * MIX_MULTIPLIERS[1]
+    return x ^ (x >> np.uint64(31))
+
+
+def shingle_hashes(texts, shingle_size=3):
+    """把每条非空文本切成字符 k-gram 并哈希为 uint64，返回 (哈希数组, 各文本的第一个 shingle 在数组中的位置)
+
+    全部文本拼接后一次性向量化计算；短于 k 个字的文本整体作为一个 shingle。
+    """
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    codes = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    ends = np.cumsum(lengths)
+    end_of = np.repeat(ends, lengths)
+    positions = np.arange(len(codes))
+    padded = np.concatenate([codes, np.zeros(shingle_size, dtype=np.uint64)])
+    hashes = np.zeros(len(codes), dtype=np.uint64)
+    for offset in range(shingle_size):
+        code = np.where(positions + offset < end_of, padded[positions + offset], np.uint64(0))
+        hashes = _mix64(hashes ^ code)
+    keep = (positions <= end_of - shingle_size) | (
+        (np.repeat(lengths, lengths) < shingle_size) & (positions == np.repeat(ends - lengths, lengths)))
+    counts = np.maximum(lengths - shingle_size + 1, 1)
+    return hashes[keep], np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+
+def minhash_signatures(texts, num_perm=128, shingle_size=3, seed=42, chunk_size=50000):
+    """计算每条非空文本字符 shingle 集合的 MinHash 签名，返回 (文本数, num_perm) 的 uint32 矩阵
+
+    第 p 个哈希函数为 (a_p * h + b_p) mod 2^64 取高32位；按块处理以限制中间数组的内存。
+    """
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    increments = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for start in range(0, len(texts), chunk_size):
+        hashes, offsets = shingle_hashes(texts[start:start + chunk_size], shingle_size)
+        block = np.empty((num_perm, len(offsets)), dtype=np.uint32)
+        for p in range(num_perm):
+            permuted = ((hashes * multipliers[p] + increments[p]) >> np.uint64(32)).astype(np.uint32)
+            block[p] = np.minimum.reduceat(permuted, offsets)
+        signatures[start:start + len(offsets)] = block.T
+    return signatures
+
+
+def lsh_clusters(signatures, bands, threshold):
+    """LSH 分段找出候选近似重复对，按签名估计的 Jaccard 相似度验证后求连通分量
+
+    返回 (每行的簇编号, 验证过的候选对数)；每段中同桶的文本只与桶内第一条比较，总耗时近似线性。
+    """
+    from scipy import sparse
+    from scipy.sparse import csgraph
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    sources, targets = [], []
+    for band in range(bands):
+        keys = np.zeros(n, dtype=np.uint64)
+        for column in signatures[:, band * rows:(band + 1) * rows].T:
+            keys = _mix64(keys ^ column.astype(np.uint64))
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        representative = first[inverse]
+        candidates = np.flatnonzero(representative != np.arange(n))
+        sources.append(candidates)
+        targets.append(representative[candidates])
+    pairs = np.unique(np.concatenate(sources) * n + np.concatenate(targets)) if n else np.array([], dtype=np.int64)
+    sources, targets = pairs // n, pairs % n
+    similar = np.zeros(len(pairs), dtype=bool)
+    for start in range(0, len(pairs), 100000):
+        block = slice(start, start + 100000)
+        agreement = (signatures[sources[block]] == signatures[targets[block]]).mean(axis=1)
+        similar[block] = agreement >= threshold
+    graph = sparse.coo_matrix((np.ones(int(similar.sum())), (sources[similar], targets[similar])), shape=(n, n))
+    _, labels = csgraph.connected_components(graph, directed=False)
+    return labels, len(pairs)
@@ -0,0 +1,336 @@
+import json
+import os
+import random
+import re
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import (
+    BilibiliTextAnalyzer, IncrementalState, KeywordStats, NaiveBayesSentiment, iter_json_records, snownlp_tokens,
+)
+from analysis_cache import AnalysisCache
+from sketches import SpaceSaving
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.yaml')
+
+WORDS = ['经济', '消费', '中国', '工资', '社会', '工作', '企业', '发展', '房价', '年轻人', '就业', '市场',
+         '政策', '内卷', '躺平', '我觉得', '其实', '真的', '但是', '现在', '大家', '问题', '很', '不', '的', '了']
+NOISE = ['http://b23.tv/abc123', 'https://www.bilibili.com/video/BV1xx?p=2', '@某位网友 ', 'me@example.com',
+         '#热门话题#', '[doge]', '2024年', '666', '3000块', ' 12 ', '\n', '\t']
+
+
+def synthetic_texts(n, seed=0):
+    """生成带URL、@、话题、数字和多余空白等噪声的合成评论"""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        parts = [rng.choice(WORDS) for _ in range(rng.randint(1, 15))]
+        for _ in range(rng.randint(0, 3)):
+            parts.insert(rng.randint(0, len(parts)), rng.choice(NOISE))
+        texts.append(''.join(parts))
+    return texts
+
+
+def baseline_clean_text(text):
+    """优化前逐条 re.sub 的清理实现，作为 clean_text 的参照"""
+    if not text or pd.isna(text):
+        return ""
+    text = str(text)
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+    text = re.sub(r'\S+@\S+', '', text)
+    text = re.sub(r'@[^\s]+', '', text)
+    text = re.sub(r'#[^#]+#', '', text)
+    text = re.sub(r'\b\d{1,3}\b(?!\d)', '', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    """使用仓库配置、但缓存与输出都写到临时目录的分析器"""
+    monkeypatch.chdir(tmp_path)
+    analyzer = BilibiliTextAnalyzer(CONFIG_PATH)
+    analyzer.config['cache']['enabled'] = False
+    analyzer.config['cache']['jieba_dict'] = str(tmp_path / 'jieba_dict.json')
+    analyzer.config['columnar']['enabled'] = False
+    analyzer.config['incremental']['state_path'] = str(tmp_path / 'incremental_state.json')
+    analyzer.config['profiling']['enabled'] = False
+    analyzer.profiler.enabled = False
+    return analyzer
+
+
+# ---------- 情绪分析 ----------
+
+def test_naive_bayes_matches_snownlp():
+    """向量化朴素贝叶斯打分与 SnowNLP(text).sentiments 一致，空文本为NaN"""
+    pytest.importorskip('scipy')
+    from snownlp import SnowNLP
+    texts = synthetic_texts(200) + ['', '太棒了，非常喜欢', '垃圾，浪费时间']
+    scores = NaiveBayesSentiment().score(snownlp_tokens(texts))
+    for text, score in zip(texts, scores):
+        if text:
+            assert score == pytest.approx(SnowNLP(text).sentiments, abs=1e-12)
+        else:
+            assert np.isnan(score)
+
+
+# ---------- 文本清理 ----------
+
+def test_clean_text_matches_baseline(analyzer):
+    texts = synthetic_texts(500) + [None, np.nan, '', 0, 123, 2024, '  多个   空白\n换行 ', 'a@b c@d @用户 文字']
+    for text in texts:
+        assert analyzer.clean_text(text) == baseline_clean_text(text)
+
+
+def test_clean_series_matches_baseline(analyzer):
+    series = pd.Series(synthetic_texts(300) + [None, '', 42], index=range(10, 313))
+    cleaned = analyzer.clean_series(series)
+    assert list(cleaned.index) == list(series.index)
+    assert cleaned.tolist() == [baseline_clean_text(text) for text in series]
+
+
+# ---------- 关键词统计 ----------
+
+def test_keyword_stats_merge_matches_single_corpus(analyzer):
+    """分片统计合并后与整体统计一致；共现只缺少分片边界处跨文本的窗口"""
+    texts = synthetic_texts(400, seed=1)
+    whole = KeywordStats.from_corpus(analyzer.tokenize_corpus(texts))
+    first = KeywordStats.from_corpus(analyzer.tokenize_corpus(texts[:150]))
+    second = KeywordStats.from_corpus(analyzer.tokenize_corpus(texts[150:]))
+    shard_cooccurrence = first.cooccurrence + second.cooccurrence
+    merged = first.merge(second)
+
+    assert merged.documents == whole.documents
+    assert merged.total_words == whole.total_words
+    assert merged.term_freq == whole.term_freq
+    assert merged.pos_freq == whole.pos_freq
+    assert merged.doc_freq == whole.doc_freq
+    assert merged.cooccurrence == shard_cooccurrence
+    assert all(count <= whole.cooccurrence[key] for key, count in merged.cooccurrence.items())
+    assert merged.tfidf(20, ('n', 'v')) == whole.tfidf(20, ('n', 'v'))
+    assert merged.frequency(20, analyzer.word_filter) == whole.frequency(20, analyzer.word_filter)
+
+
+def test_keyword_stats_round_trip(analyzer):
+    stats = KeywordStats.from_corpus(analyzer.tokenize_corpus(synthetic_texts(100, seed=2)))
+    loaded = KeywordStats.from_dict(json.loads(json.dumps(stats.to_dict(), ensure_ascii=False)))
+    assert loaded.to_dict() == stats.to_dict()
+
+
+# ---------- Space-Saving ----------
+
+def zipf_stream(n, vocabulary, seed):
+    rng = np.random.default_rng(seed)
+    return [f"w{i}" for i in rng.zipf(1.3, size=n) % vocabulary]
+
+
+def assert_space_saving_bounds(summary, truth):
+    """被跟踪词：count - error ≤ 真实次数 ≤ count；未跟踪词不超过 floor()；误差不超过 总数 / capacity"""
+    assert summary.total == sum(truth.values())
+    assert len(summary) <= summary.capacity
+    bound = summary.total / summary.capacity
+    for word, count in summary.items():
+        error = summary.error(word)
+        assert count - error <= truth[word] <= count
+        assert error <= bound
+    floor = summary.floor()
+    assert floor <= bound
+    tracked = dict(summary.items())
+    assert all(count <= floor for word, count in truth.items() if word not in tracked)
+
+
+@pytest.mark.parametrize('batch_size', [None, 1, 37])
+def test_space_saving_error_bounds(batch_size):
+    stream = zipf_stream(20000, 5000, seed=3)
+    summary = SpaceSaving(capacity=200, batch_size=batch_size)
+    for start in range(0, len(stream), 500):
+        summary.update(stream[start:start + 500])
+    assert_space_saving_bounds(summary, Counter(stream))
+
+
+def test_space_saving_merge_error_bounds():
+    first, second = zipf_stream(15000, 4000, seed=4), zipf_stream(9000, 4000, seed=5)
+    a, b = SpaceSaving(capacity=150), SpaceSaving(capacity=150)
+    a.update(first)
+    b.update(second)
+    merged = a.merge(b)
+    assert_space_saving_bounds(merged, Counter(first) + Counter(second))
+
+
+def test_space_saving_weighted_and_exact_merge():
+    """加权计数与合并精确计数表时误差界同样成立；容量足够时结果精确"""
+    stream = zipf_stream(5000, 3000, seed=6)
+    extra = Counter(zipf_stream(3000, 3000, seed=7))
+    summary = SpaceSaving(capacity=100)
+    summary.update(stream, weight=2)
+    summary.merge(extra)
+    truth = Counter({word: 2 * count for word, count in Counter(stream).items()}) + extra
+    assert_space_saving_bounds(summary, truth)
+
+    exact = SpaceSaving(capacity=10000)
+    exact.update(stream)
+    assert dict(exact.items()) == Counter(stream)
+    assert exact.floor() == 0
+
+
+def test_space_saving_total_includes_pending_batch():
+    """total 包含尚未并入摘要的批次，不依赖之前是否调用过 len() / items()"""
+    summary = SpaceSaving(capacity=100, batch_size=1000)
+    summary.update(['经济', '消费', '经济'], weight=2)
+    assert summary.total == 6
+    assert summary.total / summary.capacity == 0.06
+
+
+def test_space_saving_round_trip_tuple_keys():
+    summary = SpaceSaving(capacity=50)
+    summary.update_counts(Counter({('经济', 'n', '发展', 'vn'): 3, ('市场', 'n', '政策', 'n'): 1}))
+    summary.update([('内卷', 'n')] * 4)
+    loaded = SpaceSaving.from_dict(json.loads(json.dumps(summary.to_dict(), ensure_ascii=False)))
+    assert dict(loaded.items()) == dict(summary.items())
+    assert loaded.total == summary.total == 8
+
+
+# ---------- JSON 读取 ----------
+
+def sample_records(n=50):
+    texts = synthetic_texts(n, seed=8)
+    return [{'comment_id': str(i), 'content': text, 'nested': {'list': [i, '}', '{"x"]'], 'escaped': '\\"'}}
+            for i, text in enumerate(texts)]
+
+
+@pytest.mark.parametrize('buffer_size', [1, 7, 64, 1 << 20])
+def test_iter_json_records_spans_buffer_boundaries(tmp_path, buffer_size):
+    records = sample_records()
+    path = tmp_path / 'comments.json'
+    path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding='utf-8')
+    assert list(iter_json_records(str(path), buffer_size=buffer_size)) == records
+
+
+@pytest.mark.parametrize('buffer_size', [5, 1 << 20])
+def test_iter_json_records_jsonl(tmp_path, buffer_size):
+    records = sample_records()
+    path = tmp_path / 'comments.jsonl'
+    path.write_text('\n'.join(json.dumps(r, ensure_ascii=False) for r in records) + '\n\n', encoding='utf-8')
+    assert list(iter_json_records(str(path), buffer_size=buffer_size)) == records
+
+
+def test_iter_json_records_jsonl_skips_invalid_lines(tmp_path):
+    """JSON Lines 中格式错误或不是对象的行被跳过，其余记录照常读取"""
+    path = tmp_path / 'comments.jsonl'
+    path.write_text('{"a": 1}\n{"b": 2,,}\n[1, 2]\n\n{"c": "}"}\n', encoding='utf-8')
+    assert list(iter_json_records(str(path))) == [{'a': 1}, {'c': '}'}]
+
+
+@pytest.mark.parametrize('content', ['', '   \n', '[]', '[\n]'])
+def test_iter_json_records_empty(tmp_path, content):
+    path = tmp_path / 'empty.json'
+    path.write_text(content, encoding='utf-8')
+    assert list(iter_json_records(str(path), buffer_size=4)) == []
+
+
+def test_iter_json_records_skips_malformed_record(tmp_path):
+    """格式错误的记录被跳过，之后的记录（包括字符串中含括号的记录）照常读取"""
+    path = tmp_path / 'comments.json'
+    path.write_text('[{"a": 1}, {"b": 2,, "c": "}"}, {"d": "{[x"}, {"e": 5}]', encoding='utf-8')
+    for buffer_size in (3, 1 << 20):
+        assert list(iter_json_records(str(path), buffer_size=buffer_size)) == [{'a': 1}, {'d': '{[x'}, {'e': 5}]
+
+
+# ---------- 持久化缓存 ----------
+
+def test_cache_invalidates_only_changed_kind(analyzer, tmp_path, monkeypatch):
+    """切换情感阈值只清除情绪结果与时间桶，分词结果保留；词典变化时分词结果也失效"""
+    path = str(tmp_path / 'analysis_cache.sqlite')
+    key = ('1', AnalysisCache.content_hash('经济发展'))
+    tokens = (('经济', '发展'), (('经济', 'n'), ('发展', 'vn')))
+    cache = AnalysisCache(path, analyzer._cache_fingerprints())
+    cache.put_sentiments([(key, 0.9, '积极')])
+    cache.put_tokens([(key, tokens)])
+    cache.put_buckets([('2025-07-14T00', 'digest', {'count': 1})])
+    cache.close()
+
+    analyzer.positive_threshold = 0.7
+    cache = AnalysisCache(path, analyzer._cache_fingerprints())
+    assert cache.get_many([key], 'sentiment') == {}
+    assert cache.get_many([key], 'tokens') == {key: tokens}
+    assert cache.get_buckets({'2025-07-14T00': 'digest'}) == {}
+    cache.close()
+
+    custom_words = analyzer._custom_words() + ['宏观经济学']
+    monkeypatch.setattr(analyzer, '_custom_words', lambda: custom_words)
+    cache = AnalysisCache(path, analyzer._cache_fingerprints())
+    assert cache.get_many([key], 'tokens') == {}
+    assert cache.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 0
+    cache.close()
+
+
+# ---------- 增量分析 ----------
+
+def write_day(data_dir, date, start, n, seed):
+    """写出一天的评论/视频/创作者数据，记录ID从 start 开始"""
+    rng = random.Random(seed)
+    texts = synthetic_texts(n, seed=seed)
+    comments = [{'comment_id': str(start + i), 'content': text, 'like_count': str(rng.randint(0, 500)),
+                 'sex': rng.choice(['男', '女', '保密']), 'video_id': str(rng.randint(1, 5)),
+                 'create_time': 1752000000 + rng.randint(0, 86400)} for i, text in enumerate(texts)]
+    contents = [{'video_id': str(start + i), 'title': texts[i][:20], 'desc': texts[-i - 1],
+                 'video_play_count': str(rng.randint(100, 100000)), 'user_id': str(i)} for i in range(n // 5)]
+    creators = [{'user_id': str(start + i), 'sex': rng.choice(['男', '女', '保密']), 'sign': texts[i],
+                 'total_fans': str(rng.randint(0, 10 ** 6))} for i in range(n // 10)]
+    for kind, records in (('comments', comments), ('contents', contents), ('creators', creators)):
+        with open(os.path.join(data_dir, f'search_{kind}_{date}.json'), 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False)
+
+
+def without_file_list(results):
+    results = dict(results)
+    results.pop('incremental')
+    return results
+
+
+def test_incremental_matches_full_run(analyzer, tmp_path):
+    """分两次增量合并的结果与一次处理全部文件的结果一致，统计量与全量分析一致"""
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    write_day(str(data_dir), '2025-07-14', 1000, 120, seed=10)
+    first_pass = analyzer.incremental_analysis(str(data_dir))
+    write_day(str(data_dir), '2025-07-15', 5000, 80, seed=11)
+    incremental = analyzer.incremental_analysis(str(data_dir))
+    # 没有新文件时再次运行，状态不变
+    assert analyzer.incremental_analysis(str(data_dir)) == incremental
+    assert first_pass['incremental']['records']['comments'] == 120
+    assert incremental['incremental']['records']['comments'] == 200
+
+    state_path = analyzer.config['incremental']['state_path']
+    os.remove(state_path)
+    one_pass = analyzer.incremental_analysis(str(data_dir))
+    assert without_file_list(incremental) == without_file_list(one_pass)
+
+    # 状态文件可读回，重新生成的结果不变
+    state = IncrementalState.load(state_path, analyzer._cache_fingerprint(), analyzer._term_capacity())
+    assert without_file_list(analyzer.incremental_results(state)) == without_file_list(one_pass)
+
+    # 全量分析：情绪全部打分后，计数、情绪分布与词频统计与增量结果一致
+    analyzer.config['analysis']['comment_sample_size'] = 0
+    files = {kind: sorted(str(p) for p in data_dir.glob(f'search_{kind}_*.json'))
+             for kind in ('comments', 'contents', 'creators')}
+    analyzer.load_data(files)
+    comments = analyzer.analyze_comments()
+    contents = analyzer.analyze_video_content()
+    creators = analyzer.analyze_creators()
+
+    merged_comments = incremental['comment_analysis']
+    assert merged_comments['basic_stats']['total'] == 200
+    for key in ('total', 'valid', 'max_length', 'min_length', 'max_likes'):
+        assert merged_comments['basic_stats'][key] == comments['basic_stats'][key]
+    for key in ('avg_length', 'avg_likes', 'median_likes'):
+        assert merged_comments['basic_stats'][key] == pytest.approx(comments['basic_stats'][key])
+    assert merged_comments['sentiment_distribution'] == comments['sentiment_distribution']
+    assert merged_comments['tfidf_keywords'] == comments['tfidf_keywords']
+    assert merged_comments['keyword_frequency'] == comments['keyword_frequency']
+    assert incremental['content_analysis']['title_sentiment'] == contents['title_sentiment']
+    assert incremental['content_analysis']['video_stats'] == pytest.approx(contents['video_stats'])
+    assert incremental['creator_analysis']['gender_distribution'] == creators['gender_distribution']
+    assert incremental['creator_analysis']['fan_stats'] == pytest.approx(creators['fan_stats'])